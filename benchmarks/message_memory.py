@@ -0,0 +1,89 @@
+"""
+Message Memory Benchmark - Bytes per in-memory message
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/message_memory.py [count]
+"""
+
+import gc
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+
+from core.session import Message
+
+
+@dataclass
+class DictMessage:
+    """Message with the previous plain dataclass layout, for comparison"""
+    role: str
+    agent_name: Optional[str] = None
+    content: str = ""
+    timestamp: datetime = field(default_factory=datetime.now)
+    metadata: Dict = field(default_factory=dict)
+    token_count: Optional[int] = None
+
+
+AGENTS = ["Product Manager", "Tech Lead", "UX Designer", "QA Engineer"]
+
+
+def sample_json(count: int) -> str:
+    """Serialized messages as stored in a session file"""
+    records = []
+    for i in range(count):
+        agent = AGENTS[i % len(AGENTS)] if i % 3 else None
+        records.append({
+            "role": "agent" if agent else "user",
+            "agent_name": agent,
+            "content": f"Message {i}",
+            "timestamp": datetime(2024, 1, 1, 12, i % 60, i % 60, i).isoformat(),
+            "metadata": {},
+            "token_count": 3
+        })
+    return json.dumps(records)
+
+
+def measure(factory, raw: str, count: int) -> float:
+    """Bytes per message still held after loading messages from JSON"""
+    gc.collect()
+    tracemalloc.start()
+    records = json.loads(raw)
+    messages = [factory(record) for record in records]
+    del records
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del messages
+    return retained / count
+
+
+def build_dict_message(record: dict) -> DictMessage:
+    return DictMessage(
+        role=record["role"],
+        agent_name=record["agent_name"],
+        content=record["content"],
+        timestamp=datetime.fromisoformat(record["timestamp"]),
+        metadata=record["metadata"],
+        token_count=record["token_count"]
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    raw = sample_json(count)
+
+    baseline = measure(build_dict_message, raw, count)
+    compact = measure(Message.from_dict, raw, count)
+
+    print(f"Messages:           {count}")
+    print(f"Dataclass layout:   {baseline:8.1f} bytes/message")
+    print(f"Slotted Message:    {compact:8.1f} bytes/message")
+    print(f"Saved:              {1 - compact / baseline:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Template Render Benchmark - First render vs repeat renders of the PRD
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/template_render.py [renders]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+
+from core.session import Decision, Message, Session
+from documents.generator import DocumentGenerator
+
+
+def sample_session() -> Session:
+    """Session with a handful of messages and decisions"""
+    session = Session(session_id="bench", product_name="Chat App")
+    for i in range(20):
+        session.add_message(Message(role="user", content=f"Requirement {i}"))
+    for i in range(10):
+        session.add_decision(Decision(
+            id=f"d{i}", topic="Technical stack" if i % 2 else "Pricing",
+            decision=f"Choice {i}", participants=["Tech Lead"], reasoning="Simple"
+        ))
+    return session
+
+
+def timed(generator: DocumentGenerator, session: Session) -> float:
+    started = time.perf_counter()
+    asyncio.run(generator.generate_prd(session))
+    return time.perf_counter() - started
+
+
+def main(renders: int):
+    session = sample_session()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        config = {"documents": {"template_cache": cache_dir}}
+
+        generator = DocumentGenerator(config)
+        cold = timed(generator, session)
+        repeat = min(timed(generator, session) for _ in range(renders))
+
+        # New process: compiled templates gone, bytecode still on disk
+        DocumentGenerator._environments.clear()
+        DocumentGenerator._default_templates.clear()
+        warm = timed(DocumentGenerator(config), session)
+
+    print(f"template dir:              {generator.template_dir}")
+    print(f"first render (compile):    {cold * 1000:8.3f} ms")
+    print(f"first render (bytecode):   {warm * 1000:8.3f} ms")
+    print(f"repeat render (best of {renders}): {repeat * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -2,10 +2,12 @@
 Base Agent Class - Abstract base for all agents
 """
 
-from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from abc import ABC
+from typing import AsyncIterator, List, Dict, Optional
 from dataclasses import dataclass
 
+from llm.base import ChatPrompt
+
 
 @dataclass
 class AgentConfig:
@@ -31,7 +33,7 @@ class AgentConfig:
 class Agent(ABC):
     """Abstract base class for all agents"""
 
-    def __init__(self, config: AgentConfig, llm_provider):
+    def __init__(self, config: AgentConfig, llm_provider, context_manager=None):
         self.config = config
         self.llm = llm_provider
         self.name = config.name
@@ -39,14 +41,154 @@ class Agent(ABC):
         self.description = config.description
         self.emoji = config.emoji
 
-    @abstractmethod
+        if context_manager is None:
+            # Import here to avoid circular import (core imports agents)
+            from core.context_manager import ContextManager
+            context_manager = ContextManager()
+        self.context_manager = context_manager
+
     async def generate_response(
         self,
         conversation_history: List,
         context: Dict
     ) -> str:
         """Generate response based on conversation history and context"""
-        pass
+        prompt = self.build_agent_prompt(conversation_history, context)
+        return await self.llm.generate(prompt)
+
+    async def stream_response(
+        self,
+        conversation_history: List,
+        context: Dict
+    ) -> AsyncIterator[str]:
+        """Stream response chunks based on conversation history and context"""
+        prompt = self.build_agent_prompt(conversation_history, context)
+        async for chunk in self.llm.generate_stream(prompt):
+            yield chunk
+
+    @property
+    def token_estimator(self):
+        """Token estimator of this agent's provider, so history is budgeted as billed"""
+        return getattr(self.llm, "token_estimator", None)
+
+    def get_last_usage(self) -> Dict[str, int]:
+        """Get token usage the provider reported for the last response"""
+        return dict(getattr(self.llm, "last_usage", None) or {})
+
+    def build_agent_prompt(
+        self,
+        conversation_history: List,
+        context: Dict
+    ) -> ChatPrompt:
+        """Build structured prompt with role-specific instructions"""
+        return self.build_messages(
+            conversation_history,
+            self.get_role_instructions(context),
+            summary=context.get("summary", ""),
+            decisions=context.get("decisions"),
+            summary_watermark=context.get("summary_watermark")
+        )
+
+    def get_role_instructions(self, context: Dict) -> str:
+        """Get role-specific instructions (overridden by subclasses)"""
+        return ""
+
+    def build_system_prompt(self, instructions: str = "") -> str:
+        """Build the stable system prompt: persona, role prompt and instructions"""
+        if self.config.language == "zh":
+            closing = f"其他参与者的发言以其名字开头。请以{self.name}的身份回应。"
+        else:
+            closing = (
+                "Messages from other participants are prefixed with their names. "
+                f"Respond as {self.name}."
+            )
+
+        parts = [
+            f"You are {self.name}, {self.description}",
+            self.config.system_prompt.strip(),
+            instructions.strip(),
+            closing
+        ]
+        return "\n\n".join(part for part in parts if part)
+
+    def build_messages(
+        self,
+        conversation_history: List,
+        instructions: str = "",
+        summary: str = "",
+        decisions: Optional[List] = None,
+        summary_watermark: Optional[int] = None
+    ) -> ChatPrompt:
+        """Build role-tagged turns for native multi-turn chat APIs
+
+        History is packed into the context manager's token budget, with
+        older messages about `decisions` pinned first; if older messages
+        were left out, the rolling summary stands in for them as the
+        opening turn, after the stable system prompt. The summary covers
+        the first `summary_watermark` messages, so history is kept from
+        there on even where the window would start later. This agent's own
+        messages become assistant turns; user and other agents' messages
+        become user turns labelled with the speaker. Consecutive turns
+        with the same role are merged.
+        """
+        turns: List[Dict[str, str]] = []
+        history = self.context_manager.pack(
+            conversation_history,
+            decisions=decisions,
+            summarized=summary_watermark if summary else None,
+            estimator=self.token_estimator
+        )
+
+        system_prompt = self.build_system_prompt(instructions)
+        # The summary changes as the conversation grows, so it opens the
+        # conversation instead of joining the cached system prompt
+        if summary and len(history) < len(conversation_history):
+            if self.config.language == "zh":
+                turns.append({"role": "user", "content": f"此前对话的摘要：\n{summary}"})
+            else:
+                turns.append({"role": "user", "content": f"Summary of the earlier conversation:\n{summary}"})
+
+        for msg in history:
+            if msg.role == "agent" and msg.agent_name == self.name:
+                role, content = "assistant", msg.content
+            else:
+                if msg.role == "user":
+                    speaker = "User"
+                elif msg.role == "system":
+                    speaker = "System"
+                else:
+                    speaker = msg.agent_name or "Agent"
+                role, content = "user", f"{speaker}: {msg.content}"
+
+            if turns and turns[-1]["role"] == role:
+                turns[-1]["content"] += f"\n\n{content}"
+            else:
+                turns.append({"role": role, "content": content})
+        # Turns before the one holding the newest message don't change
+        # until the history window moves on
+        stable = len(turns) - 2
+
+        # Chat APIs expect the conversation to start and end with a user turn
+        if not turns or turns[0]["role"] != "user":
+            opening = "（对话开始）" if self.config.language == "zh" else "(Conversation start)"
+            turns.insert(0, {"role": "user", "content": opening})
+            stable += 1
+        if turns[-1]["role"] != "user":
+            if self.config.language == "zh":
+                prompt = f"请以{self.name}的身份继续。"
+            else:
+                prompt = f"Please continue as {self.name}."
+            turns.append({"role": "user", "content": prompt})
+
+        # Cache the stable history prefix, which the next request shares
+        # while the window holds still, and the full prompt, which a reply
+        # from this agent extends
+        breakpoints = sorted({index for index in (stable, len(turns) - 1) if index >= 0})
+        return ChatPrompt(
+            system_prompt,
+            turns,
+            cache_breakpoints=breakpoints
+        )
 
     def build_prompt(self, conversation_history: List) -> str:
         """Build prompt for LLM (can be overridden by subclasses)"""
@@ -56,8 +198,8 @@ class Agent(ABC):
 
 Conversation history:
 """
-        # Add last 10 messages
-        for msg in conversation_history[-10:]:
+        # Add as much recent history as fits the context budget
+        for msg in self.context_manager.pack(conversation_history, estimator=self.token_estimator):
             if msg.role == "user":
                 prompt += f"User: {msg.content}\n"
             else:
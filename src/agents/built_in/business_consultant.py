@@ -2,7 +2,7 @@
 Business Consultant Agent
 """
 
-from typing import List, Dict
+from typing import Dict
 from agents.base import Agent
 
 
@@ -53,8 +53,8 @@ Speaking style:
 """
     }
 
-    def __init__(self, config, llm_provider):
-        super().__init__(config, llm_provider)
+    def __init__(self, config, llm_provider, context_manager=None):
+        super().__init__(config, llm_provider, context_manager)
         self._set_bilingual_prompt()
 
     def _set_bilingual_prompt(self):
@@ -62,17 +62,13 @@ Speaking style:
         lang = self.config.language
         self.config.system_prompt = self.SYSTEM_PROMPTS.get(lang, self.SYSTEM_PROMPTS["en"])
 
-    async def generate_response(
-        self,
-        conversation_history: List,
-        context: Dict
-    ) -> str:
-        """Generate response as Business Consultant"""
-        prompt = self.build_prompt(conversation_history)
+    def get_role_instructions(self, context: Dict) -> str:
+        """Get role instructions as Business Consultant"""
+        instructions = ""
 
         # Add Business Consultant specific instructions
         if self.config.language == "zh":
-            prompt += """
+            instructions += """
 
 作为业务顾问，你的方法包括：
 1. 识别产品的核心价值主张
@@ -87,7 +83,7 @@ Speaking style:
 - 讨论定价和收入策略（如适用）
 - 鼓励考虑可持续增长"""
         else:
-            prompt += """
+            instructions += """
 
 As the Business Consultant, your approach includes:
 1. Identify the core value proposition of the product
@@ -102,5 +98,4 @@ In your responses:
 - Discuss pricing and revenue strategies (if applicable)
 - Encourage thinking about sustainable growth"""
 
-        response = await self.llm.generate(prompt)
-        return response
+        return instructions.strip()
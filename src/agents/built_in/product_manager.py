@@ -2,7 +2,7 @@
 Product Manager Agent
 """
 
-from typing import List, Dict
+from typing import Dict
 from agents.base import Agent
 
 
@@ -43,8 +43,8 @@ Speaking style:
 """
     }
 
-    def __init__(self, config, llm_provider):
-        super().__init__(config, llm_provider)
+    def __init__(self, config, llm_provider, context_manager=None):
+        super().__init__(config, llm_provider, context_manager)
         # Override system prompt with bilingual version
         self._set_bilingual_prompt()
 
@@ -53,20 +53,16 @@ Speaking style:
         lang = self.config.language
         self.config.system_prompt = self.SYSTEM_PROMPTS.get(lang, self.SYSTEM_PROMPTS["en"])
 
-    async def generate_response(
-        self,
-        conversation_history: List,
-        context: Dict
-    ) -> str:
-        """Generate response as Product Manager"""
-        prompt = self.build_prompt(conversation_history)
+    def get_role_instructions(self, context: Dict) -> str:
+        """Get role instructions as Product Manager"""
+        instructions = ""
 
         # Add Product Manager specific instructions
         stage = context.get("stage", "initial")
 
         if stage == "initial":
             if self.config.language == "zh":
-                prompt += """
+                instructions += """
 
 作为产品经理，你的目标是：
 1. 提出澄清问题以了解用户的愿景
@@ -75,7 +71,7 @@ Speaking style:
 
 每次提出 2-3 个重点问题。"""
             else:
-                prompt += """
+                instructions += """
 
 As the Product Manager, your goal is to:
 1. Ask clarifying questions to understand the user's vision
@@ -86,7 +82,7 @@ Ask 2-3 focused questions at a time."""
 
         elif stage == "requirements":
             if self.config.language == "zh":
-                prompt += """
+                instructions += """
 
 作为产品经理，你的目标是：
 1. 组织和确认需求
@@ -95,7 +91,7 @@ Ask 2-3 focused questions at a time."""
 
 总结你所理解的并请求确认。"""
             else:
-                prompt += """
+                instructions += """
 
 As the Product Manager, your goal is to:
 1. Organize and confirm requirements
@@ -104,8 +100,7 @@ As the Product Manager, your goal is to:
 
 Summarize what you've understood and ask for confirmation."""
 
-        response = await self.llm.generate(prompt)
-        return response
+        return instructions.strip()
 
     def get_style_instructions(self) -> str:
         """Get Product Manager speaking style"""
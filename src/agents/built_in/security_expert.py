@@ -67,8 +67,8 @@ Speaking style:
 """
     }
 
-    def __init__(self, config, llm_provider):
-        super().__init__(config, llm_provider)
+    def __init__(self, config, llm_provider, context_manager=None):
+        super().__init__(config, llm_provider, context_manager)
         self._set_bilingual_prompt()
 
     def _set_bilingual_prompt(self):
@@ -76,17 +76,13 @@ Speaking style:
         lang = self.config.language
         self.config.system_prompt = self.SYSTEM_PROMPTS.get(lang, self.SYSTEM_PROMPTS["en"])
 
-    async def generate_response(
-        self,
-        conversation_history: List,
-        context: Dict
-    ) -> str:
-        """Generate response as Security Expert"""
-        prompt = self.build_prompt(conversation_history)
+    def get_role_instructions(self, context: Dict) -> str:
+        """Get role instructions as Security Expert"""
+        instructions = ""
 
         # Add Security Expert specific instructions
         if self.config.language == "zh":
-            prompt += """
+            instructions += """
 
 作为安全专家，你是对唱者。你的角色包括：
 1. 主动识别安全风险
@@ -107,7 +103,7 @@ Speaking style:
 
 不要过于消极，但对于合理的担忧不要保持沉默。"""
         else:
-            prompt += """
+            instructions += """
 
 As the Security Expert, you are the devil's advocate. Your role is to:
 
@@ -129,8 +125,7 @@ Always provide:
 
 Don't be overly negative, but don't hold back on legitimate concerns."""
 
-        response = await self.llm.generate(prompt)
-        return response
+        return instructions.strip()
 
     async def think_before_speaking(
         self,
@@ -140,22 +135,10 @@ Don't be overly negative, but don't hold back on legitimate concerns."""
         """Security Expert should always speak if risks detected"""
         # Check for security-related keywords
         if conversation_history:
-            last_message = conversation_history[-1]
-            content = last_message.content.lower()
-
-            risky_keywords_en = [
-                "password", "user data", "authentication", "payment",
-                "privacy", "encrypt", "store", "database", "api key"
-            ]
-
-            risky_keywords_zh = [
-                "密码", "用户数据", "认证", "支付",
-                "隐私", "加密", "存储", "数据库", "密钥"
-            ]
-
-            risky_keywords = risky_keywords_en + risky_keywords_zh
+            # Import here to avoid circular import (core imports agents)
+            from core.keywords import keyword_scores
 
-            should_speak = any(keyword in content for keyword in risky_keywords)
+            should_speak = "security_risk" in keyword_scores(conversation_history[-1])
 
             return {
                 "should_speak": should_speak,
@@ -2,7 +2,7 @@
 Tech Lead Agent
 """
 
-from typing import List, Dict
+from typing import Dict
 from agents.base import Agent
 
 
@@ -41,8 +41,8 @@ Speaking style:
 """
     }
 
-    def __init__(self, config, llm_provider):
-        super().__init__(config, llm_provider)
+    def __init__(self, config, llm_provider, context_manager=None):
+        super().__init__(config, llm_provider, context_manager)
         self._set_bilingual_prompt()
 
     def _set_bilingual_prompt(self):
@@ -50,17 +50,13 @@ Speaking style:
         lang = self.config.language
         self.config.system_prompt = self.SYSTEM_PROMPTS.get(lang, self.SYSTEM_PROMPTS["en"])
 
-    async def generate_response(
-        self,
-        conversation_history: List,
-        context: Dict
-    ) -> str:
-        """Generate response as Tech Lead"""
-        prompt = self.build_prompt(conversation_history)
+    def get_role_instructions(self, context: Dict) -> str:
+        """Get role instructions as Tech Lead"""
+        instructions = ""
 
         # Add Tech Lead specific instructions
         if self.config.language == "zh":
-            prompt += """
+            instructions += """
 
 作为技术专家，你的方法是：
 1. 做推荐时提供 2-3 个技术选项
@@ -78,7 +74,7 @@ Speaking style:
   - 缺点：...
 - 建议：..."""
         else:
-            prompt += """
+            instructions += """
 
 As the Tech Lead, your approach is:
 1. Provide 2-3 technical options when making recommendations
@@ -96,5 +92,4 @@ Structure your responses with:
   - Cons: ...
 - Recommendation: ..."""
 
-        response = await self.llm.generate(prompt)
-        return response
+        return instructions.strip()
@@ -22,6 +22,30 @@ class AgentFactory:
         self.default_language = self._get_default_language()
         self.agent_configs = self._load_agent_configs()
 
+        # Agents with identical connection settings share one pooled client
+        from llm.registry import ClientRegistry
+        from llm.cache import ResponseCache
+        llm_config = self.config.get("llm", {})
+        self.client_registry = ClientRegistry(
+            llm_config.get("connection_pool", {}),
+            rate_limits=llm_config.get("rate_limits", {}),
+            retry_config=llm_config.get("retry", {})
+        )
+
+        # Response cache is opt-in through llm.cache.enabled
+        cache_config = llm_config.get("cache", {})
+        self.response_cache = ResponseCache(cache_config) if cache_config.get("enabled") else None
+
+        # One context budget shared by every agent's prompt builder
+        from core.context_manager import ContextManager
+        conversation_config = self.config.get("conversation", {})
+        self.context_manager = ContextManager(
+            max_tokens=conversation_config.get("context_max_tokens", 4000),
+            max_message_tokens=conversation_config.get("context_max_message_tokens", 1000),
+            max_messages=conversation_config.get("max_history", 50),
+            window_step=conversation_config.get("context_window_step", 10)
+        )
+
     def _get_default_language(self) -> str:
         """Get default language from config or environment"""
         # Check config first
@@ -53,8 +77,12 @@ class AgentFactory:
                 config_data = yaml.safe_load(f)
                 agents_config = config_data.get("agents", [])
 
-                # Get default model config
-                default_model = config_data.get("default_model", {})
+                # Get default model config, layered over cword.yaml's default_model
+                # so settings such as timeout apply unless agents.yaml overrides them
+                default_model = {
+                    **self.config.get("default_model", {}),
+                    **config_data.get("default_model", {})
+                }
 
                 # Apply default language and model if not specified
                 for agent_config in agents_config:
@@ -128,22 +156,81 @@ class AgentFactory:
 
         # Import LLM provider here to avoid circular import
         from llm.providers import create_llm_provider
-        llm_provider = create_llm_provider(config.model_config or {})
+        llm_provider = create_llm_provider(
+            config.model_config or {},
+            registry=self.client_registry,
+            cache=self.response_cache
+        )
 
         # Create agent based on role
         role = config.role
 
         if role == "product_manager":
-            return ProductManagerAgent(config, llm_provider)
+            return ProductManagerAgent(config, llm_provider, self.context_manager)
         elif role == "tech_lead":
-            return TechLeadAgent(config, llm_provider)
+            return TechLeadAgent(config, llm_provider, self.context_manager)
         elif role == "business_consultant":
-            return BusinessConsultantAgent(config, llm_provider)
+            return BusinessConsultantAgent(config, llm_provider, self.context_manager)
         elif role == "security_expert":
-            return SecurityExpertAgent(config, llm_provider)
+            return SecurityExpertAgent(config, llm_provider, self.context_manager)
         else:
             # Generic agent
-            return GenericAgent(config, llm_provider)
+            return GenericAgent(config, llm_provider, self.context_manager)
+
+    def create_summarizer(self):
+        """Create rolling conversation summarizer using the default model
+
+        Returns None if the default model can't be set up (e.g. no API key).
+        """
+        from llm.providers import create_llm_provider
+        from core.summarizer import ConversationSummarizer
+
+        try:
+            llm_provider = create_llm_provider(
+                self.config.get("default_model", {}),
+                registry=self.client_registry,
+                cache=self.response_cache
+            )
+        except (ValueError, ImportError) as e:
+            print(f"Warning: Conversation summaries disabled: {e}")
+            return None
+
+        conversation_config = self.config.get("conversation", {})
+        return ConversationSummarizer(
+            llm_provider,
+            interval=conversation_config.get("summary_interval", 10),
+            fanout=conversation_config.get("summary_fanout", 4),
+            language=self.default_language
+        )
+
+    def create_document_extractor(self):
+        """Create structured document extractor using the default model
+
+        Returns None if disabled by documents.llm_extraction or if the
+        default model can't be set up.
+        """
+        documents_config = self.config.get("documents", {})
+        if not documents_config.get("llm_extraction", True):
+            return None
+
+        from llm.providers import create_llm_provider
+        from documents.extraction import DocumentExtractor
+
+        try:
+            llm_provider = create_llm_provider(
+                self.config.get("default_model", {}),
+                registry=self.client_registry,
+                cache=self.response_cache
+            )
+        except (ValueError, ImportError) as e:
+            print(f"Warning: Document extraction disabled: {e}")
+            return None
+
+        return DocumentExtractor(
+            llm_provider,
+            max_input_tokens=documents_config.get("extraction_input_tokens", 8000),
+            language=self.default_language
+        )
 
     def create_all_agents(self) -> List[Agent]:
         """Create all agents from configuration"""
@@ -162,20 +249,15 @@ class AgentFactory:
 class GenericAgent(Agent):
     """Generic agent for custom roles"""
 
-    async def generate_response(
-        self,
-        conversation_history: List,
-        context: Dict
-    ) -> str:
-        """Generate response"""
-        prompt = self.build_prompt(conversation_history)
+    def get_role_instructions(self, context: Dict) -> str:
+        """Get role instructions"""
+        instructions = ""
 
         # Add context-specific instructions
         if context.get("stage") == "initial":
             if self.config.language == "zh":
-                prompt += "\n\n注意：这是对话的开始阶段。"
+                instructions += "\n\n注意：这是对话的开始阶段。"
             else:
-                prompt += "\n\nNote: This is the beginning of the conversation."
+                instructions += "\n\nNote: This is the beginning of the conversation."
 
-        response = await self.llm.generate(prompt)
-        return response
+        return instructions.strip()
@@ -2,18 +2,26 @@
 CLI Interface - Main User Interaction Handler
 """
 
-import asyncio
 import os
+import time
+from typing import Dict, Optional
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
 from rich.table import Table
 import questionary
 
 from core.session import SessionManager
 from core.coordinator import AgentCoordinator
+from core.autosave import AutoSaver
+from core.keywords import load_keyword_matcher, set_keyword_matcher
 from agents.factory import AgentFactory
 from documents.generator import DocumentGenerator
+from documents.export import ExportPipeline
 from storage.document_store import DocumentStore
+from llm.tokens import add_usage
+from utils.async_runner import AsyncRunner
+from utils.event_bus import create_event_bus
 
 
 class CLIInterface:
@@ -22,12 +30,27 @@ class CLIInterface:
     def __init__(self, config: dict):
         self.config = config
         self.console = Console()
+        # Routing and decision keywords, matched once per message
+        set_keyword_matcher(load_keyword_matcher(config.get("keywords_config")))
         self.session_manager = SessionManager(config)
         self.agents = []
+        self.agent_factory = None
         self.coordinator = None
+        # One long-lived event loop so client pools survive between turns
+        self.runner = AsyncRunner()
         self.document_generator = DocumentGenerator(config)
         self.document_store = DocumentStore(config)
+        self.export_pipeline = ExportPipeline(
+            self.document_generator,
+            self.document_store,
+            format=config.get("documents", {}).get("format", "markdown")
+        )
         self.language = self._get_language()
+        # "concurrent" (parallel, same history) or "sequential" (each sees the previous)
+        self.all_speak_mode = config.get("conversation", {}).get("all_speak_mode", "concurrent")
+        self.stream_responses = config.get("conversation", {}).get("stream_responses", True)
+        # Background saves after changes settle; interval <= 0 disables
+        self.autosaver = self._create_autosaver()
 
     def _get_language(self) -> str:
         """Get language setting from environment or config"""
@@ -43,31 +66,62 @@ class CLIInterface:
         # Default to Chinese
         return "zh"
 
+    def _create_autosaver(self) -> Optional[AutoSaver]:
+        """Create auto-saver from conversation config"""
+        conversation_config = self.config.get("conversation", {})
+        interval = conversation_config.get("auto_save_interval", 300)
+        if not interval or interval <= 0:
+            return None
+
+        return AutoSaver(
+            self.session_manager,
+            interval=interval,
+            debounce=conversation_config.get("auto_save_debounce", 2.0)
+        )
+
     def run(self):
         """Run the CLI interface"""
         self._show_welcome()
-        self._initialize_agents()
-
-        # Main loop
-        while True:
-            user_input = self._get_user_input()
-
-            if user_input.lower() in ['/exit', 'quit', 'exit']:
-                self._show_goodbye()
-                break
-            elif user_input.lower() in ['/help', 'h']:
-                self._show_help()
-            elif user_input.lower() in ['/agents', 'a']:
-                self._list_agents()
-            elif user_input.lower() in ['/preview', 'p']:
-                self._show_preview()
-            elif user_input.lower() in ['/save', 's']:
-                self._save_session()
-            elif user_input.lower() in ['/export', 'e']:
-                self._export_documents()
-            else:
-                # Process user message (synchronous wrapper)
-                self._process_message_sync(user_input)
+        self.runner.start()
+        if self.autosaver:
+            self.runner.submit(self.autosaver.run())
+
+        try:
+            self._initialize_agents()
+
+            # Main loop
+            while True:
+                user_input = self._get_user_input()
+
+                if user_input.lower() in ['/exit', 'quit', 'exit']:
+                    self._show_goodbye()
+                    break
+                elif user_input.lower() in ['/help', 'h']:
+                    self._show_help()
+                elif user_input.lower() in ['/agents', 'a']:
+                    self._list_agents()
+                elif user_input.lower() in ['/preview', 'p']:
+                    self._show_preview()
+                elif user_input.lower() in ['/save', 's']:
+                    self._save_session()
+                elif user_input.lower() in ['/export', 'e']:
+                    self._export_documents()
+                else:
+                    # Process user message (synchronous wrapper)
+                    self._process_message_sync(user_input)
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        """Flush unsaved changes, close pooled clients and stop the event loop"""
+        if self.coordinator:
+            self.runner.run(self.coordinator.wait_for_summaries())
+            self.runner.run(self.coordinator.event_bus.close())
+        if self.autosaver:
+            self.runner.run(self.autosaver.stop())
+        if self.agent_factory:
+            self.runner.run(self.agent_factory.client_registry.aclose())
+        self.runner.stop()
 
     def _show_welcome(self):
         """Show welcome screen"""
@@ -110,9 +164,15 @@ Current Team: Product Manager, Tech Lead, Business Consultant, Security Expert
 
     def _initialize_agents(self):
         """Initialize all agents from configuration"""
-        agent_factory = AgentFactory(self.config)
-        self.agents = agent_factory.create_all_agents()
-        self.coordinator = AgentCoordinator(self.agents)
+        self.agent_factory = AgentFactory(self.config)
+        self.agents = self.agent_factory.create_all_agents()
+        self.coordinator = AgentCoordinator(
+            self.agents,
+            summarizer=self.agent_factory.create_summarizer(),
+            event_bus=create_event_bus(self.config)
+        )
+        # Documents are filled in from one structured extraction per session state
+        self.document_generator.extractor = self.agent_factory.create_document_extractor()
 
         self.console.print("✅ Agents initialized successfully!", style="green")
 
@@ -151,41 +211,80 @@ Current Team: Product Manager, Tech Lead, Business Consultant, Security Expert
         agent_name = self._select_agent()
 
         if agent_name and agent_name != "skip":
-            # Now run async operations in a new event loop
-            asyncio.run(self._get_agent_response(agent_name, session))
+            # Run async operations on the persistent event loop
+            responded_from = len(session.messages)
+            try:
+                self.runner.run(self._get_agent_response(agent_name, session))
+                self._show_usage(session, responded_from)
+            except KeyboardInterrupt:
+                # In-flight request was cancelled; partial text is kept as a marked message
+                if self.language == "zh":
+                    self.console.print("\n⏹️  已中断当前发言", style="yellow")
+                else:
+                    self.console.print("\n⏹️  Response interrupted", style="yellow")
+            except RuntimeError as e:
+                if self.language == "zh":
+                    self.console.print(f"\n❌ 智能体响应失败: {e}", style="red")
+                else:
+                    self.console.print(f"\n❌ Agent response failed: {e}", style="red")
 
     async def _get_agent_response(self, agent_name: str, session):
         """Get agent response asynchronously"""
         if agent_name == "all":
-            # Let all agents speak
-            for agent in self.agents:
-                response = await self.coordinator.let_agent_speak(agent.name, session)
-                self._display_agent_response(agent.name, response)
+            # Let all agents speak, displaying each response as it arrives
+            await self.coordinator.let_all_speak(
+                session,
+                mode=self.all_speak_mode,
+                on_response=self._display_agent_response
+            )
+        elif self.stream_responses:
+            # Render tokens live as they arrive
+            await self._stream_agent_response(agent_name, session)
         else:
             # Get agent response
             response = await self.coordinator.let_agent_speak(agent_name, session)
             # Display response
             self._display_agent_response(agent_name, response)
 
+    async def _stream_agent_response(self, agent_name: str, session):
+        """Stream agent response into a live-updating panel"""
+        self.console.print(f"\n{self._get_agent_emoji(agent_name)} {agent_name}:\n")
+
+        text = ""
+        # Live redraws at most refresh_per_second, however fast chunks arrive
+        with Live(
+            Panel(text, style="cyan"),
+            console=self.console,
+            refresh_per_second=8
+        ) as live:
+            async for event in self.coordinator.stream_agent_speak(agent_name, session):
+                if event.type == "chunk":
+                    text += event.text
+                    live.update(Panel(text, style="cyan"))
+
+        self.console.print("")
+
     def _select_agent(self) -> str:
         """Let user select which agent should speak"""
         if self.language == "zh":
+            all_label = "所有人依次发言" if self.all_speak_mode == "sequential" else "所有人同时发言"
             choices = [
                 {"name": f"🎯 产品经理     - 需求梳理者", "value": "产品经理"},
                 {"name": f"🔧 技术专家     - 技术顾问", "value": "技术专家"},
                 {"name": f"💼 业务顾问     - 商业分析师", "value": "业务顾问"},
                 {"name": f"🛡️  安全专家     - 风险识别者", "value": "安全专家"},
-                {"name": f"📢 全体发言     - 所有人依次发言", "value": "all"},
+                {"name": f"📢 全体发言     - {all_label}", "value": "all"},
                 {"name": f"⏭️  跳过，我继续说", "value": "skip"},
             ]
             prompt = "🎤 谁想发言？"
         else:
+            all_label = "Everyone speaks in turn" if self.all_speak_mode == "sequential" else "Everyone answers at once"
             choices = [
                 {"name": f"🎯 Product Manager     - Requirements Organizer", "value": "Product Manager"},
                 {"name": f"🔧 Tech Lead           - Technical Consultant", "value": "Tech Lead"},
                 {"name": f"💼 Business Consultant - Business Analyst", "value": "Business Consultant"},
                 {"name": f"🛡️  Security Expert     - Risk Identifier", "value": "Security Expert"},
-                {"name": f"📢 All Speak           - Everyone speaks in turn", "value": "all"},
+                {"name": f"📢 All Speak           - {all_label}", "value": "all"},
                 {"name": f"⏭️  Skip, I'll continue", "value": "skip"},
             ]
             prompt = "🎤 Who wants to speak?"
@@ -197,8 +296,8 @@ Current Team: Product Manager, Tech Lead, Business Consultant, Security Expert
 
         return choice
 
-    def _display_agent_response(self, agent_name: str, response: str):
-        """Display agent response"""
+    def _get_agent_emoji(self, agent_name: str) -> str:
+        """Get display emoji for agent"""
         emoji_map = {
             "Product Manager": "🎯",
             "Tech Lead": "🔧",
@@ -210,12 +309,43 @@ Current Team: Product Manager, Tech Lead, Business Consultant, Security Expert
             "安全专家": "🛡️"
         }
 
-        emoji = emoji_map.get(agent_name, "🤖")
+        return emoji_map.get(agent_name, "🤖")
 
-        self.console.print(f"\n{emoji} {agent_name}:\n")
+    def _display_agent_response(self, agent_name: str, response: str):
+        """Display agent response"""
+        self.console.print(f"\n{self._get_agent_emoji(agent_name)} {agent_name}:\n")
         self.console.print(Panel(response, style="cyan"))
         self.console.print("")
 
+    def _show_usage(self, session, since: int):
+        """Show API usage of the responses added since index, and session totals"""
+        usage: Dict[str, int] = {}
+        for message in session.messages[since:]:
+            add_usage(usage, message.metadata.get("usage") or {})
+        if not usage:
+            return
+
+        if self.language == "zh":
+            label, total_label = "用量", "会话累计"
+        else:
+            label, total_label = "Usage", "session"
+        self.console.print(
+            f"📊 {label}: {self._format_usage(usage)}  |  {total_label}: {self._format_usage(session.usage_totals)}",
+            style="dim"
+        )
+
+    def _format_usage(self, usage: Dict[str, int]) -> str:
+        """Input (with prompt cache hits) and output token counts"""
+        if self.language == "zh":
+            return (
+                f"输入 {usage.get('input_tokens', 0):,}（缓存命中 {usage.get('cache_read_tokens', 0):,}）"
+                f" · 输出 {usage.get('output_tokens', 0):,}"
+            )
+        return (
+            f"in {usage.get('input_tokens', 0):,} (cache hit {usage.get('cache_read_tokens', 0):,})"
+            f" · out {usage.get('output_tokens', 0):,}"
+        )
+
     def _list_agents(self):
         """List all available agents"""
         if self.language == "zh":
@@ -247,7 +377,7 @@ Current Team: Product Manager, Tech Lead, Business Consultant, Security Expert
             return
 
         # Generate preview
-        preview = asyncio.run(self.document_generator.generate_realtime_preview(session))
+        preview = self.runner.run(self.document_generator.generate_realtime_preview(session))
         title = "📄 文档预览" if self.language == "zh" else "📄 Document Preview"
         self.console.print(Panel(preview, title=title, style="cyan"))
 
@@ -266,32 +396,37 @@ Current Team: Product Manager, Tech Lead, Business Consultant, Security Expert
         else:
             self.console.print("\n📄 Generating documents...", style="yellow")
 
-        # Generate documents
-        prd = asyncio.run(self.document_generator.generate_prd(session))
-        tech_spec = asyncio.run(self.document_generator.generate_tech_spec(session))
-        decisions = asyncio.run(self.document_generator.generate_decision_history(session))
-
-        # Save documents
+        # Generate all documents concurrently, saving each as it is ready
         product_name = session.product_name or ("未命名产品" if self.language == "zh" else "Untitled_Product")
-        prd_path = self.document_store.save_prd(product_name, prd)
-        tech_path = self.document_store.save_tech_design(product_name, tech_spec)
-        decision_path = self.document_store.save_decision_history(product_name, decisions)
+        started = time.perf_counter()
+        results = self.runner.run(self.export_pipeline.export(session, product_name))
+        elapsed = time.perf_counter() - started
 
-        if self.language == "zh":
-            self.console.print(f"\n✅ 文档导出成功！", style="green")
-            self.console.print(f"  - 需求文档: {prd_path}")
-            self.console.print(f"  - 技术设计: {tech_path}")
-            self.console.print(f"  - 决策记录: {decision_path}")
-        else:
-            self.console.print(f"\n✅ Documents exported successfully!", style="green")
-            self.console.print(f"  - PRD: {prd_path}")
-            self.console.print(f"  - Tech Spec: {tech_path}")
-            self.console.print(f"  - Decision History: {decision_path}")
+        if any(result.ok for result in results):
+            if self.language == "zh":
+                self.console.print(f"\n✅ 文档导出成功！({elapsed:.2f}s)", style="green")
+            else:
+                self.console.print(f"\n✅ Documents exported successfully! ({elapsed:.2f}s)", style="green")
+
+        for result in results:
+            title = result.document.title(self.language)
+            if result.ok:
+                self.console.print(
+                    f"  - {title}: {result.path} "
+                    f"[dim](generate {result.generate_seconds:.2f}s, write {result.write_seconds:.2f}s)[/dim]"
+                )
+            elif self.language == "zh":
+                self.console.print(f"  ❌ {title} 导出失败: {result.error}", style="red")
+            else:
+                self.console.print(f"  ❌ {title} failed: {result.error}", style="red")
 
     def _save_session(self):
         """Save current session"""
         session = self.session_manager.get_current_session()
         if session:
+            # Let in-flight summary updates land so they are saved too
+            if self.coordinator:
+                self.runner.run(self.coordinator.wait_for_summaries())
             self.session_manager.save_session(session.session_id)
             if self.language == "zh":
                 self.console.print("✅ 会话已保存！", style="green")
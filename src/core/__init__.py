@@ -1,9 +1,11 @@
 """Core Module"""
 
 from .session import SessionManager, Session, Message, Decision
-from .coordinator import AgentCoordinator
+from .coordinator import AgentCoordinator, AgentStreamEvent
 from .decision_tracker import DecisionTracker
 from .context_manager import ContextManager
+from .summarizer import ConversationSummarizer
+from .autosave import AutoSaver
 
 __all__ = [
     "SessionManager",
@@ -11,6 +13,9 @@ __all__ = [
     "Message",
     "Decision",
     "AgentCoordinator",
+    "AgentStreamEvent",
     "DecisionTracker",
-    "ContextManager"
+    "ContextManager",
+    "ConversationSummarizer",
+    "AutoSaver"
 ]
@@ -0,0 +1,94 @@
+"""
+Auto Saver - Persist changed sessions in the background
+"""
+
+import asyncio
+from typing import Dict, Optional
+
+from core.session import SessionManager, Session
+
+
+class AutoSaver:
+    """Save dirty sessions from a background task on the event loop
+
+    Sessions bump their version on every change. The saver checks every
+    `debounce` seconds and writes a session once its version stopped
+    changing for a tick, so a burst of messages becomes one write. A session
+    that keeps changing is still written at least every `interval` seconds.
+    Writes run in a worker thread to keep the event loop responsive.
+    """
+
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        interval: float = 300.0,
+        debounce: float = 2.0
+    ):
+        self.session_manager = session_manager
+        self.interval = interval
+        self.debounce = debounce
+        self.saves = 0
+        self._last_seen: Dict[str, int] = {}
+        self._dirty_since: Dict[str, float] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        """Lock created on the loop the saver runs on"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def run(self):
+        """Check for dirty sessions until cancelled"""
+        self._task = asyncio.current_task()
+        while True:
+            await asyncio.sleep(self.debounce)
+            await self.check()
+
+    async def check(self):
+        """Save dirty sessions that went quiet or waited too long"""
+        now = asyncio.get_running_loop().time()
+
+        async with self._get_lock():
+            for session in self.session_manager.dirty_sessions():
+                session_id = session.session_id
+                version = session.version
+                dirty_since = self._dirty_since.setdefault(session_id, now)
+
+                if self._last_seen.get(session_id) != version and now - dirty_since < self.interval:
+                    # Still changing: wait for a quiet tick
+                    self._last_seen[session_id] = version
+                    continue
+
+                await self._save(session)
+
+    async def flush(self):
+        """Save every dirty session now"""
+        async with self._get_lock():
+            for session in self.session_manager.dirty_sessions():
+                await self._save(session)
+
+    async def _save(self, session: Session):
+        """Write session off the event loop; failures are retried next tick"""
+        try:
+            await asyncio.to_thread(self.session_manager.save_session, session.session_id)
+        except Exception as e:
+            print(f"Warning: Auto-save of session {session.session_id} failed: {e}")
+            return
+
+        self._last_seen.pop(session.session_id, None)
+        self._dirty_since.pop(session.session_id, None)
+        self.saves += 1
+
+    async def stop(self):
+        """Stop checking and flush remaining changes"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+        await self.flush()
@@ -2,43 +2,267 @@
 Context Manager - Manage conversation context
 """
 
-from typing import List
+from typing import Dict, List, Optional, Set
 from datetime import datetime
 
-from core.session import Session, Message
+from core.keywords import keyword_scores
+from core.session import Session, Message, Decision
+from core.summarizer import ConversationSummarizer
+from llm.tokens import TokenEstimator, count_message_tokens, get_estimator
+
+
+# Ranking weights for older messages pinned ahead of the history window
+ROLE_WEIGHTS = {"user": 2.0, "system": 1.5}
+IMPORTANT_WEIGHT = 1.5
+DECISION_WEIGHT = 2.0
 
 
 class ContextManager:
-    """Manage conversation context for LLM calls"""
+    """Manage conversation context for LLM calls
+
+    Packs conversation history into a token budget as one unbroken run of
+    the most recent messages. The oldest message kept only moves forward,
+    and only in steps of `window_step` messages, so from one turn to the
+    next the packed history keeps the same prefix and prompt caches stay
+    valid. Oversized messages are cut down to their head and tail, the
+    same way every time.
+
+    Once history overflows, part of the budget goes to pinned messages
+    from before the window: important ones (flagged, or matching the
+    `important` keyword group) and ones referring to recorded decisions,
+    ranked by role, importance and decision references. They only change
+    when the window moves or decisions are added.
+
+    Token counts come from the `estimator` passed in, normally the one of
+    the provider the context is for, so budgets match what it bills; the
+    default heuristic is used otherwise.
+    """
+
+    # Share of the budget kept for pinned messages once history overflows
+    PINNED_SHARE = 0.25
 
-    def __init__(self, max_tokens: int = 4000):
+    def __init__(
+        self,
+        max_tokens: int = 4000,
+        max_message_tokens: int = 1000,
+        max_messages: int = 50,
+        window_step: int = 10
+    ):
         self.max_tokens = max_tokens
+        self.max_message_tokens = max_message_tokens
+        self.max_messages = max_messages
+        self.window_step = max(1, window_step)
 
     async def prepare_context(
         self,
         session: Session,
-        agent_name: str = None
+        agent_name: str = None,
+        max_tokens: Optional[int] = None,
+        estimator: Optional[TokenEstimator] = None
     ) -> List[Message]:
-        """Prepare context for LLM call (with compression)"""
-        messages = session.messages
+        """Prepare context for LLM call, summarizing what doesn't fit"""
+        budget = max_tokens or self.max_tokens
+        packed = self.pack(session.messages, budget, session.decisions, estimator=estimator)
+        if len(packed) == len(session.messages):
+            return packed
+
+        # The summary gets at most half the budget; history keeps the rest
+        summary = await self._generate_summary(session)
+        if count_message_tokens(summary, estimator) > budget // 2:
+            summary = self._truncate(summary, budget // 2, estimator)
+        summarized = None
+        if ConversationSummarizer.get_summary(session):
+            summarized = ConversationSummarizer.get_watermark(session)
+        history = self.pack(
+            session.messages,
+            budget - count_message_tokens(summary, estimator),
+            session.decisions,
+            summarized,
+            estimator
+        )
+        return ([summary] if summary.content else []) + history
+
+    def window_start(
+        self,
+        messages: List[Message],
+        max_tokens: Optional[int] = None,
+        estimator: Optional[TokenEstimator] = None
+    ) -> int:
+        """Index of the oldest message pack() keeps
 
-        # Strategy 1: If few messages, return all
-        if len(messages) <= 10:
-            return messages
+        The smallest multiple of window_step from which every message (cut
+        to max_message_tokens) fits the budget. Appending messages can only
+        move it forward, so it stays put until the window is full.
+        """
+        budget = max_tokens or self.max_tokens
+        count = len(messages)
+        if not count or budget <= 0:
+            return count
 
-        # Strategy 2: Generate summary if too many
-        if len(messages) > 20:
-            summary = await self._generate_summary(session)
-            important_messages = self._filter_important(messages[-10:])
-            return [summary] + important_messages
+        floor = max(0, count - self.max_messages) if self.max_messages else 0
+        per_message = self._per_message_limit(budget)
 
-        # Strategy 3: Filter important messages
-        return self._filter_important(messages)
+        # Oldest index from which the tail still fits
+        oldest = count
+        used = 0
+        for index in range(count - 1, floor - 1, -1):
+            used += min(count_message_tokens(messages[index], estimator), per_message)
+            if used > budget:
+                break
+            oldest = index
+
+        step = self.window_step
+        start = -(-max(oldest, floor) // step) * step
+        # The newest message is always kept
+        return min(start, count - 1)
+
+    def pack(
+        self,
+        messages: List[Message],
+        max_tokens: Optional[int] = None,
+        decisions: Optional[List[Decision]] = None,
+        summarized: Optional[int] = None,
+        estimator: Optional[TokenEstimator] = None
+    ) -> List[Message]:
+        """Pinned older messages plus the most recent ones, in conversation order
+
+        The newest message is always kept (truncated if needed). When a
+        summary covering the first `summarized` messages stands in for
+        older history, the window starts no later than that, so messages
+        the summary hasn't reached yet are never left out; the summarizer
+        keeps that gap to about one summary interval. Returned messages may
+        be truncated copies; the originals are not modified.
+        """
+        budget = max_tokens or self.max_tokens
+        if not messages or budget <= 0:
+            return []
+
+        start = self.window_start(messages, budget, estimator)
+        pinned: List[Message] = []
+        if start > 0:
+            reserve = int(budget * self.PINNED_SHARE)
+            budget -= reserve
+            start = self.window_start(messages, budget, estimator)
+            if summarized is not None:
+                start = min(start, summarized)
+            pinned = self._pinned(messages, start, reserve, decisions, estimator)
+
+        per_message = self._per_message_limit(budget)
+        packed = list(pinned)
+        for message in messages[start:]:
+            if count_message_tokens(message, estimator) > per_message:
+                message = self._truncate(message, per_message, estimator)
+            packed.append(message)
+        return packed
+
+    def _pinned(
+        self,
+        messages: List[Message],
+        start: int,
+        budget: int,
+        decisions: Optional[List[Decision]],
+        estimator: Optional[TokenEstimator] = None
+    ) -> List[Message]:
+        """Best ranked of the max_messages messages before start, within budget"""
+        if budget <= 0:
+            return []
+
+        first = max(0, start - self.max_messages) if self.max_messages else 0
+        terms = self._decision_terms(decisions)
+        candidates = []
+        for index, message in enumerate(messages[first:start], start=first):
+            score = self._score(message, terms)
+            if score > 0:
+                candidates.append((score, index))
+        # Highest score first, the more recent on ties
+        candidates.sort(key=lambda candidate: (-candidate[0], -candidate[1]))
+
+        per_message = self._per_message_limit(budget)
+        selected: Dict[int, Message] = {}
+        remaining = budget
+        for _, index in candidates:
+            message = messages[index]
+            if count_message_tokens(message, estimator) > per_message:
+                message = self._truncate(message, per_message, estimator)
+            cost = count_message_tokens(message, estimator)
+            if cost <= remaining:
+                selected[index] = message
+                remaining -= cost
+
+        return [selected[index] for index in sorted(selected)]
+
+    def _score(self, message: Message, decision_terms: Set[str]) -> float:
+        """Rank message for pinning; 0 if it is neither important nor about a decision"""
+        score = 0.0
+        if message.metadata.get("important") or "important" in keyword_scores(message):
+            score += IMPORTANT_WEIGHT
+
+        if decision_terms:
+            content_lower = message.content.lower()
+            if any(term in content_lower for term in decision_terms):
+                score += DECISION_WEIGHT
+
+        if score:
+            score += ROLE_WEIGHTS.get(message.role, 0.0)
+        return score
+
+    def _decision_terms(self, decisions: Optional[List[Decision]]) -> Set[str]:
+        """Lowercased decision topics used to spot references"""
+        return {
+            decision.topic.lower()
+            for decision in decisions or []
+            if decision.topic
+        }
+
+    def _per_message_limit(self, budget: int) -> int:
+        """Token cap for any one message under budget"""
+        return min(self.max_message_tokens or budget, budget)
+
+    def _truncate(
+        self,
+        message: Message,
+        max_tokens: int,
+        estimator: Optional[TokenEstimator] = None
+    ) -> Message:
+        """Copy of message cut to its head and tail within max_tokens"""
+        count_tokens = (estimator or get_estimator()).count
+        content = message.content
+        total = count_message_tokens(message, estimator)
+        ratio = max_tokens / total if total else 1.0
+
+        # Shrink until the marker and both ends fit the budget
+        while True:
+            keep = int(len(content) * ratio)
+            if keep < 16:
+                # No room for a marker: keep as much of the head as fits
+                truncated = content[:max(keep, 0)]
+                while truncated and count_tokens(truncated) > max_tokens:
+                    truncated = truncated[:len(truncated) // 2]
+                break
+            head = content[:keep * 2 // 3]
+            tail = content[len(content) - (keep - len(head)):] if keep > len(head) else ""
+            omitted = total - count_tokens(head + tail)
+            truncated = f"{head}\n[... {omitted} tokens omitted ...]\n{tail}"
+            if count_tokens(truncated) <= max_tokens:
+                break
+            ratio *= 0.9
+
+        return message.replace(
+            content=truncated,
+            metadata={**message.metadata, "truncated": True},
+            token_count=None
+        )
 
     async def _generate_summary(self, session: Session) -> Message:
-        """Generate conversation summary"""
-        # This would use LLM to generate summary
-        # For now, return a simple summary
+        """Get conversation summary, preferring the stored rolling summary"""
+        stored = ConversationSummarizer.get_summary(session)
+        if stored:
+            return Message(
+                role="system",
+                content=f"[Conversation Summary]\n{stored}"
+            )
+
+        # No rolling summary yet; describe the session from its state
         summary_text = f"""
 [Conversation Summary]
 Product: {session.product_name or 'Untitled'}
@@ -58,24 +282,6 @@ Key points:
             content=summary_text
         )
 
-    def _filter_important(self, messages: List[Message]) -> List[Message]:
-        """Filter important messages"""
-        important = []
-
-        for msg in messages:
-            # Keep user messages
-            if msg.role == "user":
-                important.append(msg)
-                continue
-
-            # Keep agent messages with questions or decisions
-            content_lower = msg.content.lower()
-            if any(keyword in content_lower for keyword in
-                   ["?", "确认", "confirm", "决定", "decide", "选择", "choose"]):
-                important.append(msg)
-
-        return important
-
     def format_context_for_llm(self, messages: List[Message]) -> str:
         """Format messages for LLM prompt"""
         formatted = []
@@ -91,7 +297,10 @@ Key points:
 
         return "\n".join(formatted)
 
-    def count_tokens(self, text: str) -> int:
-        """Estimate token count (rough approximation)"""
-        # Rough estimate: ~4 characters per token
-        return len(text) // 4
+    def count_tokens(self, text: str, estimator: Optional[TokenEstimator] = None) -> int:
+        """Estimate token count"""
+        return (estimator or get_estimator()).count(text)
+
+    def count_message_tokens(self, messages: List[Message], estimator: Optional[TokenEstimator] = None) -> int:
+        """Sum cached per-message token counts"""
+        return sum(count_message_tokens(msg, estimator) for msg in messages)
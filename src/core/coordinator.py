@@ -2,54 +2,103 @@
 Agent Coordinator - Orchestrate multi-agent conversations
 """
 
-from typing import List
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional
 from datetime import datetime
 
+from core.keywords import get_keyword_matcher, keyword_scores
 from core.session import Session, Message, Decision
+from core.summarizer import ConversationSummarizer
 from agents.base import Agent
 from utils.event_bus import EventBus, Event
 
 
+@dataclass
+class AgentStreamEvent:
+    """Event yielded while an agent response is streaming"""
+    type: str  # "chunk" or "message"
+    agent_name: str
+    text: str = ""
+    message: Optional[Message] = None
+
+
 class AgentCoordinator:
     """Coordinate agent interactions and conversations"""
 
-    def __init__(self, agents: List[Agent]):
+    def __init__(
+        self,
+        agents: List[Agent],
+        summarizer: Optional[ConversationSummarizer] = None,
+        event_bus: Optional[EventBus] = None
+    ):
         self.agents = {agent.name: agent for agent in agents}
-        self.event_bus = EventBus()
+        self.event_bus = event_bus or EventBus()
         self.decision_count = 0
+        self.summarizer = summarizer
+        self._summary_tasks: Dict[str, asyncio.Task] = {}
 
-    async def let_agent_speak(
-        self,
-        agent_name: str,
-        session: Session
-    ) -> str:
-        """Let specified agent speak"""
-        agent = self.agents.get(agent_name)
-        if not agent:
-            raise ValueError(f"Agent {agent_name} does not exist")
-
-        # Build context
-        context = {
+    def _build_context(self, session: Session) -> Dict:
+        """Build agent context from session state"""
+        return {
             "stage": session.current_stage,
             "decisions": session.decisions,
-            "product_name": session.product_name
+            "product_name": session.product_name,
+            "summary": ConversationSummarizer.get_summary(session),
+            "summary_watermark": ConversationSummarizer.get_watermark(session)
         }
 
-        # Generate response
-        response = await agent.generate_response(
-            session.messages,
-            context
+    def _schedule_summary(self, session: Session):
+        """Update the rolling summary in the background when it's due"""
+        if not self.summarizer or not self.summarizer.needs_update(session):
+            return
+
+        task = self._summary_tasks.get(session.session_id)
+        if task and not task.done():
+            # The running update picks up any further complete batches
+            return
+
+        self._summary_tasks[session.session_id] = asyncio.ensure_future(
+            self._update_summary(session)
         )
 
-        # Record message
+    async def _update_summary(self, session: Session):
+        """Run summarizer, reporting failures without interrupting the conversation"""
+        try:
+            await self.summarizer.update(session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Warning: Failed to update conversation summary: {e}")
+
+    async def wait_for_summaries(self):
+        """Wait for background summary updates to finish"""
+        tasks = [task for task in self._summary_tasks.values() if not task.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _usage_metadata(self, agent: Agent) -> Dict:
+        """Message metadata carrying the provider's reported usage"""
+        usage = agent.get_last_usage()
+        return {"usage": usage} if usage else {}
+
+    async def _commit_response(
+        self,
+        agent_name: str,
+        response: str,
+        session: Session,
+        metadata: Optional[Dict] = None
+    ) -> Message:
+        """Record agent response in session and publish event"""
         message = Message(
             role="agent",
             agent_name=agent_name,
-            content=response
+            content=response,
+            metadata=metadata or {}
         )
         session.add_message(message)
+        self._schedule_summary(session)
 
-        # Publish event
         await self.event_bus.publish(Event(
             type="agent_spoke",
             data={
@@ -59,16 +108,157 @@ class AgentCoordinator:
             }
         ))
 
+        return message
+
+    async def let_agent_speak(
+        self,
+        agent_name: str,
+        session: Session
+    ) -> str:
+        """Let specified agent speak"""
+        agent = self.agents.get(agent_name)
+        if not agent:
+            raise ValueError(f"Agent {agent_name} does not exist")
+
+        # Generate response
+        response = await agent.generate_response(
+            session.messages,
+            self._build_context(session)
+        )
+
+        # Record message
+        await self._commit_response(
+            agent_name,
+            response,
+            session,
+            metadata=self._usage_metadata(agent)
+        )
+
         return response
 
-    async def let_all_speak(self, session: Session) -> List[str]:
-        """Let all agents speak in turn"""
-        responses = []
+    async def stream_agent_speak(
+        self,
+        agent_name: str,
+        session: Session
+    ) -> AsyncIterator[AgentStreamEvent]:
+        """Let specified agent speak, yielding chunks as they arrive
+
+        Yields "chunk" events while streaming and a final "message" event.
+        The message is only added to the session once the stream completes;
+        if the stream is cancelled, partial text is kept as a message marked
+        {"interrupted": True}.
+        """
+        agent = self.agents.get(agent_name)
+        if not agent:
+            raise ValueError(f"Agent {agent_name} does not exist")
 
-        for agent_name in self.agents.keys():
-            response = await self.let_agent_speak(agent_name, session)
+        chunks = []
+        try:
+            async for chunk in agent.stream_response(
+                session.messages.copy(),
+                self._build_context(session)
+            ):
+                chunks.append(chunk)
+                yield AgentStreamEvent(type="chunk", agent_name=agent_name, text=chunk)
+        except asyncio.CancelledError:
+            if chunks:
+                await self._commit_response(
+                    agent_name,
+                    "".join(chunks),
+                    session,
+                    metadata={"interrupted": True}
+                )
+            raise
+
+        response = "".join(chunks)
+        message = await self._commit_response(
+            agent_name,
+            response,
+            session,
+            metadata=self._usage_metadata(agent)
+        )
+        yield AgentStreamEvent(
+            type="message",
+            agent_name=agent_name,
+            text=response,
+            message=message
+        )
+
+    async def let_all_speak(
+        self,
+        session: Session,
+        mode: str = "concurrent",
+        on_response: Optional[Callable[[str, str], None]] = None
+    ) -> List[str]:
+        """Let all agents speak
+
+        Modes:
+        - "concurrent": agents answer in parallel against the same history
+          snapshot; on_response fires as each finishes, and messages are
+          appended to the session in agent order once all are done
+        - "sequential": agents speak in turn, each seeing the previous answers
+        """
+        if mode == "sequential":
+            responses = []
+            for agent_name in list(self.agents.keys()):
+                response = await self.let_agent_speak(agent_name, session)
+                if on_response:
+                    on_response(agent_name, response)
+                responses.append(response)
+            return responses
+
+        if mode != "concurrent":
+            raise ValueError(f"Unknown speak mode: {mode}")
+
+        agent_names = list(self.agents.keys())
+        history = session.messages.copy()
+        context = self._build_context(session)
+
+        async def _respond(index: int, agent_name: str):
+            agent = self.agents[agent_name]
+            try:
+                response = await agent.generate_response(history, context)
+            except Exception as e:
+                return index, agent_name, e
+            usages[index] = self._usage_metadata(agent)
+            return index, agent_name, response
+
+        results: List[Optional[str]] = [None] * len(agent_names)
+        usages: List[Dict] = [{} for _ in agent_names]
+        errors = []
+
+        tasks = [
+            asyncio.ensure_future(_respond(index, name))
+            for index, name in enumerate(agent_names)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, agent_name, result = await next_done
+                if isinstance(result, Exception):
+                    errors.append((agent_name, result))
+                    continue
+                results[index] = result
+                if on_response:
+                    on_response(agent_name, result)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        # Commit in deterministic agent order, not completion order
+        responses = []
+        for agent_name, response, metadata in zip(agent_names, results, usages):
+            if response is None:
+                continue
+            await self._commit_response(agent_name, response, session, metadata=metadata)
             responses.append(response)
 
+        if errors and not responses:
+            agent_name, error = errors[0]
+            raise RuntimeError(f"Agent {agent_name} failed to respond: {error}")
+
+        for agent_name, error in errors:
+            print(f"Warning: Agent {agent_name} failed to respond: {error}")
+
         return responses
 
     def suggest_agents(self, session: Session) -> List[str]:
@@ -78,41 +268,20 @@ class AgentCoordinator:
         if not session.messages:
             return suggestions
 
-        # Get last message
-        last_message = session.messages[-1]
-        last_content = last_message.content.lower()
+        # Keyword groups of the last message, matched once when it was added
+        scores = keyword_scores(session.messages[-1])
+        roles = {agent.role: name for name, agent in self.agents.items()}
 
-        # Rule 1: If involving sensitive data, suggest Security Expert
-        sensitive_keywords = [
-            "id card", "password", "bank card", "privacy",
-            "身份证", "密码", "银行卡", "隐私"
-        ]
-        if any(keyword in last_content for keyword in sensitive_keywords):
-            if "Security Expert" in self.agents:
-                suggestions.append("Security Expert")
+        for role in get_keyword_matcher().suggestions(scores):
+            name = roles.get(role)
+            if name and name not in suggestions:
+                suggestions.append(name)
 
-        # Rule 2: If early stage, suggest Product Manager
+        # If early stage, suggest Product Manager
         if session.current_stage == "initial" and len(session.messages) < 5:
-            if "Product Manager" in self.agents:
-                suggestions.append("Product Manager")
-
-        # Rule 3: If discussing technology, suggest Tech Lead
-        tech_keywords = [
-            "architecture", "database", "api", "framework", "technical",
-            "架构", "数据库", "技术"
-        ]
-        if any(keyword in last_content for keyword in tech_keywords):
-            if "Tech Lead" in self.agents:
-                suggestions.append("Tech Lead")
-
-        # Rule 4: If discussing business, suggest Business Consultant
-        business_keywords = [
-            "business", "market", "customer", "revenue",
-            "商业", "市场", "用户", "收入"
-        ]
-        if any(keyword in last_content for keyword in business_keywords):
-            if "Business Consultant" in self.agents:
-                suggestions.append("Business Consultant")
+            name = roles.get("product_manager")
+            if name and name not in suggestions:
+                suggestions.append(name)
 
         return suggestions
 
@@ -126,15 +295,7 @@ class AgentCoordinator:
             return False
 
         # If decision language detected
-        last_message = session.messages[-1]
-        last_content = last_message.content.lower()
-
-        decision_keywords = [
-            "just use", "choose", "determine", "decide",
-            "就用", "选择", "确定", "决定"
-        ]
-
-        return any(keyword in last_content for keyword in decision_keywords)
+        return "decision" in keyword_scores(session.messages[-1])
 
     def record_decision(
         self,
@@ -0,0 +1,216 @@
+"""
+Keyword Matcher - Single-pass multi-keyword matching for routing and signals
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import yaml
+
+
+# Built-in keyword groups, overridable via config/keywords.yaml.
+# Groups with `suggest` route to the agent with that role.
+DEFAULT_KEYWORD_GROUPS = {
+    "sensitive_data": {
+        "suggest": "security_expert",
+        "keywords": {
+            "en": ["id card", "password", "bank card", "privacy"],
+            "zh": ["身份证", "密码", "银行卡", "隐私"]
+        }
+    },
+    "technical": {
+        "suggest": "tech_lead",
+        "keywords": {
+            "en": ["architecture", "database", "api", "framework", "technical"],
+            "zh": ["架构", "数据库", "技术"]
+        }
+    },
+    "business": {
+        "suggest": "business_consultant",
+        "keywords": {
+            "en": ["business", "market", "customer", "revenue"],
+            "zh": ["商业", "市场", "用户", "收入"]
+        }
+    },
+    "security_risk": {
+        "keywords": {
+            "en": [
+                "password", "user data", "authentication", "payment",
+                "privacy", "encrypt", "store", "database", "api key"
+            ],
+            "zh": ["密码", "用户数据", "认证", "支付", "隐私", "加密", "存储", "数据库", "密钥"]
+        }
+    },
+    "decision": {
+        "keywords": {
+            "en": ["just use", "choose", "determine", "decide"],
+            "zh": ["就用", "选择", "确定", "决定"]
+        }
+    },
+    "important": {
+        "keywords": {
+            "en": ["?", "confirm", "decide", "choose"],
+            "zh": ["？", "确认", "决定", "选择"]
+        }
+    }
+}
+
+# Shared result for text without hits
+NO_MATCHES: Mapping[str, float] = MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class KeywordHit:
+    """Keyword found in text"""
+    group: str
+    keyword: str
+    weight: float
+    position: int
+
+
+class KeywordMatcher:
+    """Match every keyword of every group in one regex scan
+
+    All keywords are compiled into one regex, factored as a trie so each
+    position costs a single branch per character, and wrapped in a
+    lookahead so overlapping keywords are reported too. Text is lowercased
+    once instead of matching case-insensitively, which is much slower. At a
+    position only the longest keyword matches; shorter keywords that are
+    prefixes of it are added from a precomputed table.
+
+    Groups map to {"keywords": {language: [keyword or {keyword: weight}]},
+    "weight": <default 1.0>, "suggest": <agent role, optional>}.
+    """
+
+    def __init__(self, groups: Dict[str, Dict], languages: Optional[List[str]] = None):
+        self.groups = groups
+        self.languages = languages
+        # Lowercased keyword -> [(group, weight)]
+        self._targets: Dict[str, List[Tuple[str, float]]] = {}
+
+        for group, spec in groups.items():
+            group_weight = float(spec.get("weight", 1.0))
+            for language, keywords in (spec.get("keywords") or {}).items():
+                if languages and language not in languages:
+                    continue
+                for entry in keywords or []:
+                    items = entry.items() if isinstance(entry, dict) else [(entry, group_weight)]
+                    for keyword, weight in items:
+                        keyword = str(keyword).lower()
+                        if keyword:
+                            self._targets.setdefault(keyword, []).append((group, float(weight)))
+
+        keywords = sorted(self._targets, key=len, reverse=True)
+        # Keywords also hit when a longer keyword matches at the same position
+        self._prefixes = {
+            keyword: [other for other in keywords if other != keyword and keyword.startswith(other)]
+            for keyword in keywords
+        }
+        self._pattern = None
+        if keywords:
+            # Cheap first-character check before entering the trie
+            first = "".join(sorted({re.escape(k[0]) for k in keywords}))
+            self._pattern = re.compile(f"(?=[{first}])(?=({_trie_pattern(keywords)}))")
+
+    def match(self, text: str) -> List[KeywordHit]:
+        """All keyword hits in text, in order of position"""
+        if not text or self._pattern is None:
+            return []
+
+        hits = []
+        for found in self._pattern.finditer(text.lower()):
+            keyword = found.group(1)
+            for matched in [keyword] + self._prefixes.get(keyword, []):
+                for group, weight in self._targets[matched]:
+                    hits.append(KeywordHit(group, matched, weight, found.start()))
+        return hits
+
+    def scores(self, text: str) -> Mapping[str, float]:
+        """Weight per group hit in text; each distinct keyword counts once"""
+        if not text or self._pattern is None:
+            return NO_MATCHES
+
+        found = set(self._pattern.findall(text.lower()))
+        keywords = found.union(*(self._prefixes[keyword] for keyword in found))
+
+        scores: Dict[str, float] = {}
+        for keyword in keywords:
+            for group, weight in self._targets[keyword]:
+                scores[group] = scores.get(group, 0.0) + weight
+        return MappingProxyType(scores) if scores else NO_MATCHES
+
+    def suggestions(self, scores: Mapping[str, float]) -> List[str]:
+        """Agent roles suggested by scores, highest weight first, ties in group order"""
+        ranked = sorted(
+            (group for group in self.groups if group in scores and self.groups[group].get("suggest")),
+            key=lambda group: -scores[group]
+        )
+        return [self.groups[group]["suggest"] for group in ranked]
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """Regex matching the longest of keywords, with shared prefixes factored out"""
+    root: Dict = {}
+    for keyword in keywords:
+        node = root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional tail: longer keywords win, shorter ones still end here
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(root)
+
+
+def load_keyword_matcher(path: Optional[str] = None) -> KeywordMatcher:
+    """Load keyword groups from YAML, falling back to the built-in groups"""
+    candidates = [Path(path).expanduser()] if path else []
+    candidates += [
+        Path.cwd() / "config" / "keywords.yaml",
+        Path.home() / ".cword" / "config" / "keywords.yaml"
+    ]
+
+    for candidate in candidates:
+        if not candidate.exists():
+            continue
+        try:
+            with open(candidate, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            return KeywordMatcher(data.get("groups", {}), data.get("languages"))
+        except (OSError, yaml.YAMLError, AttributeError, TypeError, ValueError) as e:
+            print(f"Warning: Failed to load keywords from {candidate}: {e}")
+
+    return KeywordMatcher(DEFAULT_KEYWORD_GROUPS)
+
+
+_matcher: Optional[KeywordMatcher] = None
+
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """Get the process-wide matcher, built from the defaults on first use"""
+    global _matcher
+    if _matcher is None:
+        _matcher = KeywordMatcher(DEFAULT_KEYWORD_GROUPS)
+    return _matcher
+
+
+def set_keyword_matcher(matcher: KeywordMatcher):
+    """Replace the process-wide matcher; messages keep scores already cached"""
+    global _matcher
+    _matcher = matcher
+
+
+def keyword_scores(message) -> Mapping[str, float]:
+    """Get keyword group scores of a message, computing and caching them on first use"""
+    if message.keywords is None:
+        message.keywords = get_keyword_matcher().scores(message.content)
+    return message.keywords
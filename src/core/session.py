@@ -2,30 +2,133 @@
 Session Management - Manage conversation sessions
 """
 
+import sys
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict
-from pathlib import Path
-import json
+from typing import List, Optional, Dict, Sequence
 
-from storage.session_store import SessionStore
+from core.keywords import keyword_scores
+from llm.tokens import add_usage, count_message_tokens
+from storage.session_store import create_session_store
+
+
+def _to_epoch(value) -> object:
+    """Store naive datetimes as epoch floats; aware ones are kept as-is"""
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.timestamp()
+    return float(value)
+
+
+def _from_epoch(value) -> datetime:
+    """Datetime for a value stored by _to_epoch"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromtimestamp(value)
+
+
+def _dump_time(value, numeric: bool):
+    """Serialized timestamp: the epoch float itself when numeric, else ISO 8601"""
+    if numeric and not isinstance(value, datetime):
+        return value
+    return _from_epoch(value).isoformat()
+
+
+def _load_time(value):
+    """Timestamp from either serialized form"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern short repeated strings such as roles and agent names"""
+    return sys.intern(value) if isinstance(value, str) else value
 
 
-@dataclass
 class Message:
-    """Single message in conversation"""
-    role: str  # "user" or "agent"
-    agent_name: Optional[str] = None
-    content: str = ""
-    timestamp: datetime = field(default_factory=datetime.now)
+    """Single message in conversation
 
-    def to_dict(self) -> dict:
+    Slotted to keep long sessions small: no per-instance __dict__, role and
+    agent name are interned, and the timestamp is kept as an epoch float
+    that only becomes a datetime when read.
+    """
+
+    __slots__ = ("role", "agent_name", "content", "_ts", "metadata", "token_count", "token_counts", "keywords")
+
+    def __init__(
+        self,
+        role: str,  # "user" or "agent"
+        agent_name: Optional[str] = None,
+        content: str = "",
+        timestamp: Optional[datetime] = None,
+        metadata: Optional[Dict] = None,  # e.g. {"interrupted": True, "usage": {...}}
+        token_count: Optional[int] = None  # Estimated content tokens, cached on first count
+    ):
+        self.role = _intern(role)
+        self.agent_name = _intern(agent_name)
+        self.content = content
+        self._ts = _to_epoch(timestamp)
+        self.metadata = metadata if metadata is not None else {}
+        self.token_count = token_count
+        # Counts by provider estimators, cached on first count (not persisted)
+        self.token_counts = None
+        # Keyword group scores, cached on first match (not persisted)
+        self.keywords = None
+
+    @property
+    def timestamp(self) -> datetime:
+        return _from_epoch(self._ts)
+
+    @timestamp.setter
+    def timestamp(self, value: datetime):
+        self._ts = _to_epoch(value)
+
+    def replace(self, **changes) -> "Message":
+        """Copy of message with some fields changed"""
+        fields = {
+            "role": self.role,
+            "agent_name": self.agent_name,
+            "content": self.content,
+            "timestamp": self._ts,
+            "metadata": self.metadata,
+            "token_count": self.token_count
+        }
+        fields.update(changes)
+        return Message(**fields)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Message):
+            return NotImplemented
+        return (
+            self.role == other.role
+            and self.agent_name == other.agent_name
+            and self.content == other.content
+            and self.timestamp == other.timestamp
+            and self.metadata == other.metadata
+            and self.token_count == other.token_count
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Message(role={self.role!r}, agent_name={self.agent_name!r}, "
+            f"content={self.content!r}, timestamp={self.timestamp!r})"
+        )
+
+    def to_dict(self, numeric_time: bool = False) -> dict:
+        """Plain dict; numeric_time keeps the timestamp as epoch seconds"""
         return {
             "role": self.role,
             "agent_name": self.agent_name,
             "content": self.content,
-            "timestamp": self.timestamp.isoformat()
+            "timestamp": _dump_time(self._ts, numeric_time),
+            "metadata": self.metadata,
+            "token_count": self.token_count
         }
 
     @classmethod
@@ -34,28 +137,71 @@ class Message:
             role=data["role"],
             agent_name=data.get("agent_name"),
             content=data["content"],
-            timestamp=datetime.fromisoformat(data["timestamp"])
+            timestamp=_load_time(data["timestamp"]),
+            metadata=data.get("metadata", {}),
+            token_count=data.get("token_count")
         )
 
 
-@dataclass
 class Decision:
-    """Decision record"""
-    id: str
-    topic: str
-    decision: str
-    participants: List[str]
-    reasoning: str
-    timestamp: datetime = field(default_factory=datetime.now)
+    """Decision record
 
-    def to_dict(self) -> dict:
+    Slotted like Message; participant names are interned.
+    """
+
+    __slots__ = ("id", "topic", "decision", "participants", "reasoning", "_ts")
+
+    def __init__(
+        self,
+        id: str,
+        topic: str,
+        decision: str,
+        participants: List[str],
+        reasoning: str,
+        timestamp: Optional[datetime] = None
+    ):
+        self.id = id
+        self.topic = topic
+        self.decision = decision
+        self.participants = [_intern(name) for name in participants]
+        self.reasoning = reasoning
+        self._ts = _to_epoch(timestamp)
+
+    @property
+    def timestamp(self) -> datetime:
+        return _from_epoch(self._ts)
+
+    @timestamp.setter
+    def timestamp(self, value: datetime):
+        self._ts = _to_epoch(value)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Decision):
+            return NotImplemented
+        return (
+            self.id == other.id
+            and self.topic == other.topic
+            and self.decision == other.decision
+            and self.participants == other.participants
+            and self.reasoning == other.reasoning
+            and self.timestamp == other.timestamp
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Decision(id={self.id!r}, topic={self.topic!r}, decision={self.decision!r}, "
+            f"participants={self.participants!r}, timestamp={self.timestamp!r})"
+        )
+
+    def to_dict(self, numeric_time: bool = False) -> dict:
+        """Plain dict; numeric_time keeps the timestamp as epoch seconds"""
         return {
             "id": self.id,
             "topic": self.topic,
             "decision": self.decision,
             "participants": self.participants,
             "reasoning": self.reasoning,
-            "timestamp": self.timestamp.isoformat()
+            "timestamp": _dump_time(self._ts, numeric_time)
         }
 
     @classmethod
@@ -66,7 +212,7 @@ class Decision:
             decision=data["decision"],
             participants=data["participants"],
             reasoning=data["reasoning"],
-            timestamp=datetime.fromisoformat(data["timestamp"])
+            timestamp=_load_time(data["timestamp"])
         )
 
 
@@ -81,16 +227,79 @@ class Session:
     metadata: Dict = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
+    # Running totals, derived from messages rather than stored
+    token_count: int = field(default=0, init=False)
+    usage_totals: Dict[str, int] = field(default_factory=dict, init=False)
+    # Bumped on every change; compared against the last saved version
+    version: int = field(default=0, init=False)
+    # Bumped on every change to messages / decisions. Appends bump these by
+    # one along with the length, so `*_version - len(...)` only moves when
+    # existing entries are edited.
+    messages_version: int = field(default=0, init=False)
+    decisions_version: int = field(default=0, init=False)
+    # Guards mutation against concurrent saves from worker threads
+    lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        for message in self.messages:
+            self._account(message)
+
+    def _account(self, message: Message):
+        """Add message's token count and API usage to running totals"""
+        # Sizes the session for the session cache, so any estimate will do;
+        # prompt budgets count with the provider's estimator instead
+        self.token_count += count_message_tokens(message)
+        usage = message.metadata.get("usage")
+        if usage:
+            add_usage(self.usage_totals, usage)
 
     def add_message(self, message: Message):
         """Add message to session"""
-        self.messages.append(message)
-        self.updated_at = datetime.now()
+        with self.lock:
+            self.messages.append(message)
+            self._account(message)
+            keyword_scores(message)
+            self.touch(messages=True)
 
     def add_decision(self, decision: Decision):
         """Add decision to session"""
-        self.decisions.append(decision)
-        self.updated_at = datetime.now()
+        with self.lock:
+            self.decisions.append(decision)
+            self.touch(decisions=True)
+
+    def touch(self, messages: bool = False, decisions: bool = False):
+        """Mark session as changed, including its messages or decisions"""
+        with self.lock:
+            self.version += 1
+            self.messages_version += messages
+            self.decisions_version += decisions
+            self.updated_at = datetime.now()
+
+    def copy(self) -> "Session":
+        """Point-in-time copy for saving
+
+        Lists and metadata are copied; messages, decisions and metadata
+        values are shared, as they are replaced rather than changed in
+        place. Cheap enough to take under the lock: a lazily loaded message
+        list stays on disk.
+        """
+        with self.lock:
+            other = Session(
+                session_id=self.session_id,
+                product_name=self.product_name,
+                decisions=list(self.decisions),
+                current_stage=self.current_stage,
+                metadata=dict(self.metadata),
+                created_at=self.created_at,
+                updated_at=self.updated_at
+            )
+            other.messages = self.messages.copy()
+            other.token_count = self.token_count
+            other.usage_totals = dict(self.usage_totals)
+            other.version = self.version
+            other.messages_version = self.messages_version
+            other.decisions_version = self.decisions_version
+            return other
 
     def get_context_summary(self, max_tokens: int = 4000) -> str:
         """Get context summary for LLM calls"""
@@ -126,12 +335,17 @@ class Session:
         }
 
     @classmethod
-    def from_dict(cls, data: dict) -> "Session":
-        """Create session from dictionary"""
-        return cls(
+    def from_dict(cls, data: dict, messages: Optional[Sequence[Message]] = None) -> "Session":
+        """Create session from dictionary
+
+        `messages` may be passed separately, e.g. as a lazily loaded list;
+        the totals stored in data then cover its first `message_count`
+        messages and only later ones are counted.
+        """
+        session = cls(
             session_id=data["session_id"],
             product_name=data.get("product_name", ""),
-            messages=[Message.from_dict(m) for m in data.get("messages", [])],
+            messages=[Message.from_dict(m) for m in data.get("messages", [])] if messages is None else [],
             decisions=[Decision.from_dict(d) for d in data.get("decisions", [])],
             current_stage=data.get("current_stage", "initial"),
             metadata=data.get("metadata", {}),
@@ -139,14 +353,77 @@ class Session:
             updated_at=datetime.fromisoformat(data["updated_at"])
         )
 
+        if messages is not None:
+            session.messages = messages
+            session.token_count = data.get("token_count", 0)
+            session.usage_totals = dict(data.get("usage_totals", {}))
+            for message in messages[min(data.get("message_count", 0), len(messages)):]:
+                session._account(message)
+
+        return session
+
+
+# Session cache defaults, overridable via `session_cache` in cword.yaml
+DEFAULT_SESSION_CACHE_CONFIG = {
+    "max_sessions": 32,
+    "max_tokens": 2000000
+}
+
 
 class SessionManager:
-    """Manage conversation sessions"""
+    """Manage conversation sessions
+
+    Loaded sessions are kept in an LRU cache bounded by session count and
+    by total estimated tokens. Evicted sessions with unsaved changes are
+    written back first; the current session is never evicted. Saves write
+    a copy taken under the session's lock, so mutations never wait on disk.
+    """
 
     def __init__(self, config: dict):
         self.config = config
-        self.store = SessionStore(config)
+        self.store = create_session_store(config)
         self.current_session: Optional[Session] = None
+        cache_config = {**DEFAULT_SESSION_CACHE_CONFIG, **config.get("session_cache", {})}
+        self.max_sessions = int(cache_config["max_sessions"])
+        self.max_tokens = int(cache_config["max_tokens"])
+        # Cached sessions (least recently used first) and the version last saved for each
+        self.open_sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._saved_versions: Dict[str, int] = {}
+        self._cache_lock = threading.RLock()
+        # Keeps saves in order, so an older copy never lands after a newer one
+        self._write_lock = threading.Lock()
+
+    def _track(self, session: Session, saved: bool = True):
+        """Cache session; unsaved sessions start out dirty"""
+        with self._cache_lock:
+            self.open_sessions[session.session_id] = session
+            self.open_sessions.move_to_end(session.session_id)
+            self._saved_versions[session.session_id] = session.version if saved else -1
+        self._evict()
+
+    def _evict(self):
+        """Evict least recently used sessions until within budget"""
+        with self._cache_lock:
+            total_tokens = sum(session.token_count for session in self.open_sessions.values())
+            for session_id in list(self.open_sessions):
+                if len(self.open_sessions) <= self.max_sessions and total_tokens <= self.max_tokens:
+                    break
+
+                session = self.open_sessions[session_id]
+                if session is self.current_session:
+                    continue
+
+                if self.is_dirty(session):
+                    try:
+                        self._save(session)
+                    except Exception as e:
+                        # Keep it cached rather than lose changes
+                        print(f"Warning: Failed to write back session {session_id}: {e}")
+                        continue
+
+                del self.open_sessions[session_id]
+                self._saved_versions.pop(session_id, None)
+                total_tokens -= session.token_count
 
     def create_session(self, product_name: str = "") -> Session:
         """Create new session"""
@@ -156,11 +433,31 @@ class SessionManager:
             product_name=product_name
         )
         self.current_session = session
+        self._track(session)
         return session
 
     def get_session(self, session_id: str) -> Optional[Session]:
-        """Get session by ID"""
-        return self.store.load_session(session_id)
+        """Get session by ID, from the cache when loaded before"""
+        with self._cache_lock:
+            session = self.open_sessions.get(session_id)
+            if session is not None:
+                self.open_sessions.move_to_end(session_id)
+                return session
+
+        session = self.store.load_session(session_id)
+        if session:
+            self._track(session)
+        return session
+
+    def is_dirty(self, session: Session) -> bool:
+        """Check if session changed since it was last saved"""
+        return session.version != self._saved_versions.get(session.session_id)
+
+    def dirty_sessions(self) -> List[Session]:
+        """Cached sessions with unsaved changes"""
+        with self._cache_lock:
+            sessions = list(self.open_sessions.values())
+        return [session for session in sessions if self.is_dirty(session)]
 
     def get_current_session(self) -> Optional[Session]:
         """Get current active session"""
@@ -170,26 +467,62 @@ class SessionManager:
 
     def save_session(self, session_id: str):
         """Save session to storage"""
-        if self.current_session:
-            self.store.save_session(self.current_session)
+        session = self.open_sessions.get(session_id)
+        if session is None:
+            raise ValueError(f"Session {session_id} is not open")
+        self._save(session)
+
+    def _save(self, session: Session):
+        """Write session and record the saved version"""
+        with self._write_lock:
+            # Changes made during the write stay dirty
+            snapshot = session.copy()
+            self.store.save_session(snapshot)
+            self._saved_versions[session.session_id] = snapshot.version
 
     def update_session(self, session: Session):
         """Update session"""
-        session.updated_at = datetime.now()
-        if session.session_id == self.current_session.session_id:
+        session.touch()
+        if self.current_session and session.session_id == self.current_session.session_id:
             self.current_session = session
-        self.store.save_session(session)
+        self._track(session, saved=False)
+        self._save(session)
 
     def delete_session(self, session_id: str):
         """Delete session"""
         self.store.delete_session(session_id)
+        with self._cache_lock:
+            self.open_sessions.pop(session_id, None)
+            self._saved_versions.pop(session_id, None)
         if self.current_session and self.current_session.session_id == session_id:
             self.current_session = None
 
-    def list_sessions(self) -> List[Session]:
-        """List all sessions"""
-        return self.store.list_sessions()
+    def list_sessions(self, offset: int = 0, limit: Optional[int] = None) -> List[Session]:
+        """List sessions, most recently updated first
+
+        Open sessions are returned as cached; the rest are loaded without
+        entering the cache, so listing never evicts working sessions. Use
+        query_sessions() to list without loading anything.
+        """
+        sessions = []
+        for entry in self.store.query_sessions(offset=offset, limit=limit):
+            with self._cache_lock:
+                session = self.open_sessions.get(entry["session_id"])
+            if session is None:
+                session = self.store.load_session(entry["session_id"])
+            if session:
+                sessions.append(session)
+        return sessions
+
+    def query_sessions(self, **kwargs) -> List[Dict]:
+        """List session index entries without loading sessions
+
+        Accepts sort_by, descending, offset, limit and stage.
+        """
+        return self.store.query_sessions(**kwargs)
 
     def set_current_session(self, session: Session):
         """Set current active session"""
         self.current_session = session
+        if session.session_id not in self.open_sessions:
+            self._track(session, saved=False)
@@ -0,0 +1,160 @@
+"""
+Conversation Summarizer - Rolling, incremental conversation summaries
+"""
+
+import copy
+from typing import Dict, List
+
+from core.session import Session, Message
+
+
+# Key in Session.metadata holding the summary state
+SUMMARY_KEY = "summary"
+
+
+class ConversationSummarizer:
+    """Fold new messages into a hierarchical summary stored on the session
+
+    Every `interval` new messages are summarized into one level-0 entry.
+    When a level holds more than `fanout` entries they are merged into a
+    single entry one level up, so each update only pays for new content
+    plus an occasional bounded merge.
+
+    State in session.metadata["summary"]:
+        {"watermark": <messages folded>, "levels": [[...], ...], "text": "..."}
+    """
+
+    def __init__(
+        self,
+        llm_provider,
+        interval: int = 10,
+        fanout: int = 4,
+        max_tokens: int = 400,
+        language: str = "en"
+    ):
+        self.llm = llm_provider
+        self.interval = max(1, interval)
+        self.fanout = max(2, fanout)
+        self.max_tokens = max_tokens
+        self.language = language
+
+    @staticmethod
+    def get_state(session: Session) -> Dict:
+        """Get summary state from session, initializing it if missing"""
+        return session.metadata.setdefault(SUMMARY_KEY, {
+            "watermark": 0,
+            "levels": [],
+            "text": ""
+        })
+
+    @staticmethod
+    def get_summary(session: Session) -> str:
+        """Get current summary text (empty if none yet)"""
+        return session.metadata.get(SUMMARY_KEY, {}).get("text", "")
+
+    @staticmethod
+    def get_watermark(session: Session) -> int:
+        """Number of leading messages the summary covers"""
+        return session.metadata.get(SUMMARY_KEY, {}).get("watermark", 0)
+
+    def needs_update(self, session: Session) -> bool:
+        """Check if enough new messages arrived since the last update"""
+        return len(session.messages) - self.get_watermark(session) >= self.interval
+
+    async def update(self, session: Session) -> bool:
+        """Fold pending batches of new messages into the summary
+
+        Returns True if the summary changed.
+        """
+        state = copy.deepcopy(self.get_state(session))
+        changed = False
+
+        while len(session.messages) - state["watermark"] >= self.interval:
+            start = state["watermark"]
+            batch = session.messages[start:start + self.interval]
+
+            entry = await self._summarize_messages(batch, state["text"])
+            self._add_entry(state, 0, entry)
+            await self._compact(state)
+
+            state["watermark"] = start + len(batch)
+            state["text"] = self._render(state)
+
+            # Swap in a finished copy so a concurrent save never sees a half-updated state
+            with session.lock:
+                session.metadata[SUMMARY_KEY] = copy.deepcopy(state)
+                session.touch()
+            changed = True
+
+        return changed
+
+    def _add_entry(self, state: Dict, level: int, entry: str):
+        """Append entry at level, creating the level if needed"""
+        levels: List[List[str]] = state["levels"]
+        while len(levels) <= level:
+            levels.append([])
+        levels[level].append(entry)
+
+    async def _compact(self, state: Dict):
+        """Merge full levels into a summary one level up"""
+        level = 0
+        while level < len(state["levels"]):
+            entries = state["levels"][level]
+            if len(entries) > self.fanout:
+                merged = await self._merge_summaries(entries)
+                state["levels"][level] = []
+                self._add_entry(state, level + 1, merged)
+            level += 1
+
+    def _render(self, state: Dict) -> str:
+        """Render summary, oldest (highest level) first"""
+        parts = []
+        for entries in reversed(state["levels"]):
+            parts.extend(entries)
+        return "\n\n".join(parts)
+
+    async def _summarize_messages(self, messages: List[Message], previous: str) -> str:
+        """Summarize a batch of messages, using the running summary as context"""
+        transcript = "\n".join(
+            f"{self._speaker(msg)}: {msg.content}" for msg in messages
+        )
+
+        if self.language == "zh":
+            prompt = "请用简洁的要点总结以下对话片段，保留需求、决定、未解决的问题和关键数字。"
+            if previous:
+                prompt += f"\n\n此前的摘要（仅供参考，不要重复）：\n{previous}"
+            prompt += f"\n\n新的对话：\n{transcript}\n\n摘要："
+        else:
+            prompt = (
+                "Summarize the following conversation excerpt as concise bullet points. "
+                "Keep requirements, decisions, open questions and key numbers."
+            )
+            if previous:
+                prompt += f"\n\nEarlier summary (for context only, do not repeat):\n{previous}"
+            prompt += f"\n\nNew conversation:\n{transcript}\n\nSummary:"
+
+        response = await self.llm.generate(prompt, max_tokens=self.max_tokens, temperature=0.2)
+        return response.strip()
+
+    async def _merge_summaries(self, summaries: List[str]) -> str:
+        """Condense consecutive summaries into one"""
+        joined = "\n\n".join(summaries)
+
+        if self.language == "zh":
+            prompt = f"将以下按时间顺序排列的摘要合并为一份更短的要点摘要，保留所有决定和未解决的问题：\n\n{joined}\n\n合并摘要："
+        else:
+            prompt = (
+                "Merge the following chronological summaries into one shorter bullet-point "
+                f"summary. Keep every decision and open question.\n\n{joined}\n\nMerged summary:"
+            )
+
+        response = await self.llm.generate(prompt, max_tokens=self.max_tokens, temperature=0.2)
+        return response.strip()
+
+    def _speaker(self, message: Message) -> str:
+        """Label for message author"""
+        if message.role == "user":
+            return "User"
+        if message.role == "system":
+            return "System"
+        return message.agent_name or "Agent"
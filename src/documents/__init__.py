@@ -1,5 +1,15 @@
 """Documents Module"""
 
 from .generator import DocumentGenerator
+from .extraction import DocumentData, DocumentExtractor
+from .export import DocumentType, ExportPipeline, ExportResult, register_document_type
 
-__all__ = ["DocumentGenerator"]
+__all__ = [
+    "DocumentGenerator",
+    "DocumentData",
+    "DocumentExtractor",
+    "DocumentType",
+    "ExportPipeline",
+    "ExportResult",
+    "register_document_type"
+]
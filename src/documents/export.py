@@ -0,0 +1,135 @@
+"""
+Export Pipeline - Generate and save documents concurrently
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from core.session import Session
+from documents.generator import DocumentGenerator
+from storage.document_store import DocumentStore
+
+
+@dataclass(frozen=True)
+class DocumentType:
+    """Document the export pipeline can produce
+
+    generate(generator, session) renders the document; file_label names
+    the saved file and titles label it per language when reporting.
+    """
+    name: str
+    file_label: str
+    generate: Callable[[DocumentGenerator, Session], Awaitable[str]]
+    titles: Dict[str, str] = field(default_factory=dict)
+
+    def title(self, language: str = "en") -> str:
+        return self.titles.get(language) or self.titles.get("en") or self.file_label
+
+
+@dataclass
+class ExportResult:
+    """Outcome and timings of one exported document"""
+    document: DocumentType
+    path: Optional[Path] = None
+    generate_seconds: float = 0.0
+    write_seconds: float = 0.0
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# Built-in document types, in export order
+DOCUMENT_TYPES: Dict[str, DocumentType] = {}
+
+
+def register_document_type(document_type: DocumentType):
+    """Add (or replace) a document type exported by default"""
+    DOCUMENT_TYPES[document_type.name] = document_type
+
+
+register_document_type(DocumentType(
+    name="prd",
+    file_label="PRD",
+    generate=lambda generator, session: generator.generate_prd(session),
+    titles={"en": "PRD", "zh": "需求文档"}
+))
+register_document_type(DocumentType(
+    name="tech_spec",
+    file_label="Tech_Design",
+    generate=lambda generator, session: generator.generate_tech_spec(session),
+    titles={"en": "Tech Spec", "zh": "技术设计"}
+))
+register_document_type(DocumentType(
+    name="decision_history",
+    file_label="Decision_History",
+    generate=lambda generator, session: generator.generate_decision_history(session),
+    titles={"en": "Decision History", "zh": "决策记录"}
+))
+
+
+class ExportPipeline:
+    """Export documents of a session on one event loop
+
+    Every requested document is generated concurrently, and each is
+    written in a worker thread as soon as it is ready, so slow (LLM-backed)
+    generators overlap instead of adding up and file writes never block
+    the loop. A failing document is reported in its result without
+    stopping the others.
+    """
+
+    def __init__(
+        self,
+        generator: DocumentGenerator,
+        store: DocumentStore,
+        document_types: Optional[Dict[str, DocumentType]] = None,
+        format: str = "markdown"
+    ):
+        self.generator = generator
+        self.store = store
+        self.document_types = dict(DOCUMENT_TYPES if document_types is None else document_types)
+        self.format = format
+
+    def register(self, document_type: DocumentType):
+        """Add (or replace) a document type for this pipeline only"""
+        self.document_types[document_type.name] = document_type
+
+    async def export(
+        self,
+        session: Session,
+        product_name: Optional[str] = None,
+        names: Optional[List[str]] = None
+    ) -> List[ExportResult]:
+        """Generate and save documents, returning results in request order"""
+        if names is None:
+            names = list(self.document_types)
+        unknown = [name for name in names if name not in self.document_types]
+        if unknown:
+            raise ValueError(f"Unknown document types: {', '.join(unknown)}")
+
+        product_name = product_name or session.product_name or "Untitled_Product"
+        return list(await asyncio.gather(*(
+            self._export_one(self.document_types[name], session, product_name)
+            for name in names
+        )))
+
+    async def _export_one(self, document: DocumentType, session: Session, product_name: str) -> ExportResult:
+        """Generate one document, then save it off the loop"""
+        result = ExportResult(document)
+        started = time.perf_counter()
+        try:
+            content = await document.generate(self.generator, session)
+            generated = time.perf_counter()
+            result.generate_seconds = generated - started
+
+            result.path = await asyncio.to_thread(
+                self.store.save_document, product_name, document.file_label, content, self.format
+            )
+            result.write_seconds = time.perf_counter() - generated
+        except Exception as e:
+            result.error = e
+        return result
@@ -0,0 +1,214 @@
+"""
+Document Extraction - Structured document data from one LLM pass per session
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple
+
+from pydantic import BaseModel, Field, ValidationError
+
+from core.session import Session
+
+
+class TargetUser(BaseModel):
+    """Target user group"""
+    name: str
+    description: str = ""
+
+
+class UserStory(BaseModel):
+    """User story"""
+    title: str
+    user: str = ""
+    goal: str = ""
+    story: str = ""
+
+
+class FeatureSet(BaseModel):
+    """Features by priority"""
+    p0: List[str] = Field(default_factory=list)
+    p1: List[str] = Field(default_factory=list)
+    p2: List[str] = Field(default_factory=list)
+
+
+class TechStack(BaseModel):
+    """Chosen technologies"""
+    backend: str = "To be determined"
+    frontend: str = "To be determined"
+    database: str = "To be determined"
+
+
+class DocumentData(BaseModel):
+    """Every field the PRD, tech spec and preview draw from the conversation
+
+    Defaults are the placeholders rendered when nothing was extracted.
+    """
+    product_background: str = "Product background based on conversation..."
+    target_users: List[TargetUser] = Field(
+        default_factory=lambda: [TargetUser(name="User", description="Target user to be determined")]
+    )
+    core_value: str = "Core value proposition to be determined..."
+    user_stories: List[UserStory] = Field(default_factory=list)
+    features: FeatureSet = Field(default_factory=FeatureSet)
+    architecture: str = "System architecture to be designed..."
+    tech_stack: TechStack = Field(default_factory=TechStack)
+
+
+class DocumentExtractor:
+    """Extract DocumentData from a session with a single LLM call
+
+    The model is given the JSON schema of DocumentData and its reply is
+    validated against it; an invalid reply gets one repair attempt with
+    the validation errors. Results are cached per session and reused until
+    the session's messages, decisions or product name change, and callers
+    asking while an extraction is running share it, so one export makes
+    at most one call however many documents it renders.
+    """
+
+    # Sessions whose extraction is kept
+    CACHE_SESSIONS = 32
+
+    def __init__(
+        self,
+        llm_provider,
+        max_input_tokens: int = 8000,
+        max_tokens: int = 2000,
+        language: str = "en"
+    ):
+        self.llm = llm_provider
+        self.max_input_tokens = max_input_tokens
+        self.max_tokens = max_tokens
+        self.language = language
+        # session id -> (inputs key, DocumentData or running task)
+        self._cache: "OrderedDict[str, Tuple[Tuple, object]]" = OrderedDict()
+        # Background extractions, referenced until done so they aren't collected
+        self._background: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def cache_key(session: Session) -> Tuple:
+        """Version of the inputs an extraction depends on"""
+        return (session.product_name, session.messages_version, session.decisions_version)
+
+    def cached(self, session: Session) -> Optional[DocumentData]:
+        """Finished extraction for the current session state, if any"""
+        entry = self._cache.get(session.session_id)
+        if entry and entry[0] == self.cache_key(session) and isinstance(entry[1], DocumentData):
+            return entry[1]
+        return None
+
+    def prefetch(self, session: Session):
+        """Start extracting in the background unless a result is cached
+
+        An extraction already running for the same session state is not
+        started again.
+        """
+        if self.cached(session) is None:
+            task = asyncio.ensure_future(self.extract(session))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def extract(self, session: Session) -> Optional[DocumentData]:
+        """Document data for session, or None if extraction failed"""
+        key = self.cache_key(session)
+        entry = self._cache.get(session.session_id)
+        if entry and entry[0] == key:
+            self._cache.move_to_end(session.session_id)
+            if isinstance(entry[1], DocumentData):
+                return entry[1]
+            task = entry[1]
+        else:
+            task = asyncio.ensure_future(self._extract(session))
+            self._cache[session.session_id] = (key, task)
+            while len(self._cache) > self.CACHE_SESSIONS:
+                self._cache.popitem(last=False)
+
+        data = await asyncio.shield(task)
+        entry = self._cache.get(session.session_id)
+        if entry and entry[1] is task:
+            if data is None:
+                # Don't keep failures; the next export tries again
+                del self._cache[session.session_id]
+            else:
+                self._cache[session.session_id] = (key, data)
+        return data
+
+    async def _extract(self, session: Session) -> Optional[DocumentData]:
+        """Run the extraction call, repairing an invalid reply once"""
+        prompt = self._build_prompt(session)
+        try:
+            response = await self.llm.generate(prompt, max_tokens=self.max_tokens, temperature=0.0)
+            try:
+                return self._parse(response)
+            except (ValidationError, ValueError) as e:
+                repair = (
+                    f"{prompt}\n\nYour previous reply was not valid:\n{e}\n\n"
+                    "Reply again with only the corrected JSON object."
+                )
+                response = await self.llm.generate(repair, max_tokens=self.max_tokens, temperature=0.0)
+                return self._parse(response)
+        except Exception as e:
+            print(f"Warning: Document extraction failed: {e}")
+            return None
+
+    @staticmethod
+    def _parse(response: str) -> DocumentData:
+        """Validate the JSON object in response against the schema"""
+        start, end = response.find("{"), response.rfind("}")
+        if start < 0 or end < start:
+            raise ValueError("reply contains no JSON object")
+        return DocumentData.model_validate_json(response[start:end + 1])
+
+    def _build_prompt(self, session: Session) -> str:
+        """Prompt with the schema, decisions and as much conversation as fits"""
+        schema = json.dumps(DocumentData.model_json_schema(), ensure_ascii=False)
+        decisions = "\n".join(
+            f"- {d.topic}: {d.decision} ({d.reasoning})" if d.reasoning else f"- {d.topic}: {d.decision}"
+            for d in session.decisions
+        ) or "-"
+
+        if self.language == "zh":
+            instructions = (
+                "根据以下产品讨论，提取编写产品需求文档和技术设计文档所需的信息。"
+                "只输出一个符合 JSON Schema 的 JSON 对象，不要输出其他内容。"
+                "字段值用中文书写；讨论中没有的信息请保留默认值。"
+            )
+        else:
+            instructions = (
+                "From the product discussion below, extract the information needed for a "
+                "product requirements document and a technical design document. Reply with "
+                "only one JSON object matching the JSON schema. Keep the default for anything "
+                "the discussion doesn't cover."
+            )
+
+        return (
+            f"{instructions}\n\nJSON schema:\n{schema}\n\n"
+            f"Product: {session.product_name or '-'}\n\n"
+            f"Decisions:\n{decisions}\n\n"
+            f"Conversation:\n{self._transcript(session)}\n\nJSON:"
+        )
+
+    def _transcript(self, session: Session) -> str:
+        """Rolling summary plus the most recent messages within the token budget"""
+        # Imported here: core.summarizer is only needed for its metadata layout
+        from core.summarizer import SUMMARY_KEY
+
+        summary = session.metadata.get(SUMMARY_KEY, {})
+        budget = self.max_input_tokens
+        parts: List[str] = []
+        if summary.get("text"):
+            parts.append(f"Summary of earlier conversation:\n{summary['text']}")
+            budget -= self.llm.count_tokens(summary["text"])
+
+        lines: List[str] = []
+        for message in reversed(session.messages[summary.get("watermark", 0):]):
+            speaker = "User" if message.role == "user" else message.agent_name or message.role
+            line = f"{speaker}: {message.content}"
+            budget -= self.llm.count_tokens(line)
+            if budget < 0 and lines:
+                break
+            lines.append(line)
+
+        parts.append("\n".join(reversed(lines)))
+        return "\n\n".join(parts)
@@ -2,21 +2,49 @@
 Document Generator - Generate PRD and technical design documents
 """
 
-from jinja2 import Environment, FileSystemLoader, Template
+import threading
+from collections import OrderedDict
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+from jinja2 import TemplateError, TemplateNotFound
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
 from core.session import Session
+from documents.extraction import DocumentData, DocumentExtractor
+
+
+# Compiled template bytecode, overridable via documents.template_cache
+# (null = compile in memory only)
+DEFAULT_TEMPLATE_CACHE_DIR = "~/.cword/cache/jinja"
 
 
 class DocumentGenerator:
     """Generate documents from session data"""
 
-    def __init__(self, config: dict):
+    # Sessions whose rendered preview sections are kept
+    PREVIEW_CACHE_SESSIONS = 32
+    # Messages shown as user scenarios in the preview
+    PREVIEW_SCENARIOS = 5
+
+    # Shared per (template dir, bytecode cache dir), so compiled templates
+    # outlive any one generator
+    _environments: Dict[Tuple[str, Optional[str]], Environment] = {}
+    # Built-in templates, compiled once on first use
+    _default_templates: Dict[str, Template] = {}
+    _templates_lock = threading.Lock()
+
+    def __init__(self, config: dict, extractor: Optional[DocumentExtractor] = None):
         self.config = config
+        # Fills document fields from the conversation; placeholders without it
+        self.extractor = extractor
         self.template_dir = self._get_template_dir()
-        self.env = Environment(loader=FileSystemLoader(self.template_dir))
+        self.env = self._get_environment(
+            self.template_dir,
+            config.get("documents", {}).get("template_cache", DEFAULT_TEMPLATE_CACHE_DIR)
+        )
+        # Rendered preview sections per session id, keyed on their inputs
+        self._preview_cache: "OrderedDict[str, Dict]" = OrderedDict()
 
     def _get_template_dir(self) -> Path:
         """Get templates directory"""
@@ -34,16 +62,71 @@ class DocumentGenerator:
         default_templates = Path(__file__).parent / "templates"
         return str(default_templates)
 
+    @classmethod
+    def _get_environment(cls, template_dir: str, cache_dir: Optional[str]) -> Environment:
+        """Get the shared environment for template_dir
+
+        The environment keeps compiled templates for the life of the
+        process and re-checks each file's mtime before reusing it
+        (auto_reload). Bytecode goes to cache_dir, keyed on the template
+        source, so a fresh process skips compiling unchanged templates.
+        """
+        key = (template_dir, cache_dir)
+        with cls._templates_lock:
+            env = cls._environments.get(key)
+            if env is None:
+                env = Environment(
+                    loader=FileSystemLoader(template_dir),
+                    bytecode_cache=cls._create_bytecode_cache(cache_dir),
+                    auto_reload=True
+                )
+                cls._environments[key] = env
+            return env
+
+    @staticmethod
+    def _create_bytecode_cache(cache_dir: Optional[str]) -> Optional[FileSystemBytecodeCache]:
+        """Bytecode cache in cache_dir, or None if disabled or unusable"""
+        if not cache_dir:
+            return None
+        path = Path(cache_dir).expanduser()
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f"Warning: Template cache disabled, cannot create {path}: {e}")
+            return None
+        return FileSystemBytecodeCache(str(path))
+
+    @classmethod
+    def _get_default_template(cls, name: str) -> Template:
+        """Built-in template for name, compiled on first use"""
+        with cls._templates_lock:
+            template = cls._default_templates.get(name)
+            if template is None:
+                sources = {
+                    "prd_template.md": cls._get_default_prd_template,
+                    "tech_spec_template.md": cls._get_default_tech_spec_template,
+                    "decision_record_template.md": cls._get_default_decision_template
+                }
+                template = Template(sources[name]())
+                cls._default_templates[name] = template
+            return template
+
+    def _get_template(self, name: str) -> Template:
+        """Template from the template directory, else the built-in one"""
+        try:
+            return self.env.get_template(name)
+        except TemplateNotFound:
+            return self._get_default_template(name)
+        except TemplateError as e:
+            print(f"Warning: Failed to load template {name}, using built-in: {e}")
+            return self._get_default_template(name)
+
     async def generate_prd(self, session: Session) -> str:
         """Generate PRD document"""
-        try:
-            template = self.env.get_template("prd_template.md")
-        except:
-            # Use built-in template if file doesn't exist
-            template = Template(self._get_default_prd_template())
+        template = self._get_template("prd_template.md")
 
         # Extract data from session
-        data = self._extract_prd_data(session)
+        data = self._extract_prd_data(session, await self._document_data(session))
 
         # Render template
         content = template.render(**data)
@@ -52,13 +135,10 @@ class DocumentGenerator:
 
     async def generate_tech_spec(self, session: Session) -> str:
         """Generate technical design document"""
-        try:
-            template = self.env.get_template("tech_spec_template.md")
-        except:
-            template = Template(self._get_default_tech_spec_template())
+        template = self._get_template("tech_spec_template.md")
 
         # Extract data from session
-        data = self._extract_tech_data(session)
+        data = self._extract_tech_data(session, await self._document_data(session))
 
         # Render template
         content = template.render(**data)
@@ -67,10 +147,7 @@ class DocumentGenerator:
 
     async def generate_decision_history(self, session: Session) -> str:
         """Generate decision history"""
-        try:
-            template = self.env.get_template("decision_record_template.md")
-        except:
-            template = Template(self._get_default_decision_template())
+        template = self._get_template("decision_record_template.md")
 
         data = {
             "product_name": session.product_name or "Untitled",
@@ -82,7 +159,20 @@ class DocumentGenerator:
         return content
 
     async def generate_realtime_preview(self, session: Session) -> str:
-        """Generate real-time document preview"""
+        """Generate real-time document preview
+
+        Sections are cached per session and re-rendered only when their
+        inputs change; decision lists render just the decisions added
+        since the last preview. Extracted data is only used once cached:
+        a stale extraction is refreshed in the background, and placeholders
+        are shown meanwhile, so the preview never waits on the LLM.
+        """
+        extracted = None
+        if self.extractor is not None:
+            extracted = self.extractor.cached(session)
+            if extracted is None:
+                self.extractor.prefetch(session)
+
         # Simplified preview for display during conversation
         preview = f"""
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -95,10 +185,10 @@ class DocumentGenerator:
 
 ## 2. Requirements Analysis
 ### 2.1 User Scenarios
-{self._extract_user_scenarios(session)}
+{self._extract_user_scenarios(session, extracted)}
 
 ### 2.2 Functional Requirements
-{self._extract_features_summary(session)}
+{self._extract_features_summary(session, extracted)}
 
 ## 3. Technical Solution
 {self._extract_tech_summary(session)}
@@ -107,21 +197,34 @@ class DocumentGenerator:
 """
         return preview
 
-    def _extract_prd_data(self, session: Session) -> Dict:
+    async def _document_data(self, session: Session) -> DocumentData:
+        """Extracted document fields, or placeholders if unavailable
+
+        The extractor caches its result per session state, so the PRD and
+        tech spec of an unchanged session share one LLM call, which the
+        preview then reuses.
+        """
+        if self.extractor is not None:
+            data = await self.extractor.extract(session)
+            if data is not None:
+                return data
+        return DocumentData()
+
+    def _extract_prd_data(self, session: Session, extracted: DocumentData) -> Dict:
         """Extract data for PRD template"""
         return {
             "product_name": session.product_name or "Untitled",
             "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "version": "1.0.0",
-            "product_background": self._extract_background(session),
-            "target_users": self._extract_users(session),
-            "core_value": self._extract_value(session),
-            "user_stories": self._extract_stories(session),
-            "features": self._extract_features(session),
+            "product_background": self._extract_background(extracted),
+            "target_users": self._extract_users(extracted),
+            "core_value": self._extract_value(extracted),
+            "user_stories": self._extract_stories(extracted),
+            "features": self._extract_features(extracted),
             "decisions": session.decisions
         }
 
-    def _extract_tech_data(self, session: Session) -> Dict:
+    def _extract_tech_data(self, session: Session, extracted: DocumentData) -> Dict:
         """Extract data for technical design template"""
         tech_decisions = [
             d for d in session.decisions
@@ -131,77 +234,127 @@ class DocumentGenerator:
         return {
             "product_name": session.product_name or "Untitled",
             "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "architecture": self._infer_architecture(session),
+            "architecture": self._infer_architecture(extracted),
             "tech_decisions": tech_decisions,
-            "tech_stack": self._infer_tech_stack(session)
+            "tech_stack": self._infer_tech_stack(extracted)
         }
 
-    def _extract_user_scenarios(self, session: Session) -> str:
+    def _preview_sections(self, session: Session) -> Dict:
+        """Cached preview sections of session (most recently used kept)"""
+        cache = self._preview_cache.get(session.session_id)
+        if cache is None:
+            cache = {}
+            self._preview_cache[session.session_id] = cache
+            while len(self._preview_cache) > self.PREVIEW_CACHE_SESSIONS:
+                self._preview_cache.popitem(last=False)
+        else:
+            self._preview_cache.move_to_end(session.session_id)
+        return cache
+
+    def _cached_section(self, session: Session, name: str, key, render: Callable[[], str]) -> str:
+        """Rendered section, re-rendered only when its key changed"""
+        cache = self._preview_sections(session)
+        entry = cache.get(name)
+        if entry is None or entry[0] != key:
+            entry = (key, render())
+            cache[name] = entry
+        return entry[1]
+
+    def _decision_summary(self, session: Session, name: str, select: Callable) -> str:
+        """Bullet list of selected decisions, rendering only those added since last time"""
+        cache = self._preview_sections(session)
+        count = len(session.decisions)
+        # Unchanged unless existing decisions were edited (see Session)
+        edits = session.decisions_version - count
+
+        entry = cache.get(name)
+        if entry is None or entry["edits"] != edits or entry["count"] > count:
+            entry = {"edits": edits, "count": 0, "text": ""}
+            cache[name] = entry
+
+        if entry["count"] < count:
+            lines = [f"- {d.decision}" for d in session.decisions[entry["count"]:] if select(d)]
+            if lines:
+                entry["text"] = "\n".join(([entry["text"]] if entry["text"] else []) + lines)
+            entry["count"] = count
+
+        return entry["text"] or "To be discussed..."
+
+    def _extract_user_scenarios(self, session: Session, extracted: Optional[DocumentData] = None) -> str:
         """Extract user scenarios from conversation"""
-        # This would use LLM to extract structured info
-        # For now, return placeholder
-        return "\n".join([f"- {msg.content[:100]}..." for msg in session.messages[:5]])
-
-    def _extract_features_summary(self, session: Session) -> str:
+        if extracted and extracted.user_stories:
+            stories = extracted.user_stories[:self.PREVIEW_SCENARIOS]
+            return self._cached_section(
+                session,
+                "scenarios",
+                ("extracted", self.extractor.cache_key(session)),
+                lambda: "\n".join(f"- {story.title}: {story.story or story.goal}" for story in stories)
+            )
+
+        # Without extraction, show the opening messages
+        shown = min(len(session.messages), self.PREVIEW_SCENARIOS)
+        # Only the first messages are shown, so later appends don't change this
+        key = (shown, session.messages_version - len(session.messages))
+        return self._cached_section(
+            session,
+            "scenarios",
+            key,
+            lambda: "\n".join([f"- {msg.content[:100]}..." for msg in session.messages[:shown]])
+        )
+
+    def _extract_features_summary(self, session: Session, extracted: Optional[DocumentData] = None) -> str:
         """Extract feature summary"""
-        if not session.decisions:
-            return "To be discussed..."
-
-        features = []
-        for decision in session.decisions:
-            features.append(f"- {decision.decision}")
-
-        return "\n".join(features)
+        if extracted and (extracted.features.p0 or extracted.features.p1):
+            features = extracted.features
+            return self._cached_section(
+                session,
+                "extracted_features",
+                self.extractor.cache_key(session),
+                lambda: "\n".join(
+                    [f"- [P0] {feature}" for feature in features.p0]
+                    + [f"- [P1] {feature}" for feature in features.p1]
+                )
+            )
+        return self._decision_summary(session, "features", lambda decision: True)
 
     def _extract_tech_summary(self, session: Session) -> str:
         """Extract technical summary"""
-        tech_decisions = [
-            d for d in session.decisions
-            if "technical" in d.topic.lower() or "技术" in d.topic
-        ]
+        return self._decision_summary(
+            session,
+            "tech",
+            lambda d: "technical" in d.topic.lower() or "技术" in d.topic
+        )
 
-        if not tech_decisions:
-            return "To be discussed..."
-
-        return "\n".join([f"- {d.decision}" for d in tech_decisions])
-
-    def _extract_background(self, session: Session) -> str:
+    def _extract_background(self, extracted: DocumentData) -> str:
         """Extract product background"""
-        return "Product background based on conversation..."
+        return extracted.product_background
 
-    def _extract_users(self, session: Session) -> List:
+    def _extract_users(self, extracted: DocumentData) -> List:
         """Extract target users"""
-        return [{"name": "User", "description": "Target user to be determined"}]
+        return [user.model_dump() for user in extracted.target_users]
 
-    def _extract_value(self, session: Session) -> str:
+    def _extract_value(self, extracted: DocumentData) -> str:
         """Extract core value"""
-        return "Core value proposition to be determined..."
+        return extracted.core_value
 
-    def _extract_stories(self, session: Session) -> List:
+    def _extract_stories(self, extracted: DocumentData) -> List:
         """Extract user stories"""
-        return []
+        return [story.model_dump() for story in extracted.user_stories]
 
-    def _extract_features(self, session: Session) -> Dict:
+    def _extract_features(self, extracted: DocumentData) -> Dict:
         """Extract features"""
-        return {
-            "p0": [],
-            "p1": [],
-            "p2": []
-        }
+        return extracted.features.model_dump()
 
-    def _infer_architecture(self, session: Session) -> str:
+    def _infer_architecture(self, extracted: DocumentData) -> str:
         """Infer system architecture from decisions"""
-        return "System architecture to be designed..."
+        return extracted.architecture
 
-    def _infer_tech_stack(self, session: Session) -> Dict:
+    def _infer_tech_stack(self, extracted: DocumentData) -> Dict:
         """Infer technology stack"""
-        return {
-            "backend": "To be determined",
-            "frontend": "To be determined",
-            "database": "To be determined"
-        }
+        return extracted.tech_stack.model_dump()
 
-    def _get_default_prd_template(self) -> str:
+    @staticmethod
+    def _get_default_prd_template() -> str:
         """Get default PRD template"""
         return """# {{ product_name }} Product Requirements Document (PRD)
 
@@ -267,7 +420,8 @@ class DocumentGenerator:
 **End of Document**
 """
 
-    def _get_default_tech_spec_template(self) -> str:
+    @staticmethod
+    def _get_default_tech_spec_template() -> str:
         """Get default technical spec template"""
         return """# {{ product_name }} Technical Design Document
 
@@ -325,7 +479,8 @@ class DocumentGenerator:
 **End of Document**
 """
 
-    def _get_default_decision_template(self) -> str:
+    @staticmethod
+    def _get_default_decision_template() -> str:
         """Get default decision record template"""
         return """# {{ product_name }} Decision History
 
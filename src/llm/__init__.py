@@ -1,11 +1,26 @@
 """LLM Module"""
 
-from .base import LLMProvider
+from .base import LLMProvider, LLMError, ChatPrompt
 from .providers import AnthropicProvider, OpenAIProvider, create_llm_provider
+from .registry import ClientRegistry
+from .cache import ResponseCache, CachedLLMProvider
+from .scheduler import RequestScheduler, TokenBucket
+from .tokens import TokenEstimator, count_tokens, get_estimator, register_estimator
 
 __all__ = [
     "LLMProvider",
+    "LLMError",
+    "ChatPrompt",
     "AnthropicProvider",
     "OpenAIProvider",
-    "create_llm_provider"
+    "create_llm_provider",
+    "ClientRegistry",
+    "ResponseCache",
+    "CachedLLMProvider",
+    "RequestScheduler",
+    "TokenBucket",
+    "TokenEstimator",
+    "count_tokens",
+    "get_estimator",
+    "register_estimator"
 ]
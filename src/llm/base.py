@@ -2,17 +2,97 @@
 LLM Provider Base Class
 """
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import AsyncIterator, Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from llm.tokens import add_usage, get_estimator
+
+
+# Timeouts in seconds; `total` bounds a whole request or stream (None = unbounded)
+DEFAULT_TIMEOUTS = {
+    "connect": 10.0,
+    "read": 60.0,
+    "total": None
+}
+
+
+def normalize_timeouts(value) -> Dict[str, Optional[float]]:
+    """Normalize `timeout` config into connect/read/total seconds
+
+    A plain number is taken as the read timeout (and caps connect); a
+    dict may set any of connect, read and total.
+    """
+    timeouts = dict(DEFAULT_TIMEOUTS)
+
+    if isinstance(value, dict):
+        for name in timeouts:
+            if value.get(name) is not None:
+                timeouts[name] = float(value[name])
+    elif value is not None:
+        timeouts["read"] = float(value)
+        timeouts["connect"] = min(timeouts["connect"], float(value))
+
+    return timeouts
+
+
+class ChatPrompt(str):
+    """Structured prompt: a system prompt plus role-tagged turns
+
+    Subclasses str with a flattened rendering, so providers that only
+    accept plain text keep working; the built-in providers send the
+    structured form. The system prompt and the turns up to each index in
+    `cache_breakpoints` are stable prefixes that providers may cache.
+    """
+
+    def __new__(
+        cls,
+        system: str,
+        messages: List[Dict[str, str]],
+        cache_breakpoints: Sequence[int] = ()
+    ):
+        flat = system + "\n\n" + "\n".join(
+            f"{turn['role']}: {turn['content']}" for turn in messages
+        )
+        prompt = super().__new__(cls, flat)
+        prompt.system = system
+        prompt.messages = messages
+        prompt.cache_breakpoints = tuple(cache_breakpoints)
+        return prompt
+
+
+class LLMError(RuntimeError):
+    """LLM API error carrying retry information"""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        retryable: bool = False
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = retryable
 
 
 class LLMProvider(ABC):
     """Abstract base class for LLM providers"""
 
-    def __init__(self, model: str, api_key: str, **kwargs):
+    # Provider name used to pick a token estimator
+    provider_name = "default"
+
+    def __init__(self, model: str, api_key: str, scheduler=None, **kwargs):
         self.model = model
         self.api_key = api_key
+        self.scheduler = scheduler
+        self.timeouts = normalize_timeouts(kwargs.get("timeout"))
         self.kwargs = kwargs
+        self.token_estimator = get_estimator(self.provider_name, model)
+        self.last_usage: Dict[str, int] = {}
+        self.usage_totals: Dict[str, int] = {}
 
     @abstractmethod
     async def generate(
@@ -34,14 +114,82 @@ class LLMProvider(ABC):
         """Generate text with streaming"""
         pass
 
-    def count_tokens(self, text: str) -> int:
-        """Estimate token count (rough approximation)"""
-        # Rough estimate: ~4 characters per token for English
-        # For Chinese, ~2 characters per token
-        chinese_chars = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
-        non_chinese = len(text) - chinese_chars
+    def _deadline(self) -> Optional[float]:
+        """Loop time by which a request starting now must finish (None = unbounded)"""
+        total = self.timeouts["total"]
+        if total is None:
+            return None
+        return asyncio.get_running_loop().time() + total
+
+    async def _with_total_timeout(self, awaitable: Awaitable, deadline: Optional[float] = None):
+        """Bound a single request attempt by the total timeout
+
+        Pass the request's deadline to share one total across its steps,
+        e.g. opening a stream and then reading it.
+        """
+        if deadline is None:
+            deadline = self._deadline()
+        if deadline is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, max(0.0, deadline - asyncio.get_running_loop().time()))
+
+    async def _iter_with_deadline(self, stream, deadline: Optional[float] = None) -> AsyncIterator:
+        """Iterate stream, failing once the total timeout (or deadline) has passed"""
+        if deadline is None:
+            deadline = self._deadline()
+        if deadline is None:
+            async for item in stream:
+                yield item
+            return
 
-        return (chinese_chars // 2) + (non_chinese // 4)
+        loop = asyncio.get_running_loop()
+        iterator = stream.__aiter__()
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            try:
+                item = await asyncio.wait_for(iterator.__anext__(), remaining)
+            except StopAsyncIteration:
+                return
+            yield item
+
+    @staticmethod
+    async def _close_stream(stream):
+        """Close SDK stream so the connection returns to the pool"""
+        close = getattr(stream, "close", None)
+        if close is None:
+            close = getattr(stream, "aclose", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def _request(self, request_fn: Callable[[], Awaitable], estimated_tokens: int = 0):
+        """Run request through the scheduler, if any"""
+        self.last_usage = {}
+        if self.scheduler is None:
+            return await request_fn()
+        return await self.scheduler.run(request_fn, estimated_tokens)
+
+    @asynccontextmanager
+    async def _stream(self, request_fn: Callable[[], Awaitable], estimated_tokens: int = 0):
+        """Open stream through the scheduler, if any, holding its slot until closed"""
+        self.last_usage = {}
+        if self.scheduler is None:
+            yield await request_fn()
+            return
+        async with self.scheduler.stream(request_fn, estimated_tokens) as stream:
+            yield stream
+
+    def record_usage(self, usage: Dict[str, int]):
+        """Record API usage, including prompt cache hits"""
+        self.last_usage = usage
+        add_usage(self.usage_totals, usage)
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens with this provider's estimator"""
+        return self.token_estimator.count(text)
 
     def validate_api_key(self) -> bool:
         """Validate API key"""
@@ -0,0 +1,241 @@
+"""
+LLM Response Cache - In-memory LRU backed by an on-disk store
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from llm.base import LLMProvider
+
+
+# Cache defaults, overridable via `llm.cache` in cword.yaml
+DEFAULT_CACHE_CONFIG = {
+    "enabled": False,
+    "directory": "~/.cword/cache/llm",
+    "max_memory_entries": 256,
+    "max_disk_mb": 200,
+    "ttl": 86400
+}
+
+
+class ResponseCache:
+    """Cache LLM responses as chunk lists so streams can be replayed
+
+    Disk lookups run in worker threads while the event loop reads memory,
+    so the in-memory LRU is guarded by a lock.
+    """
+
+    # Check disk size limit every N writes rather than on each one
+    PRUNE_EVERY = 50
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = {**DEFAULT_CACHE_CONFIG, **(config or {})}
+        self.enabled = bool(self.config["enabled"])
+        self.max_memory_entries = int(self.config["max_memory_entries"])
+        self.max_disk_bytes = int(float(self.config["max_disk_mb"]) * 1024 * 1024)
+        self.ttl = self.config["ttl"]
+        self.cache_dir = Path(self.config["directory"]).expanduser()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        """Build cache key from request parameters"""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        raw = f"{model}\x00{prompt_hash}\x00{temperature}\x00{max_tokens}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _is_expired(self, created_at: float) -> bool:
+        """Check if entry is older than ttl"""
+        return bool(self.ttl) and time.time() - created_at > self.ttl
+
+    def _entry_path(self, key: str) -> Path:
+        """Get on-disk path for key"""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get_memory(self, key: str) -> Optional[List[str]]:
+        """Look up key in the in-memory LRU only"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+
+            created_at, chunks = entry
+            if self._is_expired(created_at):
+                del self._memory[key]
+                return None
+
+            self._memory.move_to_end(key)
+            return chunks
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Look up cached chunks in memory, then on disk"""
+        chunks = self.get_memory(key)
+        if chunks is not None:
+            self.hits += 1
+            return chunks
+
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if self._is_expired(data.get("created_at", 0)):
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+        # Touch so disk pruning evicts least recently used entries first
+        os.utime(path)
+        chunks = data["chunks"]
+        self._remember(key, data["created_at"], chunks)
+        self.hits += 1
+        return chunks
+
+    def set(self, key: str, chunks: List[str]):
+        """Store chunks in memory and on disk"""
+        created_at = time.time()
+        self._remember(key, created_at, chunks)
+
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"created_at": created_at, "chunks": chunks}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune_disk()
+
+    def _remember(self, key: str, created_at: float, chunks: List[str]):
+        """Insert into the in-memory LRU, evicting the oldest entries"""
+        with self._lock:
+            self._memory[key] = (created_at, chunks)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def prune_disk(self):
+        """Evict expired and least recently used files over the size limit"""
+        if not self.cache_dir.exists():
+            return
+
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if self.ttl and time.time() - stat.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._memory.clear()
+        for path in self.cache_dir.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+
+
+class CachedLLMProvider(LLMProvider):
+    """Provider wrapper serving repeated requests from a ResponseCache"""
+
+    def __init__(self, provider: LLMProvider, cache: ResponseCache):
+        super().__init__(provider.model, provider.api_key, **provider.kwargs)
+        self.provider = provider
+        self.cache = cache
+        self.token_estimator = provider.token_estimator
+
+    def __getattr__(self, name):
+        # Expose wrapped provider attributes such as client
+        return getattr(self.provider, name)
+
+    async def _lookup(self, key: str) -> Optional[List[str]]:
+        """Check memory first, then read disk off the event loop"""
+        # Cache hits cost no API tokens
+        self.last_usage = {}
+        chunks = self.cache.get_memory(key)
+        if chunks is not None:
+            self.cache.hits += 1
+            return chunks
+        return await asyncio.to_thread(self.cache.get, key)
+
+    def _record_inner_usage(self):
+        """Copy usage reported by the wrapped provider for the last request"""
+        usage = getattr(self.provider, "last_usage", None)
+        if usage:
+            self.record_usage(usage)
+
+    async def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 2000,
+        temperature: float = 0.7
+    ) -> str:
+        """Generate text, reusing a cached response when available"""
+        key = self.cache.make_key(self.model, prompt, temperature, max_tokens)
+        chunks = await self._lookup(key)
+        if chunks is not None:
+            return "".join(chunks)
+
+        response = await self.provider.generate(
+            prompt,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        self._record_inner_usage()
+        await asyncio.to_thread(self.cache.set, key, [response])
+        return response
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 2000,
+        temperature: float = 0.7
+    ) -> AsyncIterator[str]:
+        """Stream text, replaying cached chunks when available"""
+        key = self.cache.make_key(self.model, prompt, temperature, max_tokens)
+        chunks = await self._lookup(key)
+        if chunks is not None:
+            for chunk in chunks:
+                yield chunk
+            return
+
+        received = []
+        async for chunk in self.provider.generate_stream(
+            prompt,
+            max_tokens=max_tokens,
+            temperature=temperature
+        ):
+            received.append(chunk)
+            yield chunk
+
+        self._record_inner_usage()
+
+        # Only complete streams are cached
+        await asyncio.to_thread(self.cache.set, key, received)
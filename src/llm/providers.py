@@ -2,24 +2,108 @@
 LLM Provider Implementations
 """
 
+import asyncio
 import os
-from typing import AsyncIterator
+from typing import AsyncIterator, Dict, List, Optional
 
-from llm.base import LLMProvider
+from llm.base import ChatPrompt, LLMError, LLMProvider
+from llm.cache import CachedLLMProvider, ResponseCache
+from llm.registry import ClientRegistry, build_sdk_timeout
+
+
+# HTTP statuses worth retrying (529 is Anthropic's "overloaded")
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def _parse_retry_after(value) -> Optional[float]:
+    """Parse retry-after header value in seconds"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_llm_error(message: str, error: Exception) -> LLMError:
+    """Convert SDK exception into LLMError with retry information"""
+    if isinstance(error, LLMError):
+        return error
+
+    status_code = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = _parse_retry_after(headers.get("retry-after"))
+
+    if status_code is not None:
+        retryable = status_code in RETRYABLE_STATUS_CODES
+    else:
+        # Connection failures and timeouts carry no status code
+        retryable = isinstance(error, (ConnectionError, asyncio.TimeoutError)) or \
+            type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+    detail = "request timed out" if isinstance(error, asyncio.TimeoutError) else error
+    llm_error = LLMError(
+        f"{message}: {detail}",
+        status_code=status_code,
+        retry_after=retry_after,
+        retryable=retryable
+    )
+    llm_error.__cause__ = error
+    return llm_error
 
 
 class AnthropicProvider(LLMProvider):
     """Anthropic Claude API Provider"""
 
-    def __init__(self, model: str, api_key: str, **kwargs):
+    provider_name = "anthropic"
+
+    def __init__(self, model: str, api_key: str, client=None, **kwargs):
         super().__init__(model, api_key, **kwargs)
+        if client is not None:
+            # Shared client handed out by ClientRegistry
+            self.client = client
+            return
+
         try:
-            from anthropic import AsyncAnthropic
+            import anthropic
             base_url = kwargs.get("base_url")
-            self.client = AsyncAnthropic(api_key=api_key, base_url=base_url)
+            self.client = anthropic.AsyncAnthropic(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=build_sdk_timeout(anthropic, kwargs.get("timeout"))
+            )
         except ImportError:
             raise ImportError("anthropic package is required. Install with: pip install anthropic")
 
+    def _build_request(self, prompt: str) -> Dict:
+        """Build system/messages payload, marking the stable prefix for caching"""
+        if not isinstance(prompt, ChatPrompt):
+            return {"messages": [{"role": "user", "content": prompt}]}
+
+        cache_control = {"type": "ephemeral"}
+        messages = []
+        for index, turn in enumerate(prompt.messages):
+            content = turn["content"]
+            if index in prompt.cache_breakpoints:
+                content = [{"type": "text", "text": content, "cache_control": cache_control}]
+            messages.append({"role": turn["role"], "content": content})
+
+        return {
+            "system": [{"type": "text", "text": prompt.system, "cache_control": cache_control}],
+            "messages": messages
+        }
+
+    @staticmethod
+    def _usage_dict(usage) -> Dict[str, int]:
+        """Normalize Anthropic usage object"""
+        return {
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+            "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+            "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0
+        }
+
     async def generate(
         self,
         prompt: str,
@@ -27,19 +111,23 @@ class AnthropicProvider(LLMProvider):
         temperature: float = 0.7
     ) -> str:
         """Generate text using Anthropic Claude"""
-        try:
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+        request = self._build_request(prompt)
 
-            return response.content[0].text
-        except Exception as e:
-            raise RuntimeError(f"Anthropic API error: {e}")
+        async def _create():
+            try:
+                return await self._with_total_timeout(self.client.messages.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    **request
+                ))
+            except Exception as e:
+                raise _to_llm_error("Anthropic API error", e)
+
+        response = await self._request(_create, self.count_tokens(prompt) + max_tokens)
+        if getattr(response, "usage", None) is not None:
+            self.record_usage(self._usage_dict(response.usage))
+        return response.content[0].text
 
     async def generate_stream(
         self,
@@ -48,37 +136,91 @@ class AnthropicProvider(LLMProvider):
         temperature: float = 0.7
     ) -> AsyncIterator[str]:
         """Generate streaming text using Anthropic Claude"""
-        try:
-            stream = await self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                stream=True
-            )
+        request = self._build_request(prompt)
+
+        # One total timeout covers opening the stream and reading it
+        deadline = self._deadline()
+
+        async def _open():
+            try:
+                return await self._with_total_timeout(self.client.messages.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    **request
+                ), deadline)
+            except Exception as e:
+                raise _to_llm_error("Anthropic API streaming error", e)
 
-            async for event in stream:
-                if event.type == "content_block_delta":
-                    yield event.delta.text
+        async with self._stream(_open, self.count_tokens(prompt) + max_tokens) as stream:
+            usage = {}
+            try:
+                async for event in self._iter_with_deadline(stream, deadline):
+                    if event.type == "content_block_delta":
+                        yield event.delta.text
+                    elif event.type == "message_start":
+                        usage = self._usage_dict(event.message.usage)
+                    elif event.type == "message_delta" and getattr(event, "usage", None):
+                        usage["output_tokens"] = event.usage.output_tokens
+            except Exception as e:
+                raise _to_llm_error("Anthropic API streaming error", e)
+            finally:
+                # Also runs on cancellation, releasing the connection
+                await self._close_stream(stream)
 
-        except Exception as e:
-            raise RuntimeError(f"Anthropic API streaming error: {e}")
+            if usage:
+                self.record_usage(usage)
 
 
 class OpenAIProvider(LLMProvider):
     """OpenAI GPT API Provider"""
 
-    def __init__(self, model: str, api_key: str, **kwargs):
+    provider_name = "openai"
+
+    def __init__(self, model: str, api_key: str, client=None, **kwargs):
         super().__init__(model, api_key, **kwargs)
+        if client is not None:
+            # Shared client handed out by ClientRegistry
+            self.client = client
+            return
+
         try:
-            from openai import AsyncOpenAI
+            import openai
             base_url = kwargs.get("base_url")
-            self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+            self.client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=build_sdk_timeout(openai, kwargs.get("timeout"))
+            )
         except ImportError:
             raise ImportError("openai package is required. Install with: pip install openai")
 
+    def _build_messages(self, prompt: str) -> List[Dict]:
+        """Build chat messages with the stable system prompt first
+
+        OpenAI caches matching prompt prefixes automatically, so the system
+        prompt and older turns lead and the newest turn comes last.
+        """
+        if not isinstance(prompt, ChatPrompt):
+            return [{"role": "user", "content": prompt}]
+
+        return [{"role": "system", "content": prompt.system}] + [
+            {"role": turn["role"], "content": turn["content"]}
+            for turn in prompt.messages
+        ]
+
+    @staticmethod
+    def _usage_dict(usage) -> Dict[str, int]:
+        """Normalize OpenAI usage object"""
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "input_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "cache_read_tokens": getattr(details, "cached_tokens", 0) or 0,
+            "cache_write_tokens": 0
+        }
+
     async def generate(
         self,
         prompt: str,
@@ -86,19 +228,23 @@ class OpenAIProvider(LLMProvider):
         temperature: float = 0.7
     ) -> str:
         """Generate text using OpenAI GPT"""
-        try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
+        messages = self._build_messages(prompt)
+
+        async def _create():
+            try:
+                return await self._with_total_timeout(self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                ))
+            except Exception as e:
+                raise _to_llm_error("OpenAI API error", e)
 
-            return response.choices[0].message.content
-        except Exception as e:
-            raise RuntimeError(f"OpenAI API error: {e}")
+        response = await self._request(_create, self.count_tokens(prompt) + max_tokens)
+        if getattr(response, "usage", None) is not None:
+            self.record_usage(self._usage_dict(response.usage))
+        return response.choices[0].message.content
 
     async def generate_stream(
         self,
@@ -107,27 +253,55 @@ class OpenAIProvider(LLMProvider):
         temperature: float = 0.7
     ) -> AsyncIterator[str]:
         """Generate streaming text using OpenAI GPT"""
-        try:
-            stream = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stream=True
-            )
+        messages = self._build_messages(prompt)
+
+        # One total timeout covers opening the stream and reading it
+        deadline = self._deadline()
 
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+        async def _open():
+            try:
+                return await self._with_total_timeout(self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                ), deadline)
+            except Exception as e:
+                raise _to_llm_error("OpenAI API streaming error", e)
 
-        except Exception as e:
-            raise RuntimeError(f"OpenAI API streaming error: {e}")
+        async with self._stream(_open, self.count_tokens(prompt) + max_tokens) as stream:
+            usage = {}
+            try:
+                async for chunk in self._iter_with_deadline(stream, deadline):
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    # Final chunk carries usage and no choices
+                    if getattr(chunk, "usage", None) is not None:
+                        usage = self._usage_dict(chunk.usage)
+            except Exception as e:
+                raise _to_llm_error("OpenAI API streaming error", e)
+            finally:
+                # Also runs on cancellation, releasing the connection
+                await self._close_stream(stream)
 
+            if usage:
+                self.record_usage(usage)
 
-def create_llm_provider(config: dict) -> LLMProvider:
-    """Factory function to create LLM provider from config"""
+
+def create_llm_provider(
+    config: dict,
+    registry: Optional[ClientRegistry] = None,
+    cache: Optional[ResponseCache] = None
+) -> LLMProvider:
+    """Factory function to create LLM provider from config
+
+    When a registry is given, providers with identical connection settings
+    share one pooled SDK client instead of each opening their own. When an
+    enabled cache is given, the provider is wrapped to serve repeated
+    requests from it.
+    """
 
     # Get API key from config or environment
     provider = config.get("provider", "anthropic").lower()
@@ -167,10 +341,29 @@ def create_llm_provider(config: dict) -> LLMProvider:
     kwargs.pop("api_key", None)
     kwargs.pop("api_key_env", None)
 
+    # Share pooled client and request scheduler across providers with the same settings
+    if registry is not None:
+        kwargs["client"] = registry.get_client(
+            provider,
+            api_key,
+            base_url=kwargs.get("base_url"),
+            timeout=kwargs.get("timeout")
+        )
+        kwargs["scheduler"] = registry.get_scheduler(
+            provider,
+            api_key,
+            base_url=kwargs.get("base_url")
+        )
+
     # Create provider instance
     if provider == "anthropic":
-        return AnthropicProvider(model, api_key, **kwargs)
+        llm_provider = AnthropicProvider(model, api_key, **kwargs)
     elif provider == "openai":
-        return OpenAIProvider(model, api_key, **kwargs)
+        llm_provider = OpenAIProvider(model, api_key, **kwargs)
     else:
         raise ValueError(f"Unsupported provider: {provider}")
+
+    if cache is not None and cache.enabled:
+        return CachedLLMProvider(llm_provider, cache)
+
+    return llm_provider
@@ -0,0 +1,156 @@
+"""
+Client Registry - Share pooled SDK clients between LLM providers
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+from llm.base import normalize_timeouts
+from llm.scheduler import RequestScheduler
+
+
+# Connection pool defaults, overridable via `llm.connection_pool` in cword.yaml
+DEFAULT_POOL_CONFIG = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 30.0
+}
+
+
+def build_sdk_timeout(sdk, timeout) -> Any:
+    """Build SDK timeout object with separate connect and read limits"""
+    timeouts = normalize_timeouts(timeout)
+    return sdk.Timeout(timeouts["read"], connect=timeouts["connect"])
+
+
+class ClientRegistry:
+    """Hand out one shared, pooled SDK client per provider settings key
+
+    Also hands out one RequestScheduler per provider account, so rate
+    limits and the concurrency cap apply across all agents using it.
+    """
+
+    def __init__(
+        self,
+        pool_config: Optional[Dict] = None,
+        rate_limits: Optional[Dict] = None,
+        retry_config: Optional[Dict] = None
+    ):
+        self.pool_config = {**DEFAULT_POOL_CONFIG, **(pool_config or {})}
+        self.rate_limits = rate_limits or {}
+        self.retry_config = retry_config or {}
+        self._clients: Dict[Tuple, Any] = {}
+        self._schedulers: Dict[Tuple, RequestScheduler] = {}
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout=None
+    ) -> Tuple:
+        """Build the registry key for a client"""
+        timeouts = tuple(sorted(normalize_timeouts(timeout).items()))
+        return (provider.lower(), base_url or None, api_key, timeouts)
+
+    def get_client(
+        self,
+        provider: str,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout=None
+    ):
+        """Get shared client for settings, creating it on first use"""
+        key = self.make_key(provider, api_key, base_url, timeout)
+
+        client = self._clients.get(key)
+        if client is None:
+            client = self._create_client(provider.lower(), api_key, base_url, timeout)
+            self._clients[key] = client
+
+        return client
+
+    def get_scheduler(
+        self,
+        provider: str,
+        api_key: str,
+        base_url: Optional[str] = None
+    ) -> RequestScheduler:
+        """Get shared request scheduler for a provider account"""
+        key = (provider.lower(), base_url or None, api_key)
+
+        scheduler = self._schedulers.get(key)
+        if scheduler is None:
+            scheduler_config = {
+                **self.retry_config,
+                **self.rate_limits.get(provider.lower(), {})
+            }
+            scheduler = RequestScheduler(scheduler_config)
+            self._schedulers[key] = scheduler
+
+        return scheduler
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Get retry and throttling counters per provider"""
+        stats: Dict[str, Dict] = {}
+        for (provider, _, _), scheduler in self._schedulers.items():
+            totals = stats.setdefault(provider, {})
+            for name, value in scheduler.stats.items():
+                totals[name] = totals.get(name, 0) + value
+        return stats
+
+    def _create_client(
+        self,
+        provider: str,
+        api_key: str,
+        base_url: Optional[str],
+        timeout
+    ):
+        """Create SDK client with a pooled HTTP transport"""
+        if provider == "anthropic":
+            try:
+                import anthropic as sdk
+            except ImportError:
+                raise ImportError("anthropic package is required. Install with: pip install anthropic")
+            client_cls = sdk.AsyncAnthropic
+        elif provider == "openai":
+            try:
+                import openai as sdk
+            except ImportError:
+                raise ImportError("openai package is required. Install with: pip install openai")
+            client_cls = sdk.AsyncOpenAI
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+
+        # Build limits with the SDK's own httpx flavour so the transport is accepted
+        limits_cls = type(sdk.DEFAULT_CONNECTION_LIMITS)
+        limits = limits_cls(
+            max_connections=self.pool_config["max_connections"],
+            max_keepalive_connections=self.pool_config["max_keepalive_connections"],
+            keepalive_expiry=self.pool_config["keepalive_expiry"]
+        )
+        http_client = sdk.DefaultAsyncHttpxClient(limits=limits)
+
+        # Retries are handled by RequestScheduler, so disable the SDK's own
+        kwargs = {
+            "api_key": api_key,
+            "base_url": base_url,
+            "http_client": http_client,
+            "max_retries": 0,
+            "timeout": build_sdk_timeout(sdk, timeout)
+        }
+
+        return client_cls(**kwargs)
+
+    async def aclose(self):
+        """Close all pooled clients"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                print(f"Warning: Failed to close LLM client: {e}")
+
+    def __len__(self) -> int:
+        return len(self._clients)
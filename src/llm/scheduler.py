@@ -0,0 +1,174 @@
+"""
+Request Scheduler - Rate limiting, concurrency cap and retries per provider
+"""
+
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional
+
+from llm.base import LLMError
+
+
+# Scheduler defaults, overridable via `llm.rate_limits` and `llm.retry` in cword.yaml
+DEFAULT_SCHEDULER_CONFIG = {
+    "requests_per_minute": None,
+    "tokens_per_minute": None,
+    "max_concurrency": 4,
+    "max_retries": 3,
+    "base_delay": 1.0,
+    "max_delay": 30.0
+}
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self._updated_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        """Add tokens accrued since the last update"""
+        if self._updated_at is not None:
+            elapsed = now - self._updated_at
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Take tokens, waiting for refill if needed; returns seconds waited"""
+        # Requests larger than the bucket would never fit; cap at capacity
+        amount = min(amount, self.capacity)
+        loop = asyncio.get_running_loop()
+        waited = 0.0
+
+        async with self._lock:
+            while True:
+                now = loop.time()
+                self._refill(now)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+
+                delay = (amount - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class RequestScheduler:
+    """Schedule requests to one provider account
+
+    Applies requests/min and tokens/min buckets, a concurrency cap, and
+    exponential backoff with jitter for retryable errors, honoring the
+    provider's retry-after hint.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = {**DEFAULT_SCHEDULER_CONFIG, **(config or {})}
+        rpm = self.config["requests_per_minute"]
+        tpm = self.config["tokens_per_minute"]
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.max_retries = int(self.config["max_retries"])
+        self.base_delay = float(self.config["base_delay"])
+        self.max_delay = float(self.config["max_delay"])
+        self._semaphore = asyncio.Semaphore(int(self.config["max_concurrency"]))
+        self._paused_until = 0.0
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "throttled": 0,
+            "throttle_wait": 0.0,
+            "failures": 0
+        }
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0):
+        """Hold a rate-limited concurrency slot (e.g. for a whole stream)"""
+        waited = 0.0
+        loop = asyncio.get_running_loop()
+
+        # Respect a provider-wide pause after a 429 with retry-after
+        pause = self._paused_until - loop.time()
+        if pause > 0:
+            await asyncio.sleep(pause)
+            waited += pause
+
+        if self.request_bucket:
+            waited += await self.request_bucket.acquire(1)
+        if self.token_bucket and estimated_tokens:
+            waited += await self.token_bucket.acquire(estimated_tokens)
+
+        if waited > 0:
+            self.stats["throttled"] += 1
+            self.stats["throttle_wait"] += waited
+
+        async with self._semaphore:
+            self.stats["requests"] += 1
+            yield
+
+    def _retry_delay(self, error: LLMError, attempt: int) -> float:
+        """Seconds to wait before retrying error, or re-raise it if final"""
+        if error.status_code == 429:
+            self.stats["rate_limited"] += 1
+        if not error.retryable or attempt >= self.max_retries:
+            self.stats["failures"] += 1
+            raise error
+
+        delay = self._backoff_delay(attempt, error.retry_after)
+        if error.retry_after:
+            loop = asyncio.get_running_loop()
+            self._paused_until = max(self._paused_until, loop.time() + delay)
+
+        self.stats["retries"] += 1
+        return delay
+
+    async def run(self, request_fn: Callable[[], Awaitable], estimated_tokens: int = 0):
+        """Run request in a scheduled slot, retrying retryable LLMErrors
+
+        Each attempt takes its own slot and rate-limit tokens; the slot is
+        released during backoff so other requests can use it.
+        """
+        attempt = 0
+        while True:
+            async with self.slot(estimated_tokens):
+                try:
+                    return await request_fn()
+                except LLMError as e:
+                    delay = self._retry_delay(e, attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def stream(self, open_fn: Callable[[], Awaitable], estimated_tokens: int = 0):
+        """Open a stream with retries, holding its slot until the stream ends
+
+        Only opening is retried; failures after the first chunk surface.
+        """
+        attempt = 0
+        while True:
+            async with self.slot(estimated_tokens):
+                try:
+                    stream = await open_fn()
+                except LLMError as e:
+                    delay = self._retry_delay(e, attempt)
+                else:
+                    yield stream
+                    return
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Exponential backoff with full jitter, never shorter than retry-after"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+
+        if retry_after:
+            # Spread retries out a little past the server's hint
+            delay = retry_after + random.uniform(0, self.base_delay)
+
+        return delay
@@ -0,0 +1,128 @@
+"""
+Token Accounting - Pluggable token estimators per provider
+"""
+
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Tuple
+
+
+# CJK ideographs tokenize much more densely than Latin text
+_CJK_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+
+
+class TokenEstimator(ABC):
+    """Count tokens in text"""
+
+    # Whether counts match what the provider bills
+    exact = False
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Count tokens in text"""
+        pass
+
+
+class HeuristicEstimator(TokenEstimator):
+    """Character-ratio estimate: ~4 chars per token, ~2 per CJK character"""
+
+    def __init__(self, chars_per_token: float = 4.0, cjk_chars_per_token: float = 2.0):
+        self.chars_per_token = chars_per_token
+        self.cjk_chars_per_token = cjk_chars_per_token
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        cjk_chars = len(_CJK_PATTERN.findall(text))
+        other_chars = len(text) - cjk_chars
+        return int(cjk_chars / self.cjk_chars_per_token) + int(other_chars / self.chars_per_token)
+
+
+class TiktokenEstimator(TokenEstimator):
+    """Exact counts for OpenAI models using tiktoken"""
+
+    exact = True
+
+    def __init__(self, model: Optional[str] = None):
+        import tiktoken
+        try:
+            self.encoding = tiktoken.encoding_for_model(model or "")
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("o200k_base")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+def _openai_estimator(model: Optional[str]) -> TokenEstimator:
+    """Use tiktoken when installed, otherwise the heuristic"""
+    try:
+        return TiktokenEstimator(model)
+    except ImportError:
+        return HeuristicEstimator()
+
+
+# Estimator factories by provider name, taking the model name
+_ESTIMATOR_FACTORIES: Dict[str, Callable[[Optional[str]], TokenEstimator]] = {
+    "default": lambda model: HeuristicEstimator(),
+    "anthropic": lambda model: HeuristicEstimator(chars_per_token=3.5),
+    "openai": _openai_estimator
+}
+
+_estimators: Dict[Tuple[str, Optional[str]], TokenEstimator] = {}
+
+
+def register_estimator(provider: str, factory: Callable[[Optional[str]], TokenEstimator]):
+    """Register estimator factory for a provider"""
+    _ESTIMATOR_FACTORIES[provider.lower()] = factory
+    for key in [key for key in _estimators if key[0] == provider.lower()]:
+        del _estimators[key]
+
+
+def get_estimator(provider: Optional[str] = None, model: Optional[str] = None) -> TokenEstimator:
+    """Get (cached) estimator for provider and model"""
+    provider = (provider or "default").lower()
+    key = (provider, model)
+
+    estimator = _estimators.get(key)
+    if estimator is None:
+        factory = _ESTIMATOR_FACTORIES.get(provider, _ESTIMATOR_FACTORIES["default"])
+        estimator = factory(model)
+        _estimators[key] = estimator
+
+    return estimator
+
+
+def count_tokens(text: str, provider: Optional[str] = None, model: Optional[str] = None) -> int:
+    """Count tokens in text with the estimator for provider and model"""
+    return get_estimator(provider, model).count(text)
+
+
+def count_message_tokens(message, estimator: Optional[TokenEstimator] = None) -> int:
+    """Get token count of a message, computing and caching it on first use
+
+    Counts by the default estimator are kept in `message.token_count` (and
+    stored with the message); counts by any other estimator, such as a
+    provider's, are cached per estimator in `message.token_counts`.
+    """
+    default = get_estimator()
+    if estimator is None or estimator is default:
+        if message.token_count is None:
+            message.token_count = default.count(message.content)
+        return message.token_count
+
+    counts = message.token_counts
+    if counts is None:
+        counts = message.token_counts = {}
+    count = counts.get(estimator)
+    if count is None:
+        count = counts[estimator] = estimator.count(message.content)
+    return count
+
+
+def add_usage(totals: Dict[str, int], usage: Dict[str, int]):
+    """Add API usage counts into totals in place"""
+    for name, value in usage.items():
+        totals[name] = totals.get(name, 0) + (value or 0)
@@ -2,6 +2,7 @@
 CWord Main Entry Point
 """
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -21,17 +22,61 @@ from utils.logger import setup_logger
 from utils.config import load_config
 
 
-def main():
+def migrate_sessions(config: dict, serializer: str):
+    """Convert all stored sessions to another snapshot format"""
+    from storage.session_store import create_session_store
+
+    store = create_session_store(config)
+    if not hasattr(store, "migrate"):
+        print("Error: Only the file storage backend has a snapshot format to migrate")
+        sys.exit(1)
+
+    try:
+        migrated = store.migrate(serializer)
+    except (ValueError, ImportError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"Migrated {migrated} session(s) to {serializer}")
+    print(f"Set storage.serializer to \"{serializer}\" in cword.yaml to keep using it")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command-line parser: no command starts the interactive chat"""
+    from storage.session_store import SERIALIZERS
+
+    parser = argparse.ArgumentParser(prog="cword", description="Multi-agent product discussion CLI")
+    parser.add_argument("--config", help="Path to cword.yaml (default: search standard locations)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("chat", help="Start the interactive chat (default)")
+
+    migrate = subparsers.add_parser(
+        "migrate-sessions",
+        help="Convert all stored sessions to another snapshot format"
+    )
+    migrate.add_argument("format", choices=sorted(SERIALIZERS), help="Target snapshot format")
+
+    return parser
+
+
+def main(argv=None):
     """Main entry point for CWord"""
+    args = build_parser().parse_args(argv)
+
     # Setup logging
     setup_logger()
 
+    # Load configuration
+    config = load_config(args.config)
+
+    if args.command == "migrate-sessions":
+        migrate_sessions(config, args.format)
+        return
+
     # Initialize console
     console = Console()
 
-    # Load configuration
-    config = load_config()
-
     # Start CLI interface
     interface = CLIInterface(config)
     interface.run()
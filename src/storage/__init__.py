@@ -1,7 +1,21 @@
 """Storage Module"""
 
-from .session_store import SessionStore
+from .session_store import SessionStore, create_session_store
+from .sqlite_store import SQLiteSessionStore
+from .journal import SessionJournal
+from .message_segment import MessageSegment, LazyMessageList
+from .session_index import SessionIndex
 from .config_store import ConfigStore
 from .document_store import DocumentStore
 
-__all__ = ["SessionStore", "ConfigStore", "DocumentStore"]
+__all__ = [
+    "SessionStore",
+    "SQLiteSessionStore",
+    "create_session_store",
+    "SessionJournal",
+    "MessageSegment",
+    "LazyMessageList",
+    "SessionIndex",
+    "ConfigStore",
+    "DocumentStore"
+]
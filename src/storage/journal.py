@@ -0,0 +1,91 @@
+"""
+Session Journal - Append-only JSONL event log
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+# When to fsync: "always" (every append), "snapshot" (snapshots only) or "never"
+FSYNC_POLICIES = ("always", "snapshot", "never")
+
+
+def fsync_file(f):
+    """Flush Python buffers and fsync file to disk"""
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class SessionJournal:
+    """Append-only log of session events, one JSON object per line
+
+    Each event carries an increasing `seq`. Reading stops at the first
+    torn or corrupt line (e.g. from a crash mid-write) and cuts it off so
+    later appends stay readable.
+    """
+
+    def __init__(self, path: Path, fsync: str = "snapshot"):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.fsync = fsync
+
+    def append(self, events: List[Dict]):
+        """Append events to the journal"""
+        if not events:
+            return
+
+        lines = "".join(
+            json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for event in events
+        )
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            if self.fsync == "always":
+                fsync_file(f)
+
+    def read(self, after_seq: int = 0) -> Tuple[List[Dict], int]:
+        """Read events with seq > after_seq; returns (events, last_seq)"""
+        events = []
+        last_seq = after_seq
+
+        if not self.path.exists():
+            return events, last_seq
+
+        good_offset = 0
+        torn = False
+        with open(self.path, 'rb') as f:
+            for raw in f:
+                try:
+                    if not raw.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    event = json.loads(raw)
+                    seq = event["seq"]
+                except (ValueError, KeyError, TypeError):
+                    torn = True
+                    break
+
+                good_offset += len(raw)
+                if seq > after_seq:
+                    events.append(event)
+                last_seq = max(last_seq, seq)
+
+        if torn:
+            # Drop the damaged tail so new events aren't appended after it
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_offset)
+
+        return events, last_seq
+
+    def reset(self):
+        """Empty the journal after its events were folded into a snapshot"""
+        if self.path.exists():
+            with open(self.path, 'w', encoding='utf-8') as f:
+                if self.fsync != "never":
+                    fsync_file(f)
+
+    def delete(self):
+        """Remove journal file"""
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,305 @@
+"""
+Message Segment - Append-only message log with an offset index
+"""
+
+import json
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableSequence
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from storage.journal import FSYNC_POLICIES, fsync_file
+
+
+def _dump_json(record: Dict) -> bytes:
+    """Compact JSON via the standard library"""
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class MessageSegment:
+    """Session messages as JSONL plus an index of line offsets
+
+    The index file holds one native uint64 per message start plus
+    the end of the last line, so any range of messages can be sliced out of
+    the segment through mmap without parsing what comes before it. The
+    segment is written first and the index second; on load the index is
+    checked against the segment and repaired (or rebuilt) if a crash left
+    them out of step, and a torn last line is cut off.
+
+    Lines are always JSON; `codec` (anything with JSON dumps/loads on
+    bytes, such as orjson) replaces the standard library for encoding and
+    decoding them. Its output must not contain newlines.
+    """
+
+    def __init__(self, path: Path, index_path: Path, fsync: str = "snapshot", codec=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.index_path = index_path
+        self.fsync = fsync
+        self._dumps: Callable[[Dict], bytes] = codec.dumps if codec is not None else _dump_json
+        self._loads: Callable[[bytes], Dict] = codec.loads if codec is not None else json.loads
+        self._offsets: Optional[array] = None
+
+    def _get_offsets(self) -> array:
+        """Offsets of every line start plus the end, loaded on first use"""
+        if self._offsets is None:
+            self._offsets = self._load_offsets()
+        return self._offsets
+
+    def _load_offsets(self) -> array:
+        """Read index and bring it in line with the segment"""
+        size = self.path.stat().st_size if self.path.exists() else 0
+
+        offsets = array("Q")
+        if self.index_path.exists():
+            raw = self.index_path.read_bytes()
+            offsets.frombytes(raw[:len(raw) - len(raw) % offsets.itemsize])
+        if not offsets or offsets[0] != 0:
+            offsets = array("Q", [0])
+
+        # Index written ahead of segment data that never made it to disk
+        while len(offsets) > 1 and offsets[-1] > size:
+            offsets.pop()
+
+        if size:
+            with open(self.path, 'rb') as f:
+                # Every indexed line must end right before the next offset
+                if offsets[-1] > 0:
+                    f.seek(offsets[-1] - 1)
+                    if f.read(1) != b"\n":
+                        offsets = array("Q", [0])
+
+                # Lines appended without their index entries
+                f.seek(offsets[-1])
+                position = offsets[-1]
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    position += len(line)
+                    offsets.append(position)
+
+        if size > offsets[-1]:
+            # Drop the torn tail so new lines aren't appended after it
+            with open(self.path, 'r+b') as f:
+                f.truncate(offsets[-1])
+
+        index_size = self.index_path.stat().st_size if self.index_path.exists() else 0
+        if (self.path.exists() or self.index_path.exists()) and index_size != len(offsets) * offsets.itemsize:
+            self._write_index(offsets)
+
+        return offsets
+
+    def _write_index(self, offsets: array):
+        """Replace index file atomically"""
+        tmp_path = self.index_path.with_suffix(".idx.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(offsets.tobytes())
+            if self.fsync != "never":
+                fsync_file(f)
+        os.replace(tmp_path, self.index_path)
+
+    def _encode(self, records: Iterable[Dict]) -> List[bytes]:
+        """One JSON line per record"""
+        dumps = self._dumps
+        return [dumps(record) + b"\n" for record in records]
+
+    def __len__(self) -> int:
+        return len(self._get_offsets()) - 1
+
+    def append(self, records: Iterable[Dict]):
+        """Append records to the segment and their offsets to the index"""
+        lines = self._encode(records)
+        if not lines:
+            return
+
+        offsets = self._get_offsets()
+        new_offsets = array("Q")
+        position = offsets[-1]
+        for line in lines:
+            position += len(line)
+            new_offsets.append(position)
+
+        with open(self.path, 'ab') as f:
+            f.write(b"".join(lines))
+            if self.fsync == "always":
+                fsync_file(f)
+        # A new index starts with the offset of the first line
+        index_bytes = new_offsets.tobytes() if self.index_path.exists() else (offsets + new_offsets).tobytes()
+        with open(self.index_path, 'ab') as f:
+            f.write(index_bytes)
+            if self.fsync == "always":
+                fsync_file(f)
+
+        offsets.extend(new_offsets)
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> List[Dict]:
+        """Read records[start:end]"""
+        offsets = self._get_offsets()
+        count = len(offsets) - 1
+        end = count if end is None else min(end, count)
+        if start >= end:
+            return []
+
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            chunk = mm[offsets[start]:offsets[end]]
+
+        loads = self._loads
+        return [loads(line) for line in chunk.split(b"\n")[:-1]]
+
+    def truncate(self, count: int):
+        """Keep only the first count records"""
+        offsets = self._get_offsets()
+        if count >= len(offsets) - 1:
+            return
+
+        with open(self.path, 'r+b') as f:
+            f.truncate(offsets[count])
+        del offsets[count + 1:]
+        self._write_index(offsets)
+
+    def rewrite(self, records: Iterable[Dict]):
+        """Replace all records"""
+        lines = self._encode(records)
+        offsets = array("Q", [0])
+        for line in lines:
+            offsets.append(offsets[-1] + len(line))
+
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(lines))
+            if self.fsync != "never":
+                fsync_file(f)
+
+        # A missing index is rebuilt from the segment if we crash in between
+        self.index_path.unlink(missing_ok=True)
+        os.replace(tmp_path, self.path)
+        self._write_index(offsets)
+        self._offsets = offsets
+
+    def delete(self):
+        """Remove segment and index"""
+        self.path.unlink(missing_ok=True)
+        self.index_path.unlink(missing_ok=True)
+        self._offsets = None
+
+
+class LazyMessageList(MutableSequence):
+    """Message list backed by a MessageSegment, paged in on demand
+
+    The first `stored` messages stay on disk and are read a page at a time,
+    keeping the most recently used pages; messages appended afterwards are
+    held in memory. Messages paged back in are new objects, so changes to a
+    stored message only last while its page is cached. Mutations other than
+    appending load every message first.
+    """
+
+    PAGE_SIZE = 256
+    MAX_PAGES = 8
+
+    def __init__(self, segment: MessageSegment, factory: Callable[[Dict], object], stored: Optional[int] = None):
+        self.segment = segment
+        self.factory = factory
+        self.stored = len(segment) if stored is None else stored
+        self._tail: List = []
+        self._pages: "OrderedDict[int, List]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _page(self, number: int) -> List:
+        """Messages of page number, read from the segment if not cached"""
+        with self._lock:
+            page = self._pages.get(number)
+            if page is not None:
+                self._pages.move_to_end(number)
+                return page
+
+            start = number * self.PAGE_SIZE
+            end = min(start + self.PAGE_SIZE, self.stored)
+            page = [self.factory(record) for record in self.segment.read(start, end)]
+            self._pages[number] = page
+            while len(self._pages) > self.MAX_PAGES:
+                self._pages.popitem(last=False)
+            return page
+
+    def _range(self, start: int, stop: int) -> List:
+        """Messages[start:stop] for 0 <= start <= stop <= len"""
+        result = []
+        position = start
+        while position < min(stop, self.stored):
+            number, skip = divmod(position, self.PAGE_SIZE)
+            page = self._page(number)
+            taken = page[skip:skip + min(stop, self.stored) - position]
+            if not taken:
+                break
+            result.extend(taken)
+            position += len(taken)
+
+        if stop > self.stored:
+            result.extend(self._tail[max(start - self.stored, 0):stop - self.stored])
+        return result
+
+    def __len__(self) -> int:
+        return self.stored + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._range(start, max(start, stop))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message index out of range")
+        if index >= self.stored:
+            return self._tail[index - self.stored]
+        number, offset = divmod(index, self.PAGE_SIZE)
+        return self._page(number)[offset]
+
+    def __iter__(self):
+        for number in range((self.stored + self.PAGE_SIZE - 1) // self.PAGE_SIZE):
+            yield from self._page(number)
+        yield from list(self._tail)
+
+    def append(self, message):
+        self._tail.append(message)
+
+    def _materialize(self):
+        """Load every stored message into memory"""
+        if self.stored:
+            self._tail = self._range(0, len(self))
+            self.stored = 0
+            self._pages = OrderedDict()
+
+    def __setitem__(self, index, value):
+        self._materialize()
+        self._tail[index] = value
+
+    def __delitem__(self, index):
+        self._materialize()
+        del self._tail[index]
+
+    def insert(self, index: int, value):
+        self._materialize()
+        self._tail.insert(index, value)
+
+    def copy(self) -> "LazyMessageList":
+        """Shallow copy sharing the segment and page cache"""
+        other = LazyMessageList(self.segment, self.factory, self.stored)
+        other._tail = list(self._tail)
+        other._pages = self._pages
+        other._lock = self._lock
+        return other
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, LazyMessageList)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LazyMessageList(stored={self.stored}, appended={len(self._tail)})"
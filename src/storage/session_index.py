@@ -0,0 +1,121 @@
+"""
+Session Index - Session listing metadata without loading sessions
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from storage.journal import SessionJournal, fsync_file
+
+
+# Fields that query() can sort by
+SORT_FIELDS = ("updated_at", "created_at", "product_name", "message_count", "decision_count", "size")
+
+
+class SessionIndex:
+    """Index of per-session listing metadata
+
+    One entry per session: id, product name, stage, message and decision
+    counts, created/updated times and size on disk. Stored like sessions
+    themselves, as a snapshot plus a journal of upsert/delete events, so
+    updating one entry doesn't rewrite the whole index.
+    """
+
+    # Compact once the journal holds more events than this and than entries
+    COMPACT_MIN_EVENTS = 100
+
+    def __init__(self, index_dir: Path, fsync: str = "snapshot"):
+        self.index_dir = index_dir
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = index_dir / "sessions.json"
+        self.journal = SessionJournal(index_dir / "sessions.journal.jsonl", fsync)
+        self.fsync = fsync
+        self.entries: Dict[str, Dict] = {}
+        self._seq = 0
+        self._events = 0
+
+    def load(self) -> bool:
+        """Load index from disk; returns False if there is none yet"""
+        if not self.snapshot_path.exists():
+            return False
+
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.entries = data.get("entries", {})
+        events, self._seq = self.journal.read(data.get("seq", 0))
+        for event in events:
+            self._apply(event)
+        self._events = len(events)
+        return True
+
+    def _apply(self, event: Dict):
+        """Apply journal event to entries"""
+        if event["type"] == "upsert":
+            self.entries[event["data"]["session_id"]] = event["data"]
+        elif event["type"] == "delete":
+            self.entries.pop(event["data"]["session_id"], None)
+
+    def upsert(self, entry: Dict):
+        """Add or replace entry"""
+        if self.entries.get(entry["session_id"]) == entry:
+            return
+        self._record({"type": "upsert", "data": entry})
+
+    def remove(self, session_id: str):
+        """Remove entry"""
+        if session_id in self.entries:
+            self._record({"type": "delete", "data": {"session_id": session_id}})
+
+    def _record(self, event: Dict):
+        """Apply event and append it to the journal, compacting when large"""
+        self._seq += 1
+        event = {"seq": self._seq, **event}
+        self._apply(event)
+
+        if self._events >= max(self.COMPACT_MIN_EVENTS, len(self.entries)):
+            self.write_snapshot()
+        else:
+            self.journal.append([event])
+            self._events += 1
+
+    def replace_all(self, entries: Iterable[Dict]):
+        """Replace all entries (used when rebuilding)"""
+        self.entries = {entry["session_id"]: entry for entry in entries}
+        self.write_snapshot()
+
+    def write_snapshot(self):
+        """Write all entries atomically and empty the journal"""
+        tmp_path = self.snapshot_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"seq": self._seq, "entries": self.entries}, f, ensure_ascii=False)
+            if self.fsync != "never":
+                fsync_file(f)
+        os.replace(tmp_path, self.snapshot_path)
+        self.journal.reset()
+        self._events = 0
+
+    def query(
+        self,
+        sort_by: str = "updated_at",
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        stage: Optional[str] = None
+    ) -> List[Dict]:
+        """Get sorted, paginated entries, optionally filtered by stage"""
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field: {sort_by}")
+
+        entries = self.entries.values()
+        if stage:
+            entries = [entry for entry in entries if entry["current_stage"] == stage]
+
+        ordered = sorted(entries, key=lambda entry: entry[sort_by], reverse=descending)
+        end = offset + limit if limit is not None else None
+        return ordered[offset:end]
+
+    def __len__(self) -> int:
+        return len(self.entries)
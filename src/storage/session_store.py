@@ -3,19 +3,229 @@ Session Store - Persist and retrieve sessions
 """
 
 import json
+import os
+import threading
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import List, Optional, TYPE_CHECKING
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
+
+from storage.journal import SessionJournal, fsync_file
+from storage.message_segment import LazyMessageList, MessageSegment
+from storage.session_index import SessionIndex
 
 if TYPE_CHECKING:
     from core.session import Session
 
 
+# Storage defaults, overridable via `storage` in cword.yaml
+DEFAULT_STORAGE_CONFIG = {
+    "backend": "file",
+    "fsync": "snapshot",
+    "compact_every": 200,
+    "serializer": "json",
+    "sqlite_path": None
+}
+
+
+class SessionSerializer(ABC):
+    """Encode session snapshots to bytes and back"""
+
+    name = ""
+    extension = ".json"
+    # Write timestamps as epoch seconds instead of ISO 8601 strings, which
+    # skips isoformat/fromisoformat for every message
+    numeric_time = False
+
+    @abstractmethod
+    def dumps(self, data: Dict) -> bytes:
+        """Encode snapshot data"""
+        pass
+
+    @abstractmethod
+    def loads(self, raw: bytes) -> Dict:
+        """Decode snapshot data"""
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def matches(raw: bytes) -> bool:
+        """Whether raw looks like this serializer's output"""
+        pass
+
+
+class JSONSerializer(SessionSerializer):
+    """Compact JSON via the standard library"""
+
+    name = "json"
+
+    def dumps(self, data: Dict) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, raw: bytes) -> Dict:
+        return json.loads(raw)
+
+    @staticmethod
+    def matches(raw: bytes) -> bool:
+        return raw.lstrip()[:1] == b"{"
+
+
+class OrjsonSerializer(JSONSerializer):
+    """Same JSON format, encoded and decoded by orjson"""
+
+    name = "orjson"
+    numeric_time = True
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, data: Dict) -> bytes:
+        return self._orjson.dumps(data)
+
+    def loads(self, raw: bytes) -> Dict:
+        return self._orjson.loads(raw)
+
+
+class MsgpackSerializer(SessionSerializer):
+    """Binary MessagePack snapshots"""
+
+    name = "msgpack"
+    extension = ".msgpack"
+    numeric_time = True
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, data: Dict) -> bytes:
+        return self._msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, raw: bytes) -> Dict:
+        return self._msgpack.unpackb(raw, raw=False)
+
+    @staticmethod
+    def matches(raw: bytes) -> bool:
+        # fixmap, map16 or map32 marker
+        return bool(raw) and (0x80 <= raw[0] <= 0x8f or raw[0] in (0xde, 0xdf))
+
+
+# Serializer factories by name; orjson and msgpack need their packages
+SERIALIZERS: Dict[str, Callable[[], SessionSerializer]] = {
+    "json": JSONSerializer,
+    "orjson": OrjsonSerializer,
+    "msgpack": MsgpackSerializer
+}
+
+# Snapshot file extensions, in lookup order
+SNAPSHOT_EXTENSIONS = (".json", ".msgpack")
+
+
+def snapshot_format(raw: bytes, data: Dict) -> str:
+    """Name of the serializer that wrote a snapshot
+
+    json and orjson share a file format, so snapshots record the writer's
+    name; older snapshots without it count as json (or msgpack).
+    """
+    return data.get("format") or ("msgpack" if MsgpackSerializer.matches(raw) else "json")
+
+
+def _dump_value(value) -> str:
+    """Canonical JSON of a header value, for change detection"""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def get_serializer(name: str) -> SessionSerializer:
+    """Create serializer by name; raises ImportError if its package is missing"""
+    factory = SERIALIZERS.get(name)
+    if factory is None:
+        raise ValueError(f"Unsupported session serializer: {name}")
+    return factory()
+
+
+def detect_serializer(raw: bytes, preferred: Optional[SessionSerializer] = None) -> SessionSerializer:
+    """Pick a serializer that can read raw, preferring the configured one"""
+    if preferred is not None and preferred.matches(raw):
+        return preferred
+
+    if MsgpackSerializer.matches(raw):
+        return get_serializer("msgpack")
+    if JSONSerializer.matches(raw):
+        try:
+            return get_serializer("orjson")
+        except ImportError:
+            return JSONSerializer()
+
+    raise ValueError("Unrecognized session snapshot format")
+
+
+def line_serializer(serializer: SessionSerializer) -> SessionSerializer:
+    """JSON serializer for message segment lines under serializer
+
+    Segments need newline-free JSON, so msgpack falls back to orjson (or
+    stdlib JSON if orjson is missing).
+    """
+    if isinstance(serializer, JSONSerializer):
+        return serializer
+    try:
+        return get_serializer("orjson")
+    except ImportError:
+        return JSONSerializer()
+
+
+def create_session_store(config: dict):
+    """Create session store for the configured `storage.backend`"""
+    backend = config.get("storage", {}).get("backend", "file")
+
+    if backend == "file":
+        return SessionStore(config)
+    elif backend == "sqlite":
+        from storage.sqlite_store import SQLiteSessionStore
+        return SQLiteSessionStore(config)
+    else:
+        raise ValueError(f"Unsupported storage backend: {backend}")
+
+
 class SessionStore:
-    """Store sessions to file system"""
+    """Store sessions to file system
+
+    Each session is a compact snapshot (`<id>.json`) of its header,
+    decisions and token totals, an append-only journal
+    (`<id>.journal.jsonl`) of decision and session-field events since that
+    snapshot, and a message segment (`<id>.messages.jsonl` with offset index
+    `<id>.messages.idx`). Saving appends only what changed; the journal is
+    folded into a fresh snapshot every `compact_every` events. Loading
+    replays the journal over the snapshot and leaves messages on disk: they
+    are paged in from the segment as the session's message list is read.
+    Sessions stored with messages inside the snapshot still load, and move
+    to a segment on their next save.
+
+    Snapshots are written with the configured `serializer` (json, orjson
+    or msgpack) and record which one wrote them; the format of existing
+    snapshots is detected on load and converted on their next save, so
+    switching serializers needs no conversion up front. Message segments
+    stay JSON lines in every format, encoded by orjson whenever a fast
+    serializer is configured.
+
+    A SessionIndex in `.index/` keeps listing metadata up to date on every
+    save, so listing sessions doesn't parse session files.
+    """
 
     def __init__(self, config: dict):
         self.config = config
+        self.storage_config = {**DEFAULT_STORAGE_CONFIG, **config.get("storage", {})}
+        self.fsync = self.storage_config["fsync"]
+        self.compact_every = int(self.storage_config["compact_every"])
+        self.serializer = self._create_serializer(self.storage_config["serializer"])
+        self.line_serializer = line_serializer(self.serializer)
         self.sessions_dir = self._get_sessions_dir()
+        # What has been persisted per session id, to know what to append
+        self._persisted: Dict[str, Dict] = {}
+        # Segments keep their offset index in memory between saves
+        self._segments: Dict[str, MessageSegment] = {}
+        # Saves may come from the auto-saver's worker thread and the CLI
+        self._lock = threading.RLock()
+        self.index = SessionIndex(self.sessions_dir / ".index", self.fsync)
+        self._index_ready = False
 
     def _get_sessions_dir(self) -> Path:
         """Get sessions directory path"""
@@ -24,53 +234,416 @@ class SessionStore:
         path.mkdir(parents=True, exist_ok=True)
         return path
 
+    @staticmethod
+    def _create_serializer(name: str) -> SessionSerializer:
+        """Create configured serializer, falling back to stdlib JSON"""
+        try:
+            return get_serializer(name)
+        except ImportError as e:
+            print(f"Warning: Session serializer '{name}' unavailable ({e}), using json")
+            return JSONSerializer()
+
+    def _snapshot_path(self, session_id: str) -> Path:
+        """Get path for writing a snapshot with the current serializer"""
+        return self.sessions_dir / f"{session_id}{self.serializer.extension}"
+
+    def _snapshot_paths(self, session_id: str) -> List[Path]:
+        """Existing snapshot files for session, in any format"""
+        paths = [self.sessions_dir / f"{session_id}{ext}" for ext in SNAPSHOT_EXTENSIONS]
+        return [path for path in paths if path.exists()]
+
+    def _find_snapshot(self, session_id: str) -> Optional[Path]:
+        """Existing snapshot, preferring the current serializer's format"""
+        preferred = self._snapshot_path(session_id)
+        if preferred.exists():
+            return preferred
+        paths = self._snapshot_paths(session_id)
+        return paths[0] if paths else None
+
+    def _journal(self, session_id: str) -> SessionJournal:
+        """Get journal for session"""
+        return SessionJournal(self.sessions_dir / f"{session_id}.journal.jsonl", self.fsync)
+
+    def _segment(self, session_id: str) -> MessageSegment:
+        """Get (cached) message segment for session"""
+        segment = self._segments.get(session_id)
+        if segment is None:
+            segment = MessageSegment(
+                self.sessions_dir / f"{session_id}.messages.jsonl",
+                self.sessions_dir / f"{session_id}.messages.idx",
+                self.fsync,
+                codec=self.line_serializer
+            )
+            self._segments[session_id] = segment
+        return segment
+
+    @staticmethod
+    def _header(session) -> Dict:
+        """Session fields other than messages and decisions"""
+        return {
+            "product_name": session.product_name,
+            "current_stage": session.current_stage,
+            "metadata": session.metadata,
+            "created_at": session.created_at.isoformat(),
+            "updated_at": session.updated_at.isoformat()
+        }
+
+    @classmethod
+    def _header_state(cls, session) -> Dict:
+        """Serialized header fields and metadata entries, for change detection
+
+        updated_at is left out, since it moves on every save; it is only
+        journaled along with another change and otherwise waits for the
+        next snapshot.
+        """
+        header = cls._header(session)
+        metadata = header.pop("metadata")
+        del header["updated_at"]
+        return {
+            "fields": {name: _dump_value(value) for name, value in header.items()},
+            "metadata": {key: _dump_value(value) for key, value in metadata.items()}
+        }
+
     def save_session(self, session):
-        """Save session to file"""
-        session_file = self.sessions_dir / f"{session.session_id}.json"
+        """Save session, appending changes to its journal when possible"""
+        with self._lock:
+            self._save_session(session)
+            self._ensure_index()
+            self.index.upsert(self._index_entry(session))
+
+    def _save_session(self, session):
+        """Append changes since the last save, or write a new snapshot"""
+        state = self._persisted.get(session.session_id)
+
+        if (
+            state is None
+            or state["events"] >= self.compact_every
+            or not state["segment"]
+            or len(session.messages) < state["messages"]
+            or len(session.decisions) < state["decisions"]
+            or state["format"] != self.serializer.name
+        ):
+            self._write_snapshot(session, state)
+            return
+
+        appended = self._sync_segment(session, state["messages"])
+
+        seq = state["seq"]
+        events = []
+
+        for decision in session.decisions[state["decisions"]:]:
+            seq += 1
+            events.append({
+                "seq": seq,
+                "type": "decision",
+                "data": decision.to_dict(self.serializer.numeric_time)
+            })
+
+        # Journal only the header fields and metadata keys that changed; the
+        # summary tree in metadata is too large to rewrite on every save
+        header_state = self._header_state(session)
+        header = self._header(session)
+        changed = {
+            name: header[name] for name, dumped in header_state["fields"].items()
+            if state["header"]["fields"].get(name) != dumped
+        }
+        changed_metadata = {
+            key: session.metadata[key] for key, dumped in header_state["metadata"].items()
+            if state["header"]["metadata"].get(key) != dumped
+        }
+        removed_metadata = [key for key in state["header"]["metadata"] if key not in session.metadata]
+        if changed or changed_metadata or removed_metadata:
+            seq += 1
+            event = {"seq": seq, "type": "session", "data": {**changed, "updated_at": header["updated_at"]}}
+            if changed_metadata:
+                event["metadata"] = changed_metadata
+            if removed_metadata:
+                event["metadata_removed"] = removed_metadata
+            events.append(event)
+
+        self._journal(session.session_id).append(events)
+
+        state.update({
+            "messages": len(session.messages),
+            "decisions": len(session.decisions),
+            "header": header_state,
+            "seq": seq,
+            "events": state["events"] + appended + len(events)
+        })
+
+    def _write_snapshot(self, session, state: Optional[Dict], rewrite_messages: bool = False):
+        """Write full snapshot atomically and empty the journal
+
+        rewrite_messages re-encodes the whole message segment, e.g. to
+        switch its timestamp encoding.
+        """
+        journal = self._journal(session.session_id)
+        if state is not None:
+            seq = state["seq"]
+        else:
+            # Continue numbering after anything already on disk
+            _, seq = journal.read()
+
+        if rewrite_messages:
+            known = None
+        elif state is not None and state["segment"]:
+            known = state["messages"]
+        elif (
+            isinstance(session.messages, LazyMessageList)
+            and session.messages.segment is self._segment(session.session_id)
+        ):
+            known = session.messages.stored
+        else:
+            known = None
+        self._sync_segment(session, known)
+
+        data = {
+            "session_id": session.session_id,
+            "format": self.serializer.name,
+            **self._header(session),
+            "decisions": [decision.to_dict(self.serializer.numeric_time) for decision in session.decisions],
+            "message_count": len(session.messages),
+            "token_count": session.token_count,
+            "usage_totals": session.usage_totals,
+            "journal_seq": seq
+        }
+
+        snapshot_path = self._snapshot_path(session.session_id)
+        tmp_path = snapshot_path.with_suffix(".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(self.serializer.dumps(data))
+            if self.fsync != "never":
+                fsync_file(f)
+        os.replace(tmp_path, snapshot_path)
+
+        # Drop snapshots left in another format
+        for path in self._snapshot_paths(session.session_id):
+            if path != snapshot_path:
+                path.unlink()
+
+        # Events up to journal_seq are now in the snapshot, so a crash before
+        # this reset only leaves events that replay skips
+        journal.reset()
 
-        with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(session.to_dict(), f, indent=2, ensure_ascii=False)
+        self._persisted[session.session_id] = {
+            "messages": len(session.messages),
+            "decisions": len(session.decisions),
+            "header": self._header_state(session),
+            "seq": seq,
+            "events": 0,
+            "segment": True,
+            "format": self.serializer.name
+        }
+
+    def _sync_segment(self, session, known: Optional[int]) -> int:
+        """Write messages missing from the segment; returns how many were appended
+
+        `known` is how many leading messages are already in the segment, or
+        None if that is unknown and the segment must be rewritten.
+        """
+        segment = self._segment(session.session_id)
+        messages = session.messages
+        numeric_time = self.serializer.numeric_time
+
+        if known is None or len(segment) < known or len(messages) < known:
+            segment.rewrite(message.to_dict(numeric_time) for message in messages)
+            return len(messages)
+
+        # Drop anything written after the last save we know of
+        segment.truncate(known)
+        segment.append(message.to_dict(numeric_time) for message in messages[known:])
+        return len(messages) - known
+
+    def _index_entry(self, session) -> Dict:
+        """Build index entry for session"""
+        size = 0
+        segment = self._segment(session.session_id)
+        paths = self._snapshot_paths(session.session_id) + [
+            self._journal(session.session_id).path, segment.path, segment.index_path
+        ]
+        for path in paths:
+            if path.exists():
+                size += path.stat().st_size
+
+        return {
+            "session_id": session.session_id,
+            "product_name": session.product_name,
+            "current_stage": session.current_stage,
+            "message_count": len(session.messages),
+            "decision_count": len(session.decisions),
+            "created_at": session.created_at.isoformat(),
+            "updated_at": session.updated_at.isoformat(),
+            "size": size
+        }
+
+    def _session_ids_on_disk(self) -> List[str]:
+        """Ids of all stored sessions (from file names only)"""
+        # Keyed by id to drop duplicates while keeping discovery order
+        session_ids: Dict[str, None] = {}
+        for ext in SNAPSHOT_EXTENSIONS:
+            for path in self.sessions_dir.glob(f"*{ext}"):
+                session_ids[path.stem] = None
+        return list(session_ids)
+
+    def _ensure_index(self):
+        """Load index on first use, rebuilding or reconciling it with disk"""
+        if self._index_ready:
+            return
+
+        if self.index.load():
+            # Pick up sessions written or removed without the index (e.g. older versions)
+            on_disk = set(self._session_ids_on_disk())
+            indexed = set(self.index.entries)
+            for session_id in indexed - on_disk:
+                self.index.remove(session_id)
+            self._index_sessions(on_disk - indexed)
+        else:
+            self.index.replace_all([])
+            self._index_sessions(self._session_ids_on_disk())
+
+        self._index_ready = True
+
+    def _index_sessions(self, session_ids):
+        """Load sessions and add them to the index"""
+        for session_id in session_ids:
+            try:
+                session = self.load_session(session_id)
+            except Exception as e:
+                print(f"Warning: Failed to index session {session_id}: {e}")
+                continue
+            if session:
+                self.index.upsert(self._index_entry(session))
+
+    def rebuild_index(self):
+        """Rebuild the index from session files"""
+        with self._lock:
+            self._index_ready = False
+            self.index.replace_all([])
+            self._index_sessions(self._session_ids_on_disk())
+            self._index_ready = True
+
+    def query_sessions(
+        self,
+        sort_by: str = "updated_at",
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        stage: Optional[str] = None
+    ) -> List[Dict]:
+        """List index entries, sorted and paginated, without loading sessions"""
+        with self._lock:
+            self._ensure_index()
+            return self.index.query(sort_by, descending, offset, limit, stage)
 
     def load_session(self, session_id: str):
-        """Load session from file"""
-        from core.session import Session
+        """Load session snapshot and replay its journal"""
+        with self._lock:
+            return self._load_session(session_id)
 
-        session_file = self.sessions_dir / f"{session_id}.json"
+    def _load_session(self, session_id: str):
+        """Read snapshot and apply journal events; messages stay on disk"""
+        from core.session import Session, Message
 
-        if not session_file.exists():
+        session_file = self._find_snapshot(session_id)
+
+        if session_file is None:
             return None
 
-        with open(session_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return Session.from_dict(data)
+        raw = session_file.read_bytes()
+        data = detect_serializer(raw, self.serializer).loads(raw)
+        written_with = snapshot_format(raw, data)
+        data.pop("format", None)
+
+        events, seq = self._journal(session_id).read(data.pop("journal_seq", 0))
+        for event in events:
+            if event["type"] == "message":
+                # Written before messages moved to segments
+                data.setdefault("messages", []).append(event["data"])
+            elif event["type"] == "decision":
+                data.setdefault("decisions", []).append(event["data"])
+            elif event["type"] == "session":
+                # Older events carry the whole header, newer ones only changes
+                data.update(event["data"])
+                if "metadata" in event or "metadata_removed" in event:
+                    metadata = data.setdefault("metadata", {})
+                    metadata.update(event.get("metadata", {}))
+                    for key in event.get("metadata_removed", []):
+                        metadata.pop(key, None)
+
+        segmented = "messages" not in data
+        if segmented:
+            segment = self._segment(session_id)
+            session = Session.from_dict(data, messages=LazyMessageList(segment, Message.from_dict))
+        else:
+            session = Session.from_dict(data)
+
+        self._persisted[session_id] = {
+            "messages": len(session.messages),
+            "decisions": len(session.decisions),
+            "header": self._header_state(session),
+            "seq": seq,
+            "events": len(events),
+            "segment": segmented,
+            "format": written_with
+        }
+        return session
 
     def delete_session(self, session_id: str):
-        """Delete session file"""
-        session_file = self.sessions_dir / f"{session_id}.json"
+        """Delete session snapshot and journal"""
+        with self._lock:
+            for session_file in self._snapshot_paths(session_id):
+                session_file.unlink()
+            self._journal(session_id).delete()
+            self._segment(session_id).delete()
+            self._segments.pop(session_id, None)
+            self._persisted.pop(session_id, None)
 
-        if session_file.exists():
-            session_file.unlink()
+            self._ensure_index()
+            self.index.remove(session_id)
 
-    def list_sessions(self):
-        """List all sessions"""
-        from core.session import Session
+    def list_sessions(self, offset: int = 0, limit: Optional[int] = None):
+        """List sessions, most recently updated first
 
+        Only sessions on the requested page are loaded.
+        """
         sessions = []
 
-        for session_file in self.sessions_dir.glob("*.json"):
+        for entry in self.query_sessions(offset=offset, limit=limit):
             try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    sessions.append(Session.from_dict(data))
+                session = self.load_session(entry["session_id"])
+                if session:
+                    sessions.append(session)
             except Exception as e:
-                print(f"Warning: Failed to load session from {session_file}: {e}")
-
-        # Sort by updated time
-        sessions.sort(key=lambda s: s.updated_at, reverse=True)
+                print(f"Warning: Failed to load session {entry['session_id']}: {e}")
 
         return sessions
 
+    def get_messages(self, session_id: str, start: int = 0, end: Optional[int] = None):
+        """Get messages[start:end] of a session, reading only that range"""
+        session = self.load_session(session_id)
+        if session is None:
+            return []
+        return list(session.messages[start:end])
+
     def exists(self, session_id: str) -> bool:
         """Check if session exists"""
-        session_file = self.sessions_dir / f"{session_id}.json"
-        return session_file.exists()
+        return self._find_snapshot(session_id) is not None
+
+    def migrate(self, serializer: str) -> int:
+        """Rewrite every stored session with serializer; returns the number converted"""
+        with self._lock:
+            self.serializer = get_serializer(serializer)
+            self.storage_config["serializer"] = serializer
+
+            migrated = 0
+            for session_id in self._session_ids_on_disk():
+                session = self._load_session(session_id)
+                # Compare formats, not extensions: json and orjson share .json
+                if session is None or self._persisted[session_id]["format"] == serializer:
+                    continue
+                self._write_snapshot(session, self._persisted.get(session_id), rewrite_messages=True)
+                self._ensure_index()
+                self.index.upsert(self._index_entry(session))
+                migrated += 1
+
+            return migrated
@@ -0,0 +1,435 @@
+"""
+SQLite Session Store - Sessions in SQLite with full-text search
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from storage.session_index import SORT_FIELDS
+
+
+# fsync policy -> PRAGMA synchronous (WAL mode keeps NORMAL crash-safe)
+SYNCHRONOUS_MODES = {
+    "always": "FULL",
+    "snapshot": "NORMAL",
+    "never": "OFF"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    product_name TEXT NOT NULL DEFAULT '',
+    current_stage TEXT NOT NULL DEFAULT 'initial',
+    metadata TEXT NOT NULL DEFAULT '{}',
+    message_count INTEGER NOT NULL DEFAULT 0,
+    decision_count INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    agent_name TEXT,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    token_count INTEGER,
+    PRIMARY KEY (session_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS decisions (
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    decision_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    decision TEXT NOT NULL,
+    reasoning TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (session_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS decision_participants (
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    participant TEXT NOT NULL,
+    FOREIGN KEY (session_id, position) REFERENCES decisions(session_id, position) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+CREATE INDEX IF NOT EXISTS idx_decisions_topic ON decisions(topic COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_participants ON decision_participants(participant);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content, content='messages', content_rowid='rowid'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS decisions_fts USING fts5(
+    topic, reasoning, content='decisions', content_rowid='rowid'
+);
+
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+    INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS decisions_ai AFTER INSERT ON decisions BEGIN
+    INSERT INTO decisions_fts(rowid, topic, reasoning) VALUES (new.rowid, new.topic, new.reasoning);
+END;
+CREATE TRIGGER IF NOT EXISTS decisions_ad AFTER DELETE ON decisions BEGIN
+    INSERT INTO decisions_fts(decisions_fts, rowid, topic, reasoning)
+    VALUES ('delete', old.rowid, old.topic, old.reasoning);
+END;
+"""
+
+
+def _fts_query(text: str) -> str:
+    """Quote each term so user input can't break FTS5 query syntax"""
+    terms = text.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+class SQLiteSessionStore:
+    """Store sessions in a SQLite database
+
+    Same API as the file-based SessionStore, plus full-text search over
+    message content and decision topics/reasoning. Saves only insert
+    messages and decisions added since the last save.
+    """
+
+    def __init__(self, config: dict):
+        from storage.session_store import DEFAULT_STORAGE_CONFIG
+
+        self.config = config
+        self.storage_config = {**DEFAULT_STORAGE_CONFIG, **config.get("storage", {})}
+        self.db_path = self._get_db_path()
+        self._lock = threading.RLock()
+        # Saves may come from the auto-saver's worker thread
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._setup()
+
+    def _get_db_path(self) -> Path:
+        """Get database path (defaults to sessions.db in the sessions directory)"""
+        db_path = self.storage_config.get("sqlite_path")
+        if not db_path:
+            sessions_path = self.config.get("directories", {}).get("sessions", "~/.cword/sessions")
+            db_path = Path(sessions_path) / "sessions.db"
+
+        path = Path(db_path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _setup(self):
+        """Configure connection and create schema"""
+        synchronous = SYNCHRONOUS_MODES.get(self.storage_config["fsync"], "NORMAL")
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA synchronous={synchronous}")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def save_session(self, session):
+        """Save session, inserting only new messages and decisions"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT message_count, decision_count, size FROM sessions WHERE session_id = ?",
+                (session.session_id,)
+            ).fetchone()
+            saved_messages = row["message_count"] if row else 0
+            saved_decisions = row["decision_count"] if row else 0
+            size = row["size"] if row else 0
+
+            # History only grows; if it shrank, rewrite this session's rows
+            if len(session.messages) < saved_messages or len(session.decisions) < saved_decisions:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session.session_id,))
+                self._conn.execute("DELETE FROM decisions WHERE session_id = ?", (session.session_id,))
+                saved_messages = saved_decisions = size = 0
+
+            new_messages = list(enumerate(session.messages[saved_messages:], start=saved_messages))
+            size += sum(len(message.content.encode("utf-8")) for _, message in new_messages)
+
+            self._conn.execute(
+                """
+                INSERT INTO sessions (
+                    session_id, product_name, current_stage, metadata,
+                    message_count, decision_count, size, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    product_name = excluded.product_name,
+                    current_stage = excluded.current_stage,
+                    metadata = excluded.metadata,
+                    message_count = excluded.message_count,
+                    decision_count = excluded.decision_count,
+                    size = excluded.size,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    session.session_id,
+                    session.product_name,
+                    session.current_stage,
+                    json.dumps(session.metadata, ensure_ascii=False),
+                    len(session.messages),
+                    len(session.decisions),
+                    size,
+                    session.created_at.isoformat(),
+                    session.updated_at.isoformat()
+                )
+            )
+
+            self._conn.executemany(
+                """
+                INSERT INTO messages (
+                    session_id, position, role, agent_name, content,
+                    timestamp, metadata, token_count
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        session.session_id,
+                        position,
+                        message.role,
+                        message.agent_name,
+                        message.content,
+                        message.timestamp.isoformat(),
+                        json.dumps(message.metadata, ensure_ascii=False),
+                        message.token_count
+                    )
+                    for position, message in new_messages
+                ]
+            )
+
+            new_decisions = list(enumerate(session.decisions[saved_decisions:], start=saved_decisions))
+            self._conn.executemany(
+                """
+                INSERT INTO decisions (
+                    session_id, position, decision_id, topic, decision, reasoning, timestamp
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        session.session_id,
+                        position,
+                        decision.id,
+                        decision.topic,
+                        decision.decision,
+                        decision.reasoning,
+                        decision.timestamp.isoformat()
+                    )
+                    for position, decision in new_decisions
+                ]
+            )
+            self._conn.executemany(
+                "INSERT INTO decision_participants (session_id, position, participant) VALUES (?, ?, ?)",
+                [
+                    (session.session_id, position, participant)
+                    for position, decision in new_decisions
+                    for participant in decision.participants
+                ]
+            )
+
+    def load_session(self, session_id: str):
+        """Load session with all messages and decisions"""
+        from core.session import Session
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            return Session.from_dict({
+                "session_id": row["session_id"],
+                "product_name": row["product_name"],
+                "current_stage": row["current_stage"],
+                "metadata": json.loads(row["metadata"]),
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"],
+                "messages": [message.to_dict() for message in self.get_messages(session_id)],
+                "decisions": [
+                    {key: value for key, value in decision.items() if key != "session_id"}
+                    for decision in self._query_decisions("d.session_id = ?", (session_id,))
+                ]
+            })
+
+    def delete_session(self, session_id: str):
+        """Delete session and its messages and decisions"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def exists(self, session_id: str) -> bool:
+        """Check if session exists"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def query_sessions(
+        self,
+        sort_by: str = "updated_at",
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        stage: Optional[str] = None
+    ) -> List[Dict]:
+        """List session entries, sorted and paginated, without loading messages"""
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field: {sort_by}")
+
+        # size is the UTF-8 length of message content, kept up to date on save
+        sql = """
+            SELECT session_id, product_name, current_stage, message_count,
+                   decision_count, created_at, updated_at, size
+            FROM sessions
+        """
+        params: list = []
+        if stage:
+            sql += " WHERE current_stage = ?"
+            params.append(stage)
+        sql += f" ORDER BY {sort_by} {'DESC' if descending else 'ASC'} LIMIT ? OFFSET ?"
+        params.extend([limit if limit is not None else -1, offset])
+
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def list_sessions(self, offset: int = 0, limit: Optional[int] = None):
+        """List sessions, most recently updated first"""
+        return [
+            session
+            for entry in self.query_sessions(offset=offset, limit=limit)
+            for session in [self.load_session(entry["session_id"])]
+            if session
+        ]
+
+    def get_messages(self, session_id: str, start: int = 0, end: Optional[int] = None):
+        """Get messages[start:end] of a session"""
+        from core.session import Message
+
+        sql = "SELECT * FROM messages WHERE session_id = ? AND position >= ?"
+        params: list = [session_id, start]
+        if end is not None:
+            sql += " AND position < ?"
+            params.append(end)
+        sql += " ORDER BY position"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        return [
+            Message.from_dict({
+                "role": row["role"],
+                "agent_name": row["agent_name"],
+                "content": row["content"],
+                "timestamp": row["timestamp"],
+                "metadata": json.loads(row["metadata"]),
+                "token_count": row["token_count"]
+            })
+            for row in rows
+        ]
+
+    def search_messages(
+        self,
+        query: str,
+        limit: int = 20,
+        session_id: Optional[str] = None
+    ) -> List[Dict]:
+        """Full-text search over message content, best matches first"""
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+
+        sql = """
+            SELECT m.session_id, m.position, m.role, m.agent_name, m.timestamp,
+                   snippet(messages_fts, 0, '[', ']', '...', 12) AS snippet
+            FROM messages_fts
+            JOIN messages m ON m.rowid = messages_fts.rowid
+            WHERE messages_fts MATCH ?
+        """
+        params: list = [fts_query]
+        if session_id:
+            sql += " AND m.session_id = ?"
+            params.append(session_id)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def search_decisions(self, query: str, limit: int = 20) -> List[Dict]:
+        """Full-text search over decision topics and reasoning"""
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+
+        return self._query_decisions(
+            "d.rowid IN (SELECT rowid FROM decisions_fts WHERE decisions_fts MATCH ?)",
+            (fts_query,),
+            limit
+        )
+
+    def find_decisions(
+        self,
+        topic: Optional[str] = None,
+        participant: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        """Find decisions across sessions by topic substring and/or participant"""
+        conditions = []
+        params: list = []
+        if topic:
+            conditions.append("d.topic LIKE ? COLLATE NOCASE")
+            params.append(f"%{topic}%")
+        if participant:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM decision_participants p "
+                "WHERE p.session_id = d.session_id AND p.position = d.position AND p.participant = ?)"
+            )
+            params.append(participant)
+
+        return self._query_decisions(" AND ".join(conditions) or "1", tuple(params), limit)
+
+    def _query_decisions(self, where: str, params: tuple, limit: int = -1) -> List[Dict]:
+        """Select decisions with participants, as Decision dicts plus session_id"""
+        sql = f"""
+            SELECT d.*,
+                   (SELECT json_group_array(p.participant) FROM decision_participants p
+                    WHERE p.session_id = d.session_id AND p.position = d.position) AS participants
+            FROM decisions d
+            WHERE {where}
+            ORDER BY d.session_id, d.position
+            LIMIT ?
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+
+        return [
+            {
+                "session_id": row["session_id"],
+                "id": row["decision_id"],
+                "topic": row["topic"],
+                "decision": row["decision"],
+                "participants": json.loads(row["participants"]),
+                "reasoning": row["reasoning"],
+                "timestamp": row["timestamp"]
+            }
+            for row in rows
+        ]
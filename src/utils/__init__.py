@@ -1,6 +1,7 @@
 """Utility Modules"""
 
-from .event_bus import EventBus, Event
+from .event_bus import EventBus, Event, create_event_bus
+from .async_runner import AsyncRunner
 from .logger import setup_logger, get_logger
 from .config import load_config
 from .helpers import generate_id, sanitize_filename
@@ -8,6 +9,8 @@ from .helpers import generate_id, sanitize_filename
 __all__ = [
     "EventBus",
     "Event",
+    "create_event_bus",
+    "AsyncRunner",
     "setup_logger",
     "get_logger",
     "load_config",
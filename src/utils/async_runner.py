@@ -0,0 +1,109 @@
+"""
+Async Runner - Long-lived event loop on a background thread
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Optional
+
+
+class AsyncRunner:
+    """Run coroutines from synchronous code on one persistent event loop
+
+    Unlike calling asyncio.run() per action, the loop (and every HTTP
+    connection pool, cache and background task bound to it) outlives a
+    single call.
+    """
+
+    def __init__(self, name: str = "cword-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """Event loop owned by this runner"""
+        return self._loop
+
+    @property
+    def is_running(self) -> bool:
+        """Check if the background loop is running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the background event loop thread"""
+        if self.is_running:
+            return
+
+        self._loop = asyncio.new_event_loop()
+        self._started.clear()
+        self._thread = threading.Thread(target=self._run_loop, name=self.name, daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        """Thread body: run the loop until stopped"""
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._started.set)
+        self._loop.run_forever()
+
+    def run(self, coro: Awaitable) -> Any:
+        """Run coroutine on the loop and block until it completes
+
+        On Ctrl-C the task is cancelled and given the chance to clean up
+        (e.g. keep partial output) before KeyboardInterrupt is re-raised.
+        """
+        if not self.is_running:
+            self.start()
+
+        task_started: concurrent.futures.Future = concurrent.futures.Future()
+
+        async def _supervised():
+            task_started.set_result(asyncio.current_task())
+            return await coro
+
+        future = asyncio.run_coroutine_threadsafe(_supervised(), self._loop)
+        try:
+            return future.result()
+        except KeyboardInterrupt:
+            if task_started.done():
+                self._loop.call_soon_threadsafe(task_started.result().cancel)
+                try:
+                    future.result()
+                except (concurrent.futures.CancelledError, Exception):
+                    pass
+            else:
+                future.cancel()
+            raise
+
+    def submit(self, coro: Awaitable):
+        """Schedule coroutine on the loop without waiting for it"""
+        if not self.is_running:
+            self.start()
+
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def stop(self, timeout: float = 5.0):
+        """Cancel pending tasks and stop the loop"""
+        if not self.is_running:
+            return
+
+        async def _shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._loop.shutdown_asyncgens()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), self._loop).result(timeout)
+        except Exception as e:
+            print(f"Warning: Event loop shutdown incomplete: {e}")
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop.close()
+        self._thread = None
+        self._loop = None
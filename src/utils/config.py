@@ -59,20 +59,82 @@ def get_default_config() -> Dict:
             "api_key_env": "ANTHROPIC_API_KEY",
             "model": "claude-sonnet-4-5-20250929",
             "temperature": 0.7,
-            "max_tokens": 2000
+            "max_tokens": 2000,
+            "timeout": {
+                "connect": 10,
+                "read": 30,
+                "total": 180
+            }
+        },
+        "llm": {
+            "connection_pool": {
+                "max_connections": 20,
+                "max_keepalive_connections": 10,
+                "keepalive_expiry": 30
+            },
+            "rate_limits": {
+                "anthropic": {
+                    "requests_per_minute": 50,
+                    "tokens_per_minute": 40000,
+                    "max_concurrency": 4
+                },
+                "openai": {
+                    "requests_per_minute": 500,
+                    "tokens_per_minute": 200000,
+                    "max_concurrency": 8
+                }
+            },
+            "retry": {
+                "max_retries": 3,
+                "base_delay": 1.0,
+                "max_delay": 30.0
+            },
+            "cache": {
+                "enabled": False,
+                "directory": "~/.cword/cache/llm",
+                "max_memory_entries": 256,
+                "max_disk_mb": 200,
+                "ttl": 86400
+            }
         },
         "conversation": {
             "max_history": 50,
+            "context_max_tokens": 4000,
+            "context_max_message_tokens": 1000,
+            "context_window_step": 10,
             "summary_interval": 10,
-            "auto_save_interval": 300
+            "summary_fanout": 4,
+            "auto_save_interval": 300,
+            "auto_save_debounce": 2,
+            "all_speak_mode": "concurrent",
+            "stream_responses": True
+        },
+        "events": {
+            "queue_size": 1000,
+            "workers": 4,
+            "overflow": "drop_oldest"
+        },
+        "session_cache": {
+            "max_sessions": 32,
+            "max_tokens": 2000000
+        },
+        "storage": {
+            "backend": "file",
+            "fsync": "snapshot",
+            "compact_every": 200,
+            "serializer": "json"
         },
         "documents": {
             "format": "markdown",
             "include_decision_history": True,
             "include_conversation_summary": True,
-            "auto_export": False
+            "auto_export": False,
+            "template_cache": "~/.cword/cache/jinja",
+            "llm_extraction": True,
+            "extraction_input_tokens": 8000
         },
-        "agents_config": "config/agents.yaml"
+        "agents_config": "config/agents.yaml",
+        "keywords_config": "config/keywords.yaml"
     }
 
 
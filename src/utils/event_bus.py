@@ -2,10 +2,25 @@
 Event Bus - Event-driven communication system
 """
 
-from typing import Callable, Dict, List, Any
-from collections import defaultdict
-from asyncio import create_task
 import asyncio
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+# What to do when a subscriber's queue is full:
+# "block" (publisher waits), "drop_newest" or "drop_oldest"
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+# Event bus defaults, overridable via `events` in cword.yaml
+DEFAULT_EVENT_BUS_CONFIG = {
+    "queue_size": 1000,
+    "workers": 4,
+    "overflow": "drop_oldest"
+}
 
 
 class Event:
@@ -20,62 +35,299 @@ class Event:
         return f"Event(type={self.type}, data={self.data})"
 
 
-class EventBus:
-    """Event bus for pub/sub communication"""
+class _Subscription:
+    """Callback bound to one worker, so its events arrive in order
+
+    Events wait in the subscription's own buffer; its worker's queue holds
+    one turn per buffered event.
+    """
+
+    def __init__(self, event_type: str, callback: Callable, is_async: bool, worker: int):
+        self.event_type = event_type
+        self.callback = callback
+        self.is_async = is_async
+        self.worker = worker
+        self.active = True
+        self.buffer: Deque[Event] = deque()
+        # Publishers waiting for room under the "block" policy
+        self.waiters: Deque[asyncio.Future] = deque()
+
+
+class TopicStats:
+    """Delivery counters and handler latency for one event type"""
 
     def __init__(self):
-        self._listeners: Dict[str, List[Callable]] = defaultdict(list)
-        self._async_listeners: Dict[str, List[Callable]] = defaultdict(list)
+        self.delivered = 0
+        self.errors = 0
+        self.dropped = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float, failed: bool):
+        self.delivered += 1
+        self.errors += failed
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "delivered": self.delivered,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "mean_seconds": self.total_seconds / self.delivered if self.delivered else 0.0,
+            "max_seconds": self.max_seconds
+        }
+
+
+def create_event_bus(config: dict) -> "EventBus":
+    """Create event bus from the `events` section of config"""
+    events_config = {**DEFAULT_EVENT_BUS_CONFIG, **config.get("events", {})}
+    return EventBus(
+        queue_size=int(events_config["queue_size"]),
+        workers=int(events_config["workers"]),
+        overflow=events_config["overflow"]
+    )
+
+
+class EventBus:
+    """Event bus for pub/sub communication
+
+    Publishing only enqueues: handlers run on a pool of worker tasks, so a
+    slow subscriber never holds up the publisher. Each subscription is
+    pinned to one worker with its own bounded queue, which keeps delivery
+    to a subscriber in publish order while different subscribers run side
+    by side. Each subscription holds up to queue_size pending events; when
+    that is full the `overflow` policy either makes the publisher wait or
+    drops one of that subscription's events, never another's. Sync
+    callbacks run on the worker too and should stay quick; do blocking
+    work in a thread.
+
+    Workers start on the event loop of the first publish. Events published
+    from other threads are handed to that loop. Events published before
+    any loop exists, or still pending when publishing moves to another
+    loop, are delivered by the workers on the new loop.
+    """
+
+    def __init__(self, queue_size: int = 1000, workers: int = 4, overflow: str = "drop_oldest"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.queue_size = max(1, queue_size)
+        self.worker_count = max(1, workers)
+        self.overflow = overflow
+
+        self._subscriptions: Dict[str, List[_Subscription]] = defaultdict(list)
+        self._next_worker = itertools.count()
+        self._stats: Dict[str, TopicStats] = defaultdict(TopicStats)
+        self._lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Per worker: one subscription entry per event to deliver
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
 
     def subscribe(self, event_type: str, callback: Callable):
         """Subscribe to synchronous event"""
-        self._listeners[event_type].append(callback)
+        self._add(event_type, callback, is_async=False)
 
     def subscribe_async(self, event_type: str, callback: Callable):
         """Subscribe to asynchronous event"""
-        self._async_listeners[event_type].append(callback)
+        self._add(event_type, callback, is_async=True)
+
+    def _add(self, event_type: str, callback: Callable, is_async: bool):
+        """Register subscription, spreading subscriptions over workers"""
+        worker = next(self._next_worker) % self.worker_count
+        with self._lock:
+            self._subscriptions[event_type].append(_Subscription(event_type, callback, is_async, worker))
 
     def unsubscribe(self, event_type: str, callback: Callable):
-        """Unsubscribe from event"""
-        if callback in self._listeners[event_type]:
-            self._listeners[event_type].remove(callback)
+        """Unsubscribe from event; events already queued for it are skipped"""
+        with self._lock:
+            for subscription in self._subscriptions[event_type]:
+                if subscription.callback == callback:
+                    subscription.active = False
+            self._subscriptions[event_type] = [
+                subscription for subscription in self._subscriptions[event_type]
+                if subscription.active
+            ]
 
-    def publish(self, event: Event):
-        """Publish event to synchronous subscribers"""
-        for callback in self._listeners[event.type]:
-            try:
-                callback(event)
-            except Exception as e:
-                print(f"Error in event handler: {e}")
+    def _targets(self, event: Event) -> List[_Subscription]:
+        """Subscriptions to deliver event to"""
+        if event.timestamp is None:
+            event.timestamp = datetime.now()
+        with self._lock:
+            return list(self._subscriptions.get(event.type, ()))
+
+    async def publish(self, event: Event):
+        """Queue event for all subscribers
+
+        Returns once the event is queued; with the "block" policy that waits
+        for room when a subscriber is backed up.
+        """
+        self._ensure_started()
+        for subscription in self._targets(event):
+            if self.overflow == "block":
+                while subscription.active and len(subscription.buffer) >= self.queue_size:
+                    waiter = self._loop.create_future()
+                    subscription.waiters.append(waiter)
+                    await waiter
+            self._put_nowait(subscription, event)
+
+    # Kept for callers of the old API
+    publish_async = publish
 
     def publish_sync(self, event: Event):
-        """Publish event synchronously (alias for publish)"""
-        self.publish(event)
+        """Queue event without waiting; safe to call from any thread
 
-    async def publish_async(self, event: Event):
-        """Publish event to asynchronous subscribers"""
-        tasks = []
+        A full queue can't block here, so the "block" policy drops the
+        new event instead.
+        """
+        targets = self._targets(event)
+        loop = self._loop
 
-        for callback in self._async_listeners[event.type]:
-            task = create_task(callback(event))
-            tasks.append(task)
+        if loop is None or loop.is_closed():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # No loop yet: buffer events until workers start
+                for subscription in targets:
+                    self._buffer(subscription, event)
+                return
+            self._ensure_started()
+            loop = self._loop
 
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        for subscription in targets:
+            if self._on_loop(loop):
+                self._put_nowait(subscription, event)
+            else:
+                loop.call_soon_threadsafe(self._put_nowait, subscription, event)
 
-    async def publish(self, event: Event):
-        """Publish event to both sync and async subscribers"""
-        # First notify sync subscribers
-        for callback in self._listeners[event.type]:
+    @staticmethod
+    def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+        """Whether the caller runs on loop"""
+        try:
+            return asyncio.get_running_loop() is loop
+        except RuntimeError:
+            return False
+
+    def _put_nowait(self, subscription: _Subscription, event: Event):
+        """Queue delivery on the running workers"""
+        if self._buffer(subscription, event):
+            self._queues[subscription.worker].put_nowait(subscription)
+
+    def _buffer(self, subscription: _Subscription, event: Event) -> bool:
+        """Add event to subscription's buffer, applying the overflow policy
+
+        Returns whether the buffer grew, i.e. the worker needs another turn.
+        """
+        if len(subscription.buffer) >= self.queue_size:
+            if self.overflow == "drop_oldest":
+                # The dropped event's turn delivers the next one instead
+                self._record_drop(subscription.buffer.popleft())
+                subscription.buffer.append(event)
+            else:
+                self._record_drop(event)
+            return False
+        subscription.buffer.append(event)
+        return True
+
+    def _record_drop(self, event: Event):
+        """Count dropped event, warning the first time a topic drops"""
+        stats = self._stats[event.type]
+        if not stats.dropped:
+            print(f"Warning: Event queue full, dropping '{event.type}' events")
+        stats.dropped += 1
+
+    def _ensure_started(self):
+        """Start workers on the running loop if they aren't running there"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+
+        # Workers of a previous loop that is still open stop there
+        if self._loop is not None and not self._loop.is_closed():
+            for worker in self._workers:
+                self._loop.call_soon_threadsafe(worker.cancel)
+
+        self._loop = loop
+        # Buffers are bounded per subscription, so the queues need no limit
+        self._queues = [asyncio.Queue() for _ in range(self.worker_count)]
+        self._workers = [
+            loop.create_task(self._work(queue)) for queue in self._queues
+        ]
+
+        # Hand everything still buffered to the new workers
+        with self._lock:
+            subscriptions = [
+                subscription
+                for subscriptions in self._subscriptions.values()
+                for subscription in subscriptions
+            ]
+        for subscription in subscriptions:
+            subscription.waiters.clear()
+            for _ in range(len(subscription.buffer)):
+                self._queues[subscription.worker].put_nowait(subscription)
+
+    async def _work(self, queue: asyncio.Queue):
+        """Deliver queued events one at a time"""
+        while True:
+            subscription = await queue.get()
             try:
-                callback(event)
-            except Exception as e:
-                print(f"Error in sync event handler: {e}")
+                if subscription.buffer:
+                    event = subscription.buffer.popleft()
+                    self._wake_publisher(subscription)
+                    if subscription.active:
+                        await self._deliver(subscription, event)
+            finally:
+                queue.task_done()
+
+    @staticmethod
+    def _wake_publisher(subscription: _Subscription):
+        """Let the first publisher waiting for room in subscription's buffer go on"""
+        while subscription.waiters:
+            waiter = subscription.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def _deliver(self, subscription: _Subscription, event: Event):
+        """Run handler and record its latency"""
+        failed = False
+        started = time.perf_counter()
+        try:
+            result = subscription.callback(event)
+            if subscription.is_async or asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            failed = True
+            print(f"Error in event handler: {e}")
+        self._stats[event.type].record(time.perf_counter() - started, failed)
+
+    async def drain(self):
+        """Wait until every queued event has been handled"""
+        self._ensure_started()
+        for queue in list(self._queues):
+            await queue.join()
+
+    async def close(self):
+        """Deliver queued events, then stop the workers"""
+        if not self._workers or self._loop is not asyncio.get_running_loop():
+            return
+        await self.drain()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues = []
+        self._loop = None
 
-        # Then notify async subscribers
-        await self.publish_async(event)
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Delivery counts and handler latency per event type"""
+        return {event_type: stats.to_dict() for event_type, stats in self._stats.items()}
 
     def clear(self):
         """Clear all subscribers"""
-        self._listeners.clear()
-        self._async_listeners.clear()
+        with self._lock:
+            for subscriptions in self._subscriptions.values():
+                for subscription in subscriptions:
+                    subscription.active = False
+            self._subscriptions.clear()
@@ -90,3 +90,106 @@ async def test_agent_build_prompt():
     assert "Product Manager" in prompt
     assert "Hello" in prompt
     assert "Hi there" in prompt
+
+
+class StreamingMockLLMProvider(MockLLMProvider):
+    """Mock LLM Provider with streaming support"""
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        for chunk in ["This is ", "a streamed ", "response"]:
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_agent_stream_response():
+    """Test streaming uses the same role-specific prompt"""
+    config = AgentConfig({
+        "name": "Product Manager",
+        "role": "product_manager",
+        "description": "Test PM agent",
+        "system_prompt": "You are a PM",
+        "language": "en"
+    })
+    agent = ProductManagerAgent(config, StreamingMockLLMProvider())
+
+    from core.session import Message
+    messages = [Message(role="user", content="I want to build a todo app")]
+    context = {"stage": "initial"}
+
+    chunks = [chunk async for chunk in agent.stream_response(messages, context)]
+
+    assert "".join(chunks) == "This is a streamed response"
+    assert "clarifying questions" in agent.build_agent_prompt(messages, context)
+
+
+def test_agent_build_messages():
+    """Test conversation is sent as role-tagged turns"""
+    config = AgentConfig({
+        "name": "Product Manager",
+        "role": "product_manager",
+        "description": "Test PM agent",
+        "system_prompt": "You are a PM",
+        "language": "en"
+    })
+    agent = ProductManagerAgent(config, MockLLMProvider())
+
+    from core.session import Message
+    messages = [
+        Message(role="user", content="I want to build a todo app"),
+        Message(role="agent", agent_name="Product Manager", content="Who is it for?"),
+        Message(role="user", content="Students"),
+        Message(role="agent", agent_name="Tech Lead", content="Web or mobile?")
+    ]
+
+    prompt = agent.build_agent_prompt(messages, {"stage": "initial"})
+
+    assert prompt.system.startswith("You are Product Manager")
+    assert "clarifying questions" in prompt.system
+    assert [turn["role"] for turn in prompt.messages] == ["user", "assistant", "user"]
+    assert prompt.messages[1]["content"] == "Who is it for?"
+    assert prompt.messages[2]["content"] == "User: Students\n\nTech Lead: Web or mobile?"
+    # Up to the turn before the newest message, and the whole prompt
+    assert prompt.cache_breakpoints == (1, 2)
+
+    # Conversations must start and end on a user turn
+    own_only = agent.build_messages([messages[1]])
+    assert [turn["role"] for turn in own_only.messages] == ["user", "assistant", "user"]
+
+    # A summary of dropped history opens the conversation, outside the system prompt
+    agent.context_manager.max_messages = 2
+    summarized = agent.build_messages(messages, summary="They want a todo app")
+    assert "todo app" not in summarized.system
+    assert summarized.messages[0]["content"].startswith("Summary of the earlier conversation:\nThey want a todo app")
+    assert summarized.system == agent.build_system_prompt()
+    assert "Students" not in summarized.messages[1]["content"]
+
+    # Messages the summary hasn't reached yet stay in the history
+    caught_up = agent.build_messages(messages, summary="They want a todo app", summary_watermark=1)
+    assert caught_up.messages[1] == {"role": "assistant", "content": "Who is it for?"}
+    assert "User: Students" in caught_up.messages[2]["content"]
+
+
+def test_agent_prompt_prefix_survives_window():
+    """Test the cached history prefix is shared by most successive prompts"""
+    from core.context_manager import ContextManager
+    from core.session import Message
+
+    config = AgentConfig({"name": "Product Manager", "role": "product_manager", "description": "PM"})
+    agent = ProductManagerAgent(config, MockLLMProvider(), ContextManager(max_messages=8, window_step=4))
+    speakers = [None, "Product Manager", None, "Tech Lead"]
+    messages = [
+        Message(role="agent" if speakers[i % 4] else "user", agent_name=speakers[i % 4], content=f"Point {i}")
+        for i in range(40)
+    ]
+
+    hits = 0
+    previous = None
+    for count in range(1, len(messages) + 1):
+        prompt = agent.build_messages(messages[:count])
+        if previous is not None and previous.cache_breakpoints:
+            cached = previous.messages[:previous.cache_breakpoints[0] + 1]
+            hits += prompt.messages[:len(cached)] == cached
+        previous = prompt
+
+    # Well past the 8-message window, the prefix only breaks when it moves
+    assert hits >= 28
@@ -4,7 +4,6 @@ Integration Tests - End-to-End System Tests
 
 import pytest
 import asyncio
-from pathlib import Path
 import tempfile
 import shutil
 
@@ -12,7 +11,6 @@ from core.session import SessionManager, Message
 from core.coordinator import AgentCoordinator
 from agents.factory import AgentFactory
 from documents.generator import DocumentGenerator
-from storage.session_store import SessionStore
 from storage.document_store import DocumentStore
 
 
@@ -53,6 +51,9 @@ def temp_config():
             "model": "claude-test",
             "temperature": 0.7,
             "max_tokens": 2000
+        },
+        "documents": {
+            "template_cache": temp_dir + "/cache/jinja"
         }
     }
 
@@ -185,6 +186,19 @@ async def test_coordinator_suggestions(mock_agents):
     assert isinstance(suggestions, list)
 
 
+@pytest.mark.asyncio
+async def test_coordinator_routes_by_keywords(mock_agents):
+    """Test keyword groups route to agents by role and flag decisions"""
+    coordinator = AgentCoordinator(mock_agents)
+    session = SessionManager({}).create_session()
+
+    session.add_message(Message(role="user", content="Which Database and API framework?"))
+    assert coordinator.suggest_agents(session) == ["Tech Lead", "Product Manager"]
+
+    session.add_message(Message(role="user", content="Let's just use SQLite"))
+    assert coordinator.should_confirm_decision(session)
+
+
 @pytest.mark.asyncio
 async def test_document_generation(temp_config):
     """Test document generation"""
@@ -327,3 +341,389 @@ async def test_full_workflow(temp_config, mock_agents):
     assert decision_path.exists()
     assert len(session.messages) >= 2
     assert len(session.decisions) == 1
+
+
+class DelayedLLMProvider(MockLLMProvider):
+    """Mock LLM Provider answering after a fixed delay"""
+
+    def __init__(self, reply: str, delay: float):
+        super().__init__()
+        self.reply = reply
+        self.delay = delay
+        self.prompts = []
+
+    async def generate(self, prompt: str, max_tokens=2000, temperature=0.7) -> str:
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        return self.reply
+
+
+@pytest.mark.asyncio
+async def test_let_all_speak_concurrent(mock_agents):
+    """Test concurrent round shows completions early but commits in agent order"""
+    mock_agents[0].llm = DelayedLLMProvider("PM answer", 0.2)
+    mock_agents[1].llm = DelayedLLMProvider("Tech answer", 0.05)
+    coordinator = AgentCoordinator(mock_agents)
+
+    session = SessionManager({}).create_session("Concurrent Test")
+    session.add_message(Message(role="user", content="Build a chat app"))
+
+    shown = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    responses = await coordinator.let_all_speak(
+        session,
+        on_response=lambda name, response: shown.append(name)
+    )
+    elapsed = loop.time() - started
+
+    assert shown == ["Tech Lead", "Product Manager"]
+    assert responses == ["PM answer", "Tech answer"]
+    assert [m.agent_name for m in session.messages[1:]] == ["Product Manager", "Tech Lead"]
+    # Roughly the slowest agent, not the sum
+    assert elapsed < 0.24
+    # Both agents saw the same snapshot without each other's answers
+    assert "PM answer" not in mock_agents[1].llm.prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_let_all_speak_sequential(mock_agents):
+    """Test sequential round lets each agent see previous answers"""
+    mock_agents[0].llm = DelayedLLMProvider("PM answer", 0)
+    mock_agents[1].llm = DelayedLLMProvider("Tech answer", 0)
+    coordinator = AgentCoordinator(mock_agents)
+
+    session = SessionManager({}).create_session("Sequential Test")
+    session.add_message(Message(role="user", content="Build a chat app"))
+
+    await coordinator.let_all_speak(session, mode="sequential")
+
+    assert "PM answer" in mock_agents[1].llm.prompts[0]
+    assert len(session.messages) == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_agent_speak(mock_agents):
+    """Test streaming yields chunks and commits the message only at the end"""
+    coordinator = AgentCoordinator(mock_agents)
+    session = SessionManager({}).create_session("Streaming Test")
+    session.add_message(Message(role="user", content="Build a chat app"))
+
+    chunks = []
+    final = None
+    async for event in coordinator.stream_agent_speak("Product Manager", session):
+        if event.type == "chunk":
+            chunks.append(event.text)
+            # Nothing committed while streaming
+            assert len(session.messages) == 1
+        else:
+            final = event
+
+    assert final is not None
+    assert final.text == "".join(chunks)
+    assert session.messages[-1] is final.message
+    assert final.message.agent_name == "Product Manager"
+
+
+class SlowStreamLLMProvider(MockLLMProvider):
+    """Mock LLM Provider that stalls mid-stream"""
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        yield "Partial "
+        yield "answer"
+        await asyncio.sleep(10)
+        yield " never sent"
+
+
+@pytest.mark.asyncio
+async def test_stream_cancellation_keeps_partial_message(mock_agents):
+    """Test cancelling a stream commits partial text as an interrupted message"""
+    mock_agents[0].llm = SlowStreamLLMProvider()
+    coordinator = AgentCoordinator(mock_agents)
+    session = SessionManager({}).create_session("Cancel Test")
+    session.add_message(Message(role="user", content="Build a chat app"))
+
+    async def consume():
+        async for _ in coordinator.stream_agent_speak("Product Manager", session):
+            pass
+
+    task = asyncio.ensure_future(consume())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert session.messages[-1].content == "Partial answer"
+    assert session.messages[-1].metadata == {"interrupted": True}
+
+
+class SummaryLLMProvider(MockLLMProvider):
+    """Mock provider recording summarization prompts"""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    async def generate(self, prompt: str, max_tokens=2000, temperature=0.7) -> str:
+        self.prompts.append(prompt)
+        return f"summary {len(self.prompts)}"
+
+
+@pytest.mark.asyncio
+async def test_rolling_summary_is_incremental():
+    """Test only new messages are folded in, with higher-level merges"""
+    from core.session import Session
+    from core.summarizer import ConversationSummarizer
+
+    llm = SummaryLLMProvider()
+    summarizer = ConversationSummarizer(llm, interval=2, fanout=2)
+    session = Session(session_id="summary")
+
+    for i in range(7):
+        session.add_message(Message(role="user", content=f"message {i}"))
+    await summarizer.update(session)
+
+    state = session.metadata["summary"]
+    assert state["watermark"] == 6
+    # Three batches, then the first level overflowed into one merged entry
+    assert len(llm.prompts) == 4
+    assert state["levels"] == [[], ["summary 4"]]
+    assert state["text"] == "summary 4"
+    assert "message 0" not in llm.prompts[1]
+    assert "message 2" in llm.prompts[1]
+
+    # Nothing new to fold: no further LLM calls
+    await summarizer.update(session)
+    assert len(llm.prompts) == 4
+
+
+@pytest.mark.asyncio
+async def test_coordinator_schedules_summary(mock_agents):
+    """Test agent turns trigger background summary updates"""
+    from core.session import Session
+    from core.summarizer import ConversationSummarizer
+
+    summarizer = ConversationSummarizer(SummaryLLMProvider(), interval=2)
+    coordinator = AgentCoordinator(mock_agents, summarizer=summarizer)
+    session = Session(session_id="summary")
+    session.add_message(Message(role="user", content="Build a todo app"))
+
+    await coordinator.let_agent_speak(mock_agents[0].name, session)
+    await coordinator.wait_for_summaries()
+
+    assert ConversationSummarizer.get_summary(session) == "summary 1"
+    assert coordinator._build_context(session)["summary"] == "summary 1"
+
+
+@pytest.mark.asyncio
+async def test_coordinator_publishes_decisions(mock_agents):
+    """Test record_decision reaches decision_made subscribers"""
+    coordinator = AgentCoordinator(mock_agents)
+    session = SessionManager({}).create_session()
+    received = []
+    coordinator.event_bus.subscribe("decision_made", lambda event: received.append(event.data["topic"]))
+
+    coordinator.record_decision(session, "Database", "SQLite", ["Tech Lead"], "Simple")
+    await coordinator.event_bus.drain()
+
+    assert received == ["Database"]
+
+
+@pytest.mark.asyncio
+async def test_realtime_preview_renders_incrementally(temp_config):
+    """Test preview sections only re-render what changed"""
+    from core.session import Decision
+
+    generator = DocumentGenerator(temp_config)
+    session = SessionManager(temp_config).create_session("Chat App")
+    session.add_message(Message(role="user", content="Build a chat app"))
+
+    def decide(n: int, topic: str = "Technical stack") -> Decision:
+        return Decision(id=f"d{n}", topic=topic, decision=f"Choice {n}", participants=[], reasoning="")
+
+    session.add_decision(decide(1))
+    first = await generator.generate_realtime_preview(session)
+    assert "- Choice 1" in first
+
+    seen = []
+    original = session.decisions
+
+    class CountingList(list):
+        def __getitem__(self, index):
+            items = super().__getitem__(index)
+            seen.extend(items if isinstance(index, slice) else [items])
+            return items
+
+    session.decisions = CountingList(original)
+    session.add_decision(decide(2, topic="Pricing"))
+    second = await generator.generate_realtime_preview(session)
+
+    # Only the new decision was looked at, and it joined the features list
+    assert [d.id for d in seen] == ["d2", "d2"]
+    assert "- Choice 1\n- Choice 2" in second
+    assert await generator.generate_realtime_preview(session) == second
+
+    # Editing an existing decision re-renders the sections
+    session.decisions[0].decision = "Changed"
+    session.touch(decisions=True)
+    assert "- Changed" in await generator.generate_realtime_preview(session)
+
+
+@pytest.mark.asyncio
+async def test_templates_compiled_once(temp_config, tmp_path):
+    """Test compiled templates are shared and reloaded when a file changes"""
+    import os
+
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    template_file = template_dir / "prd_template.md"
+    template_file.write_text("v1 {{ product_name }}")
+
+    first = DocumentGenerator(temp_config)
+    first.env = first._get_environment(str(template_dir), temp_config["documents"]["template_cache"])
+    second = DocumentGenerator(temp_config)
+    second.env = second._get_environment(str(template_dir), temp_config["documents"]["template_cache"])
+    assert first.env is second.env
+
+    session = SessionManager(temp_config).create_session("Chat App")
+    assert await first.generate_prd(session) == "v1 Chat App"
+    assert first._get_template("prd_template.md") is second._get_template("prd_template.md")
+    assert os.listdir(temp_config["documents"]["template_cache"])
+
+    # Edited template is recompiled on the next render
+    template_file.write_text("v2 {{ product_name }}")
+    stat = template_file.stat()
+    os.utime(template_file, (stat.st_atime, stat.st_mtime + 5))
+    assert await second.generate_prd(session) == "v2 Chat App"
+
+    # Missing templates fall back to the built-in one, compiled once
+    assert first._get_template("tech_spec_template.md") is second._get_template("tech_spec_template.md")
+
+
+@pytest.mark.asyncio
+async def test_export_pipeline_runs_documents_concurrently(temp_config):
+    """Test documents are generated side by side and failures stay isolated"""
+    import asyncio
+    from documents.export import DocumentType, ExportPipeline
+    from storage.document_store import DocumentStore
+
+    session = SessionManager(temp_config).create_session("Chat App")
+    session.add_message(Message(role="user", content="Build a chat app"))
+    pipeline = ExportPipeline(DocumentGenerator(temp_config), DocumentStore(temp_config))
+
+    async def slow(generator, session):
+        await asyncio.sleep(0.2)
+        return f"# {session.product_name} notes"
+
+    async def broken(generator, session):
+        raise RuntimeError("no data")
+
+    pipeline.register(DocumentType("notes", "Notes", slow))
+    pipeline.register(DocumentType("other_notes", "Other_Notes", slow))
+    pipeline.register(DocumentType("broken", "Broken", broken))
+
+    started = asyncio.get_running_loop().time()
+    results = await pipeline.export(session)
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert [r.document.name for r in results] == [
+        "prd", "tech_spec", "decision_history", "notes", "other_notes", "broken"
+    ]
+    assert elapsed < 0.35
+    assert all(r.ok and r.path.exists() for r in results[:5])
+    assert results[3].path.read_text(encoding="utf-8") == "# Chat App notes"
+    assert results[3].generate_seconds >= 0.2
+    assert isinstance(results[5].error, RuntimeError)
+
+    with pytest.raises(ValueError):
+        await pipeline.export(session, names=["missing"])
+
+
+class ExtractionLLMProvider(MockLLMProvider):
+    """Mock provider replying with queued extraction JSON"""
+
+    def __init__(self, replies):
+        super().__init__()
+        self.replies = list(replies)
+
+    async def generate(self, prompt: str, max_tokens=2000, temperature=0.7) -> str:
+        self.call_count += 1
+        await asyncio.sleep(0.05)
+        return self.replies.pop(0)
+
+    def count_tokens(self, text: str) -> int:
+        return len(text) // 4
+
+
+@pytest.mark.asyncio
+async def test_document_extraction_shared_across_documents(temp_config):
+    """Test one validated extraction fills PRD, tech spec and preview"""
+    import json
+    from documents.extraction import DocumentExtractor
+
+    reply = json.dumps({
+        "product_background": "Teams lose context across chat tools",
+        "target_users": [{"name": "Team lead", "description": "Runs a small team"}],
+        "core_value": "One place for team context",
+        "user_stories": [{"title": "Catch up", "user": "Team lead", "goal": "Read history", "story": "Skim the day"}],
+        "features": {"p0": ["Group chat"], "p1": ["Search"]},
+        "architecture": "Single web service with websockets",
+        "tech_stack": {"backend": "FastAPI", "frontend": "React", "database": "PostgreSQL"}
+    })
+    # First reply fails validation and is repaired
+    llm = ExtractionLLMProvider(['```json\n{"target_users": "everyone"}\n```', reply])
+    generator = DocumentGenerator(temp_config, extractor=DocumentExtractor(llm))
+    session = SessionManager(temp_config).create_session("Chat App")
+    session.add_message(Message(role="user", content="Build a chat app for teams"))
+
+    prd, tech_spec = await asyncio.gather(generator.generate_prd(session), generator.generate_tech_spec(session))
+    preview = await generator.generate_realtime_preview(session)
+
+    assert llm.call_count == 2
+    assert "Teams lose context" in prd and "Team lead" in prd and "Group chat" in prd
+    assert "FastAPI" in tech_spec and "websockets" in tech_spec
+    assert "Catch up" in preview and "[P0] Group chat" in preview
+
+    # A new message invalidates the cached extraction
+    llm.replies.append(reply)
+    session.add_message(Message(role="user", content="Add search"))
+    await generator.generate_prd(session)
+    assert llm.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_document_extraction_failure_uses_placeholders(temp_config):
+    """Test documents still render when extraction gives no valid data"""
+    from documents.extraction import DocumentExtractor
+
+    llm = ExtractionLLMProvider(["not json", "still not json"])
+    generator = DocumentGenerator(temp_config, extractor=DocumentExtractor(llm))
+    session = SessionManager(temp_config).create_session("Chat App")
+    session.add_message(Message(role="user", content="Build a chat app"))
+
+    tech_spec = await generator.generate_tech_spec(session)
+    assert "System architecture to be designed" in tech_spec
+    assert generator.extractor.cached(session) is None
+
+
+@pytest.mark.asyncio
+async def test_realtime_preview_does_not_wait_for_extraction(temp_config):
+    """Test the preview shows placeholders while extraction runs in the background"""
+    import json
+    from documents.extraction import DocumentExtractor
+
+    reply = json.dumps({"features": {"p0": ["Group chat"]}})
+    llm = ExtractionLLMProvider([reply])
+    generator = DocumentGenerator(temp_config, extractor=DocumentExtractor(llm))
+    session = SessionManager(temp_config).create_session("Chat App")
+    session.add_message(Message(role="user", content="Build a chat app for teams"))
+
+    preview = await generator.generate_realtime_preview(session)
+    assert "Group chat" not in preview
+    assert generator.extractor.cached(session) is None
+
+    # A second preview while the first extraction runs doesn't start another
+    await generator.generate_realtime_preview(session)
+    await asyncio.sleep(0.1)
+    assert llm.call_count == 1
+    assert "[P0] Group chat" in await generator.generate_realtime_preview(session)
@@ -0,0 +1,401 @@
+"""
+Tests for LLM Provider Layer
+"""
+
+import asyncio
+
+import pytest
+
+from llm.base import ChatPrompt, LLMError, LLMProvider, normalize_timeouts
+from llm.cache import CachedLLMProvider, ResponseCache
+from llm.providers import AnthropicProvider, _to_llm_error, create_llm_provider
+from llm.registry import ClientRegistry
+from llm.scheduler import RequestScheduler, TokenBucket
+
+
+def test_registry_shares_client_for_same_settings():
+    """Test providers with identical settings share one client"""
+    registry = ClientRegistry({"max_connections": 5})
+    config = {"provider": "anthropic", "api_key": "test-key-123456", "model": "claude-test"}
+
+    provider_a = create_llm_provider(config, registry=registry)
+    provider_b = create_llm_provider({**config, "model": "claude-other"}, registry=registry)
+
+    assert provider_a.client is provider_b.client
+    assert len(registry) == 1
+
+
+def test_registry_separates_different_settings():
+    """Test different keys get separate clients"""
+    registry = ClientRegistry()
+    base = {"provider": "anthropic", "api_key": "test-key-123456", "model": "claude-test"}
+
+    provider_a = create_llm_provider(base, registry=registry)
+    provider_b = create_llm_provider({**base, "api_key": "other-key-123456"}, registry=registry)
+    provider_c = create_llm_provider({**base, "provider": "openai"}, registry=registry)
+
+    assert provider_a.client is not provider_b.client
+    assert provider_a.client is not provider_c.client
+    assert len(registry) == 3
+
+
+@pytest.mark.asyncio
+async def test_registry_close():
+    """Test closing registry releases clients"""
+    registry = ClientRegistry()
+    registry.get_client("openai", "test-key-123456")
+
+    await registry.aclose()
+
+    assert len(registry) == 0
+
+
+class CountingProvider(LLMProvider):
+    """Fake provider counting upstream calls"""
+
+    def __init__(self):
+        super().__init__("fake-model", "test-key-123456")
+        self.calls = 0
+
+    async def generate(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7) -> str:
+        self.calls += 1
+        return f"answer to {prompt}"
+
+    async def generate_stream(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7):
+        self.calls += 1
+        for chunk in ["answer ", "to ", prompt]:
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_cached_provider_generate(tmp_path):
+    """Test repeated prompts are served from cache"""
+    inner = CountingProvider()
+    cache = ResponseCache({"directory": str(tmp_path)})
+    provider = CachedLLMProvider(inner, cache)
+
+    first = await provider.generate("hello")
+    second = await provider.generate("hello")
+    other = await provider.generate("hello", temperature=0.1)
+
+    assert first == second == "answer to hello"
+    assert other == first
+    assert inner.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_stream_replays_chunks(tmp_path):
+    """Test cached streams replay the same chunks from disk"""
+    inner = CountingProvider()
+    provider = CachedLLMProvider(inner, ResponseCache({"directory": str(tmp_path)}))
+
+    live = [chunk async for chunk in provider.generate_stream("hi")]
+
+    # Fresh cache instance only has the on-disk copy
+    replay_provider = CachedLLMProvider(inner, ResponseCache({"directory": str(tmp_path)}))
+    replayed = [chunk async for chunk in replay_provider.generate_stream("hi")]
+
+    assert live == replayed == ["answer ", "to ", "hi"]
+    assert inner.calls == 1
+
+
+def test_response_cache_lru_and_ttl(tmp_path):
+    """Test memory LRU bound and ttl expiry"""
+    cache = ResponseCache({"directory": str(tmp_path), "max_memory_entries": 2, "ttl": 0})
+    for name in ["a", "b", "c"]:
+        cache.set(name * 8, [name])
+
+    assert cache.get_memory("aaaaaaaa") is None
+    assert cache.get_memory("cccccccc") == ["c"]
+    # Evicted from memory but still on disk
+    assert cache.get("aaaaaaaa") == ["a"]
+
+    expiring = ResponseCache({"directory": str(tmp_path / "ttl"), "ttl": 1})
+    expiring.set("dddddddd", ["d"])
+    expiring._memory["dddddddd"] = (0, ["d"])
+    assert expiring.get_memory("dddddddd") is None
+
+
+@pytest.mark.asyncio
+async def test_scheduler_retries_with_retry_after():
+    """Test retryable errors are retried and counted"""
+    scheduler = RequestScheduler({"base_delay": 0.001, "max_retries": 3})
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise LLMError("rate limited", status_code=429, retry_after=0.01, retryable=True)
+        return "ok"
+
+    assert await scheduler.run(flaky) == "ok"
+    assert len(attempts) == 3
+    assert scheduler.stats["retries"] == 2
+    assert scheduler.stats["rate_limited"] == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_releases_slot_during_backoff():
+    """Test backoff frees the slot and every attempt takes a rate-limit token"""
+    scheduler = RequestScheduler({"max_concurrency": 1, "requests_per_minute": 60})
+    scheduler._backoff_delay = lambda attempt, retry_after=None: 0.05
+    events = []
+
+    async def flaky():
+        events.append("flaky")
+        if events.count("flaky") < 2:
+            raise LLMError("overloaded", status_code=529, retryable=True)
+        return "ok"
+
+    async def other():
+        await asyncio.sleep(0.01)
+        events.append("other")
+
+    results = await asyncio.gather(scheduler.run(flaky), scheduler.run(other))
+
+    assert results[0] == "ok"
+    assert events == ["flaky", "other", "flaky"]
+    # Three attempts in total, each taking one request token
+    assert scheduler.request_bucket.tokens < 57.1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_gives_up_on_fatal_errors():
+    """Test non-retryable errors surface immediately"""
+    scheduler = RequestScheduler({"base_delay": 0.001})
+    attempts = []
+
+    async def broken():
+        attempts.append(1)
+        raise LLMError("bad request", status_code=400)
+
+    with pytest.raises(LLMError):
+        await scheduler.run(broken)
+
+    assert len(attempts) == 1
+    assert scheduler.stats["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_concurrency_cap():
+    """Test no more than max_concurrency requests run at once"""
+    scheduler = RequestScheduler({"max_concurrency": 2})
+    running = []
+    peak = []
+
+    async def request():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    await asyncio.gather(*(scheduler.run(request) for _ in range(6)))
+
+    assert max(peak) == 2
+    assert scheduler.stats["requests"] == 6
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_throttles():
+    """Test bucket waits for refill once drained"""
+    bucket = TokenBucket(rate_per_minute=600, capacity=2)
+
+    assert await bucket.acquire() == 0
+    assert await bucket.acquire() == 0
+    assert await bucket.acquire() > 0
+
+
+def test_provider_error_classification():
+    """Test SDK errors map to retryable LLMErrors"""
+    class FakeResponse:
+        headers = {"retry-after": "2"}
+
+    class FakeStatusError(Exception):
+        status_code = 429
+        response = FakeResponse()
+
+    error = _to_llm_error("API error", FakeStatusError("slow down"))
+    assert error.retryable
+    assert error.retry_after == 2.0
+
+    assert not _to_llm_error("API error", ValueError("bad")).retryable
+    assert _to_llm_error("API error", ConnectionError("reset")).retryable
+
+
+def test_normalize_timeouts():
+    """Test scalar and dict timeout config"""
+    assert normalize_timeouts(30) == {"connect": 10.0, "read": 30.0, "total": None}
+    assert normalize_timeouts(5)["connect"] == 5.0
+    assert normalize_timeouts({"total": 90})["total"] == 90.0
+
+
+class HangingProvider(LLMProvider):
+    """Fake provider whose upstream never answers"""
+
+    async def generate(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7) -> str:
+        return await self._with_total_timeout(asyncio.sleep(10))
+
+    async def generate_stream(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7):
+        async def upstream():
+            yield "partial"
+            await asyncio.sleep(10)
+            yield "never"
+
+        async for chunk in self._iter_with_deadline(upstream()):
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_total_timeout_bounds_requests():
+    """Test hung requests and streams fail after the total timeout"""
+    provider = HangingProvider("fake-model", "test-key-123456", timeout={"total": 0.05})
+
+    with pytest.raises(asyncio.TimeoutError):
+        await provider.generate("hello")
+
+    received = []
+    with pytest.raises(asyncio.TimeoutError):
+        async for chunk in provider.generate_stream("hello"):
+            received.append(chunk)
+    assert received == ["partial"]
+
+
+class SlowOpenProvider(HangingProvider):
+    """Fake provider whose stream is slow to open, then slow to read"""
+
+    async def generate_stream(self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7):
+        async def upstream():
+            for _ in range(10):
+                await asyncio.sleep(0.02)
+                yield "chunk"
+
+        deadline = self._deadline()
+        stream = await self._with_total_timeout(asyncio.sleep(0.06, result=upstream()), deadline)
+        async for chunk in self._iter_with_deadline(stream, deadline):
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_total_timeout_covers_stream_open_and_read():
+    """Test opening and reading a stream share one total timeout"""
+    provider = SlowOpenProvider("fake-model", "test-key-123456", timeout={"total": 0.15})
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    received = []
+    with pytest.raises(asyncio.TimeoutError):
+        async for chunk in provider.generate_stream("hello"):
+            received.append(chunk)
+    # Reading only gets what the open left of the total
+    assert loop.time() - started < 0.2
+    assert 0 < len(received) < 6
+
+
+class FakeAnthropicMessages:
+    """Fake messages endpoint capturing request payloads"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, **kwargs):
+        from types import SimpleNamespace
+        self.requests.append(kwargs)
+        usage = SimpleNamespace(
+            input_tokens=12,
+            output_tokens=5,
+            cache_read_input_tokens=900,
+            cache_creation_input_tokens=0
+        )
+        return SimpleNamespace(content=[SimpleNamespace(text="ok")], usage=usage)
+
+
+@pytest.mark.asyncio
+async def test_anthropic_prompt_caching():
+    """Test structured prompts mark cache breakpoints and record cache usage"""
+    from types import SimpleNamespace
+
+    messages = FakeAnthropicMessages()
+    provider = AnthropicProvider(
+        "claude-test",
+        "test-key-123456",
+        client=SimpleNamespace(messages=messages)
+    )
+    prompt = ChatPrompt(
+        "You are a PM",
+        [
+            {"role": "user", "content": "User: Hi"},
+            {"role": "assistant", "content": "Hello"},
+            {"role": "user", "content": "User: Build a todo app"}
+        ],
+        cache_breakpoints=[2]
+    )
+
+    assert await provider.generate(prompt) == "ok"
+
+    request = messages.requests[0]
+    assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert request["messages"][1]["content"] == "Hello"
+    assert request["messages"][2]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert provider.last_usage["cache_read_tokens"] == 900
+    assert provider.usage_totals["input_tokens"] == 12
+
+    # Plain string prompts are still sent as a single user turn
+    await provider.generate("hello")
+    assert messages.requests[1]["messages"] == [{"role": "user", "content": "hello"}]
+
+
+def test_token_estimators():
+    """Test heuristic counts and per-provider estimator lookup"""
+    from llm.tokens import HeuristicEstimator, count_tokens, get_estimator, register_estimator
+
+    estimator = HeuristicEstimator()
+    assert estimator.count("") == 0
+    assert estimator.count("a" * 40) == 10
+    assert estimator.count("中文" * 10) == 10
+
+    assert get_estimator("anthropic", "claude-test") is get_estimator("anthropic", "claude-test")
+    assert get_estimator("unknown-provider").count("a" * 40) == 10
+
+    register_estimator("fixed", lambda model: HeuristicEstimator(chars_per_token=1))
+    assert count_tokens("abcd", provider="fixed") == 4
+
+
+def test_message_tokens_counted_per_estimator():
+    """Test context packing budgets messages with the provider's estimator"""
+    from core.context_manager import ContextManager
+    from core.session import Message
+    from llm.tokens import HeuristicEstimator, count_message_tokens
+
+    dense = HeuristicEstimator(chars_per_token=1)
+    message = Message(role="user", content="a" * 40)
+    assert count_message_tokens(message) == 10
+    assert count_message_tokens(message, dense) == 40
+    # Each estimator's count is cached separately; only the default is stored
+    assert message.token_count == 10 and message.token_counts == {dense: 40}
+
+    messages = [Message(role="user", content="a" * 40) for _ in range(10)]
+    manager = ContextManager(max_tokens=100, window_step=1)
+    assert len(manager.pack(messages)) == 10
+    packed = manager.pack(messages, estimator=dense)
+    assert sum(count_message_tokens(m, dense) for m in packed) <= 100
+    assert len(packed) < 10
+
+
+@pytest.mark.asyncio
+async def test_cached_provider_usage(tmp_path):
+    """Test usage is reported for upstream calls and cleared on cache hits"""
+    inner = CountingProvider()
+    provider = CachedLLMProvider(inner, ResponseCache({"directory": str(tmp_path)}))
+
+    async def generate_with_usage(prompt, **kwargs):
+        inner.record_usage({"input_tokens": 10, "output_tokens": 3})
+        return "answer"
+
+    inner.generate = generate_with_usage
+
+    await provider.generate("hello")
+    assert provider.last_usage == {"input_tokens": 10, "output_tokens": 3}
+
+    await provider.generate("hello")
+    assert provider.last_usage == {}
+    assert provider.usage_totals["input_tokens"] == 10
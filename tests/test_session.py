@@ -2,6 +2,8 @@
 Tests for Core Session Management
 """
 
+import asyncio
+
 import pytest
 from datetime import datetime
 from core.session import Session, Message, Decision, SessionManager
@@ -92,3 +94,437 @@ def test_context_summary(sample_session):
 
     assert "todo app" in summary
     assert "Great idea" in summary
+
+
+def test_session_token_accounting(sample_session):
+    """Test token counts are cached per message and totalled on the session"""
+    message = Message(
+        role="agent",
+        agent_name="Tech Lead",
+        content="Use SQLite for the first version",
+        metadata={"usage": {"input_tokens": 120, "output_tokens": 8}}
+    )
+    before = sample_session.token_count
+    sample_session.add_message(message)
+
+    assert message.token_count > 0
+    assert sample_session.token_count == before + message.token_count
+    assert sample_session.usage_totals == {"input_tokens": 120, "output_tokens": 8}
+
+    # Totals are rebuilt from the stored per-message counts
+    restored = Session.from_dict(sample_session.to_dict())
+    assert restored.token_count == sample_session.token_count
+    assert restored.usage_totals == sample_session.usage_totals
+
+
+def test_message_compact_representation():
+    """Test messages and decisions are slotted, interned and round-trip"""
+    when = datetime(2024, 3, 1, 9, 30, 15, 123456)
+    message = Message.from_dict({
+        "role": "".join(["ag", "ent"]),
+        "agent_name": "".join(["Tech ", "Lead"]),
+        "content": "Use SQLite",
+        "timestamp": when.isoformat()
+    })
+
+    assert not hasattr(message, "__dict__")
+    assert message.role is Message(role="agent").role
+    assert message.agent_name is Message(role="agent", agent_name="Tech Lead").agent_name
+    assert isinstance(message._ts, float)
+    assert message.timestamp == when
+    assert Message.from_dict(message.to_dict()) == message
+
+    decision = Decision(
+        id="dec_001",
+        topic="Database",
+        decision="SQLite",
+        participants=["Tech Lead"],
+        reasoning="Simple",
+        timestamp=when
+    )
+    assert not hasattr(decision, "__dict__")
+    assert Decision.from_dict(decision.to_dict()) == decision
+    assert decision.to_dict()["timestamp"] == when.isoformat()
+
+
+def test_keyword_matcher_single_pass(tmp_path):
+    """Test overlapping keywords across groups are found and cached per message"""
+    from core.keywords import KeywordMatcher, keyword_scores, load_keyword_matcher
+
+    matcher = KeywordMatcher({
+        "tech": {"suggest": "tech_lead", "keywords": {"en": ["api", "database"]}},
+        "risk": {"weight": 2.0, "keywords": {"en": ["api key", "database"], "zh": [{"密码": 3.0}]}}
+    })
+
+    hits = matcher.match("Store the API key and 密码 in the database")
+    assert {(hit.group, hit.keyword) for hit in hits} == {
+        ("tech", "api"), ("risk", "api key"), ("risk", "密码"), ("tech", "database"), ("risk", "database")
+    }
+    assert dict(matcher.scores("API key in the database, database!")) == {"tech": 2.0, "risk": 4.0}
+    assert matcher.suggestions(matcher.scores("which database?")) == ["tech_lead"]
+    assert KeywordMatcher({"risk": {"keywords": {"zh": ["密码"]}}}, languages=["en"]).match("密码") == []
+
+    # Scores are computed when the message is added, then reused
+    session = Session(session_id="kw")
+    message = Message(role="user", content="Should we decide on the database?")
+    session.add_message(message)
+    assert "decision" in message.keywords and "important" in message.keywords
+    assert keyword_scores(message) is message.keywords
+
+    config_file = tmp_path / "keywords.yaml"
+    config_file.write_text("groups:\n  custom:\n    keywords:\n      en: [widget]\n", encoding="utf-8")
+    assert dict(load_keyword_matcher(str(config_file)).scores("A Widget")) == {"custom": 1.0}
+
+
+def test_context_packing_honors_budget():
+    """Test history is packed into the token budget, newest first"""
+    from core.context_manager import ContextManager
+
+    manager = ContextManager(max_tokens=200, max_message_tokens=100)
+    messages = [
+        Message(role="agent", agent_name="Tech Lead", content=f"Filler remark number {i} " * 5)
+        for i in range(30)
+    ]
+    messages.append(Message(role="user", content="Here is my spec: " + "requirement " * 400))
+
+    packed = manager.pack(messages)
+
+    assert sum(msg.token_count or 0 for msg in packed) <= 200
+    assert packed[-1].content.startswith("Here is my spec")
+    assert packed[-1].metadata["truncated"]
+    assert "tokens omitted" in packed[-1].content
+    # Originals are left untouched
+    assert "tokens omitted" not in messages[-1].content
+    # Kept messages stay in conversation order
+    assert [messages.index(m) for m in packed[:-1]] == sorted(messages.index(m) for m in packed[:-1])
+
+
+def test_context_packing_keeps_stable_prefix():
+    """Test the packed history is a recent run whose start moves in steps"""
+    from core.context_manager import ContextManager
+
+    manager = ContextManager(max_tokens=100, max_message_tokens=50, max_messages=0, window_step=4)
+    messages = [Message(role="user", content=f"Message number {i} " * 3) for i in range(40)]
+
+    starts = []
+    for count in range(1, len(messages) + 1):
+        packed = manager.pack(messages[:count])
+        start = messages.index(packed[0])
+        # Contiguous through the newest message, within budget
+        assert packed == messages[start:count]
+        assert sum(msg.token_count for msg in packed) <= 100
+        starts.append(start)
+
+    assert starts == sorted(starts)
+    assert all(start % 4 == 0 for start in starts)
+    # The start only jumps now and then, not on every turn
+    assert len(set(starts)) < len(starts) // 2
+
+
+def test_context_packing_pins_important_messages():
+    """Test important and decision-related messages outside the window are pinned"""
+    from core.context_manager import ContextManager
+
+    manager = ContextManager(max_tokens=100, max_message_tokens=50, window_step=4)
+    messages = [Message(role="agent", agent_name="Tech Lead", content=f"Filler remark {i} " * 3) for i in range(40)]
+    messages[2] = Message(role="user", content="Should we confirm PostgreSQL?")
+    messages[5] = Message(role="agent", agent_name="Tech Lead", content="Caching layer notes")
+    decisions = [Decision(id="d1", topic="Caching layer", decision="Redis", participants=["Tech Lead"], reasoning="")]
+
+    packed = manager.pack(messages, decisions=decisions)
+    assert packed[0] is messages[2] and packed[1] is messages[5]
+    assert sum(msg.token_count for msg in packed) <= 100
+
+    # The recent window after the pins is still one unbroken run
+    start = messages.index(packed[2])
+    assert start % 4 == 0 and packed[2:] == messages[start:]
+
+    # Without any history overflow nothing is reordered
+    assert manager.pack(messages[:3], decisions=decisions) == messages[:3]
+
+
+def test_context_truncation_and_summary_budget():
+    """Test tiny budgets still fit and a summary never crowds out history"""
+    from core.context_manager import ContextManager
+    from llm.tokens import count_message_tokens
+    from core.summarizer import SUMMARY_KEY
+
+    manager = ContextManager(max_tokens=40)
+    long_message = Message(role="user", content="word " * 200)
+    for budget in (1, 3, 10):
+        assert count_message_tokens(manager._truncate(long_message, budget)) <= budget
+
+    session = Session(session_id="s1")
+    for i in range(20):
+        session.add_message(Message(role="user", content=f"Point {i} " * 4))
+    session.metadata[SUMMARY_KEY] = {"text": "summary " * 200, "watermark": 19, "levels": []}
+
+    context = asyncio.run(manager.prepare_context(session))
+    assert context[0].role == "system"
+    assert context[-1].content == session.messages[-1].content
+    assert sum(count_message_tokens(msg) for msg in context) <= 40
+
+    # Messages after the summary's watermark are kept even past the window
+    session.metadata[SUMMARY_KEY]["watermark"] = 10
+    context = asyncio.run(manager.prepare_context(session))
+    assert [msg.content for msg in context[1:]] == [msg.content for msg in session.messages[10:]]
+
+
+def test_session_store_journal(tmp_path):
+    """Test saves append to the journal and loads replay it"""
+    from storage.session_store import SessionStore
+
+    store = SessionStore({"directories": {"sessions": str(tmp_path)}})
+    session = Session(session_id="journal", product_name="Todo")
+    session.add_message(Message(role="user", content="first"))
+    store.save_session(session)
+
+    snapshot = (tmp_path / "journal.json").read_bytes()
+    session.add_message(Message(role="agent", agent_name="Tech Lead", content="second"))
+    session.current_stage = "requirements"
+    store.save_session(session)
+
+    # Snapshot untouched; the message went to the segment, the change to the journal
+    assert (tmp_path / "journal.json").read_bytes() == snapshot
+    lines = (tmp_path / "journal.journal.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json_type(line) for line in lines] == ["session"]
+    assert len((tmp_path / "journal.messages.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+
+    restored = SessionStore({"directories": {"sessions": str(tmp_path)}}).load_session("journal")
+    assert [m.content for m in restored.messages] == ["first", "second"]
+    assert restored.current_stage == "requirements"
+
+
+def test_session_store_journals_changed_metadata_only(tmp_path):
+    """Test saves journal only the metadata keys that changed"""
+    import json
+    from storage.session_store import SessionStore
+
+    store = SessionStore({"directories": {"sessions": str(tmp_path)}})
+    session = Session(session_id="meta", product_name="Todo")
+    session.metadata["summary"] = {"text": "long summary " * 100, "watermark": 4}
+    session.metadata["flag"] = 1
+    store.save_session(session)
+
+    # Only updated_at moved: nothing to journal
+    session.add_message(Message(role="user", content="hello"))
+    store.save_session(session)
+    journal = tmp_path / "meta.journal.jsonl"
+    assert not journal.exists() or journal.read_text(encoding="utf-8") == ""
+
+    session.metadata["flag"] = 2
+    del session.metadata["summary"]
+    session.metadata["note"] = "new"
+    store.save_session(session)
+    events = [json.loads(line) for line in journal.read_text(encoding="utf-8").splitlines()]
+    assert len(events) == 1
+    assert events[0]["metadata"] == {"flag": 2, "note": "new"}
+    assert events[0]["metadata_removed"] == ["summary"]
+    assert set(events[0]["data"]) == {"updated_at"}
+
+    restored = SessionStore({"directories": {"sessions": str(tmp_path)}}).load_session("meta")
+    assert restored.metadata == {"flag": 2, "note": "new"}
+    assert restored.updated_at == session.updated_at
+
+
+def test_session_store_recovers_torn_journal(tmp_path):
+    """Test a partially written journal line is dropped on load"""
+    from storage.session_store import SessionStore
+
+    config = {"directories": {"sessions": str(tmp_path)}, "storage": {"compact_every": 2}}
+    store = SessionStore(config)
+    session = Session(session_id="torn")
+    store.save_session(session)
+    session.add_message(Message(role="user", content="kept"))
+    store.save_session(session)
+
+    with open(tmp_path / "torn.journal.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"seq": 99, "type": "mess')
+
+    reloaded_store = SessionStore(config)
+    restored = reloaded_store.load_session("torn")
+    assert [m.content for m in restored.messages] == ["kept"]
+
+    # Appends after recovery stay readable; compaction folds them into a snapshot
+    restored.add_message(Message(role="user", content="after crash"))
+    reloaded_store.save_session(restored)
+    restored.add_message(Message(role="user", content="compacted"))
+    reloaded_store.save_session(restored)
+
+    final = SessionStore(config).load_session("torn")
+    assert [m.content for m in final.messages] == ["kept", "after crash", "compacted"]
+    journal = (tmp_path / "torn.journal.jsonl").read_text(encoding="utf-8")
+    assert '"seq": 99' not in journal
+    assert "after crash" not in journal
+
+
+def json_type(line: str) -> str:
+    """Event type of a journal line"""
+    import json
+    return json.loads(line)["type"]
+
+
+def test_save_session_uses_session_id(tmp_path):
+    """Test save_session saves the requested session, not the current one"""
+    manager = SessionManager({"directories": {"sessions": str(tmp_path)}})
+    first = manager.create_session("First")
+    first.add_message(Message(role="user", content="hello"))
+    manager.create_session("Second")
+
+    assert manager.is_dirty(first)
+    manager.save_session(first.session_id)
+
+    assert not manager.is_dirty(first)
+    assert manager.store.exists(first.session_id)
+    assert manager.dirty_sessions() == []
+
+    with pytest.raises(ValueError):
+        manager.save_session("missing")
+
+
+@pytest.mark.asyncio
+async def test_autosaver_coalesces_bursts(tmp_path):
+    """Test a burst of changes becomes one write after it settles"""
+    from core.autosave import AutoSaver
+
+    manager = SessionManager({"directories": {"sessions": str(tmp_path)}})
+    session = manager.create_session("Burst")
+    saver = AutoSaver(manager, interval=60, debounce=60)
+
+    # Each check during the burst sees a new version and holds off
+    for i in range(3):
+        for j in range(5):
+            session.add_message(Message(role="user", content=f"message {i}-{j}"))
+        await saver.check()
+    assert saver.saves == 0
+
+    # Quiet for a tick: one write for all 15 messages
+    await saver.check()
+    assert saver.saves == 1
+    assert not manager.is_dirty(session)
+
+    # Final flush on stop writes pending changes immediately
+    task = asyncio.ensure_future(saver.run())
+    await asyncio.sleep(0)
+    session.add_message(Message(role="user", content="last words"))
+    await saver.stop()
+    assert task.done()
+    assert saver.saves == 2
+
+    restored = SessionManager({"directories": {"sessions": str(tmp_path)}}).get_session(session.session_id)
+    assert len(restored.messages) == 16
+    assert restored.messages[-1].content == "last words"
+
+
+def test_session_index_queries(tmp_path):
+    """Test listing uses the index and can be rebuilt from disk"""
+    import shutil
+    from storage.session_store import SessionStore
+
+    config = {"directories": {"sessions": str(tmp_path)}}
+    store = SessionStore(config)
+    for i in range(5):
+        session = Session(session_id=f"s{i}", product_name=f"Product {i}")
+        for j in range(i):
+            session.add_message(Message(role="user", content=f"message {j}"))
+        store.save_session(session)
+
+    # Queries read only the index, never the session files
+    fresh = SessionStore(config)
+    fresh.load_session = None
+    page = fresh.query_sessions(sort_by="message_count", offset=1, limit=2)
+    assert [entry["session_id"] for entry in page] == ["s3", "s2"]
+    assert page[0]["message_count"] == 3
+    assert page[0]["size"] > 0
+
+    store.delete_session("s4")
+    assert len(SessionStore(config).query_sessions()) == 4
+
+    # A lost index is rebuilt from the session files
+    shutil.rmtree(tmp_path / ".index")
+    rebuilt = SessionStore(config).query_sessions(sort_by="product_name", descending=False)
+    assert [entry["session_id"] for entry in rebuilt] == ["s0", "s1", "s2", "s3"]
+    assert [s.session_id for s in SessionStore(config).list_sessions(limit=2)] == [
+        entry["session_id"] for entry in SessionStore(config).query_sessions(limit=2)
+    ]
+
+
+def test_session_cache_lru_writes_back(tmp_path):
+    """Test cached sessions are reused and dirty ones saved on eviction"""
+    config = {"directories": {"sessions": str(tmp_path)}, "session_cache": {"max_sessions": 2}}
+    manager = SessionManager(config)
+
+    first = manager.create_session("First")
+    first.add_message(Message(role="user", content="unsaved work"))
+    second = Session(session_id="second")
+    manager.set_current_session(second)
+    manager.save_session("second")
+
+    assert manager.get_session(first.session_id) is first
+
+    # Third session evicts the least recently used non-current session
+    manager.set_current_session(Session(session_id="third"))
+    assert first.session_id in manager.open_sessions
+    assert "second" not in manager.open_sessions
+
+    manager.set_current_session(Session(session_id="fourth"))
+    assert first.session_id not in manager.open_sessions
+    # Dirty session was written back before eviction
+    reloaded = manager.get_session(first.session_id)
+    assert reloaded is not first
+    assert reloaded.messages[0].content == "unsaved work"
+
+
+def test_session_save_does_not_block_mutation(tmp_path):
+    """Test a session can change while a save is writing it"""
+    import threading
+
+    manager = SessionManager({"directories": {"sessions": str(tmp_path)}})
+    session = manager.create_session("Slow")
+    session.add_message(Message(role="user", content="saved"))
+
+    writing, release = threading.Event(), threading.Event()
+    write = manager.store.save_session
+
+    def slow_write(snapshot):
+        writing.set()
+        release.wait(5)
+        write(snapshot)
+
+    manager.store.save_session = slow_write
+    saver = threading.Thread(target=manager.save_session, args=(session.session_id,))
+    saver.start()
+    assert writing.wait(5)
+
+    # Not blocked by the write in progress
+    adder = threading.Thread(target=session.add_message, args=(Message(role="user", content="during save"),))
+    adder.start()
+    adder.join(2)
+    assert not adder.is_alive()
+    release.set()
+    saver.join(5)
+
+    # The write had the earlier copy, so the new message is still unsaved
+    assert manager.is_dirty(session)
+    restored = SessionManager({"directories": {"sessions": str(tmp_path)}}).store.load_session(session.session_id)
+    assert [m.content for m in restored.messages] == ["saved"]
+    manager.save_session(session.session_id)
+    assert not manager.is_dirty(session)
+
+
+def test_list_sessions_leaves_cache_alone(tmp_path):
+    """Test listing all sessions doesn't pull them into the session cache"""
+    config = {"directories": {"sessions": str(tmp_path)}, "session_cache": {"max_sessions": 2}}
+    for i in range(4):
+        SessionManager(config).update_session(Session(session_id=f"s{i}"))
+
+    manager = SessionManager(config)
+    current = manager.create_session("Working")
+    current.add_message(Message(role="user", content="unsaved"))
+    other = manager.get_session("s3")
+
+    listed = manager.list_sessions()
+    assert {s.session_id for s in listed} == {"s0", "s1", "s2", "s3"}
+    assert other in listed
+    assert list(manager.open_sessions) == [current.session_id, "s3"]
+    assert manager.is_dirty(current)
@@ -0,0 +1,207 @@
+"""
+Tests for Session Storage Backends
+"""
+
+import json
+import pytest
+
+from core.session import Session, Message, Decision, SessionManager
+from storage.session_store import SessionStore, detect_serializer, get_serializer
+from storage.sqlite_store import SQLiteSessionStore
+
+
+@pytest.fixture
+def sqlite_config(tmp_path):
+    """Config selecting the SQLite backend"""
+    return {
+        "directories": {"sessions": str(tmp_path)},
+        "storage": {"backend": "sqlite"}
+    }
+
+
+def make_session(session_id: str, product_name: str) -> Session:
+    """Create session with a few messages and a decision"""
+    session = Session(session_id=session_id, product_name=product_name)
+    session.add_message(Message(role="user", content=f"We are building {product_name}"))
+    session.add_message(Message(
+        role="agent",
+        agent_name="Tech Lead",
+        content="PostgreSQL gives us transactional guarantees",
+        metadata={"usage": {"input_tokens": 10}}
+    ))
+    session.add_decision(Decision(
+        id="decision_001",
+        topic="Database",
+        decision="Use PostgreSQL",
+        participants=["Tech Lead", "Security Expert"],
+        reasoning="Need ACID compliance"
+    ))
+    return session
+
+
+def test_sqlite_store_roundtrip(sqlite_config):
+    """Test sessions survive save/load and incremental saves"""
+    manager = SessionManager(sqlite_config)
+    assert isinstance(manager.store, SQLiteSessionStore)
+
+    store = manager.store
+    session = make_session("s1", "Todo App")
+    store.save_session(session)
+
+    session.add_message(Message(role="user", content="What about offline mode?"))
+    store.save_session(session)
+
+    restored = SQLiteSessionStore(sqlite_config).load_session("s1")
+    assert restored.product_name == "Todo App"
+    assert [m.content for m in restored.messages] == [m.content for m in session.messages]
+    assert restored.messages[1].metadata == {"usage": {"input_tokens": 10}}
+    assert restored.decisions[0].participants == ["Tech Lead", "Security Expert"]
+    assert [m.content for m in store.get_messages("s1", start=1, end=2)] == [session.messages[1].content]
+
+    entries = store.query_sessions()
+    assert entries[0]["message_count"] == 3
+
+    store.delete_session("s1")
+    assert not store.exists("s1")
+    assert store.search_messages("offline") == []
+
+
+def test_sqlite_store_search(sqlite_config):
+    """Test full-text search and decision queries across sessions"""
+    store = SQLiteSessionStore(sqlite_config)
+    store.save_session(make_session("s1", "Todo App"))
+    store.save_session(make_session("s2", "Invoice Tool"))
+
+    hits = store.search_messages("invoice")
+    assert [hit["session_id"] for hit in hits] == ["s2"]
+    assert "[Invoice]" in hits[0]["snippet"]
+
+    # Quoting keeps FTS syntax characters from breaking the query
+    assert store.search_messages('transactional "guarantees') != []
+
+    assert len(store.search_decisions("ACID")) == 2
+    assert len(store.find_decisions(topic="data", participant="Security Expert")) == 2
+    assert store.find_decisions(participant="Product Manager") == []
+
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgpack"])
+def test_serializer_roundtrip_and_detection(name):
+    """Test serializers round-trip and are recognized on load"""
+    if name != "json":
+        pytest.importorskip(name)
+    serializer = get_serializer(name)
+    data = make_session("s1", "Todo App").to_dict()
+
+    raw = serializer.dumps(data)
+    assert serializer.loads(raw) == data
+    assert detect_serializer(raw).loads(raw) == data
+
+
+def test_session_store_migrates_serializer(tmp_path):
+    """Test sessions saved as JSON load under msgpack and migrate to it"""
+    pytest.importorskip("msgpack")
+    sessions_dir = {"sessions": str(tmp_path)}
+    SessionStore({"directories": sessions_dir}).save_session(make_session("s1", "Todo App"))
+
+    store = SessionStore({"directories": sessions_dir, "storage": {"serializer": "msgpack"}})
+    restored = store.load_session("s1")
+    assert restored.decisions[0].participants == ["Tech Lead", "Security Expert"]
+
+    with pytest.raises(ValueError):
+        store.migrate("yaml")
+
+    assert store.migrate("msgpack") == 1
+    assert store.migrate("msgpack") == 0
+    assert not (tmp_path / "s1.json").exists()
+    assert (tmp_path / "s1.msgpack").read_bytes()[:1] != b"{"
+
+    reloaded = SessionStore({"directories": sessions_dir}).load_session("s1")
+    assert [m.content for m in reloaded.messages] == [m.content for m in restored.messages]
+    assert [entry["session_id"] for entry in store.query_sessions()] == ["s1"]
+
+    # json and orjson share an extension but still count as different formats
+    pytest.importorskip("orjson")
+    assert store.migrate("json") == 1
+    assert store.migrate("orjson") == 1
+    assert store.migrate("orjson") == 0
+    migrated = SessionStore({"directories": sessions_dir}).load_session("s1")
+    assert migrated.product_name == "Todo App"
+
+    # Fast formats store timestamps as epoch seconds, messages included
+    line = (tmp_path / "s1.messages.jsonl").read_text(encoding="utf-8").splitlines()[0]
+    assert isinstance(json.loads(line)["timestamp"], float)
+    assert [m.timestamp for m in migrated.messages] == [m.timestamp for m in restored.messages]
+    assert migrated.decisions[0].timestamp == restored.decisions[0].timestamp
+
+
+@pytest.mark.parametrize("name", ["orjson", "msgpack"])
+def test_session_store_segments_use_fast_codec(tmp_path, name):
+    """Test message segments are encoded with orjson under fast serializers"""
+    pytest.importorskip(name)
+    pytest.importorskip("orjson")
+    from storage.message_segment import MessageSegment
+
+    store = SessionStore({"directories": {"sessions": str(tmp_path)}, "storage": {"serializer": name}})
+    assert store.line_serializer.name == "orjson"
+    session = make_session("s1", "Todo App")
+    session.add_message(Message(role="user", content="line\nbreak and ünïcode"))
+    store.save_session(session)
+
+    # Still plain JSON lines, readable without orjson
+    segment = MessageSegment(tmp_path / "s1.messages.jsonl", tmp_path / "s1.messages.idx")
+    assert segment.read()[-1]["content"] == "line\nbreak and ünïcode"
+    restored = SessionStore({"directories": {"sessions": str(tmp_path)}}).load_session("s1")
+    assert [m.content for m in restored.messages] == [m.content for m in session.messages]
+
+
+def test_session_store_pages_messages_lazily(tmp_path):
+    """Test loading and appending to a large session reads only the tail"""
+    from storage.message_segment import LazyMessageList
+
+    config = {"directories": {"sessions": str(tmp_path)}}
+    session = Session(session_id="big")
+    for i in range(1000):
+        session.add_message(Message(role="user", content=f"message {i}"))
+    SessionStore(config).save_session(session)
+
+    store = SessionStore(config)
+    restored = store.load_session("big")
+    assert isinstance(restored.messages, LazyMessageList)
+    assert restored.token_count == session.token_count
+
+    restored.add_message(Message(role="agent", agent_name="Tech Lead", content="one more"))
+    store.save_session(restored)
+    assert restored.messages._pages == {}
+
+    assert restored.messages[-2].content == "message 999"
+    assert [m.content for m in restored.messages[254:258]] == [f"message {i}" for i in range(254, 258)]
+    assert len(restored.messages._pages) == 3
+    assert [m.content for m in store.get_messages("big", 998, 1001)] == ["message 998", "message 999", "one more"]
+
+    # A torn line at the end of the segment is dropped on load
+    with open(tmp_path / "big.messages.jsonl", "ab") as f:
+        f.write(b'{"role": "us')
+    reloaded = SessionStore(config).load_session("big")
+    assert len(reloaded.messages) == 1001
+    assert reloaded.messages[-1].content == "one more"
+
+
+def test_session_store_moves_legacy_messages_to_segment(tmp_path):
+    """Test sessions with messages in the snapshot still load and convert on save"""
+    import json
+
+    config = {"directories": {"sessions": str(tmp_path)}}
+    legacy = make_session("old", "Todo App").to_dict()
+    (tmp_path / "old.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    store = SessionStore(config)
+    session = store.load_session("old")
+    assert [m.content for m in session.messages][0] == "We are building Todo App"
+    session.add_message(Message(role="user", content="new"))
+    store.save_session(session)
+
+    assert "messages" not in json.loads((tmp_path / "old.json").read_text(encoding="utf-8"))
+    restored = SessionStore(config).load_session("old")
+    assert [m.content for m in restored.messages] == [m.content for m in session.messages]
+    assert restored.usage_totals == session.usage_totals
@@ -0,0 +1,158 @@
+"""
+Tests for Utility Modules
+"""
+
+import asyncio
+
+import pytest
+
+from utils.async_runner import AsyncRunner
+from utils.event_bus import Event, EventBus
+
+
+def test_async_runner_reuses_loop():
+    """Test consecutive runs share one event loop"""
+    runner = AsyncRunner()
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    try:
+        first = runner.run(current_loop())
+        second = runner.run(current_loop())
+        assert first is second
+        assert first is runner.loop
+    finally:
+        runner.stop()
+
+    assert not runner.is_running
+
+
+def test_async_runner_keeps_background_tasks():
+    """Test tasks scheduled in one run survive into the next"""
+    runner = AsyncRunner()
+    results = []
+
+    async def background():
+        await asyncio.sleep(0.01)
+        results.append("done")
+
+    async def schedule():
+        return asyncio.get_running_loop().create_task(background())
+
+    async def wait_for(task):
+        await task
+
+    try:
+        task = runner.run(schedule())
+        runner.run(wait_for(task))
+        assert results == ["done"]
+    finally:
+        runner.stop()
+
+
+@pytest.mark.asyncio
+async def test_event_bus_delivers_in_order_without_blocking():
+    """Test slow handlers don't hold up publishers and see events in order"""
+    bus = EventBus(workers=2)
+    slow, fast = [], []
+
+    async def slow_handler(event):
+        await asyncio.sleep(0.01)
+        slow.append(event.data["n"])
+
+    bus.subscribe_async("tick", slow_handler)
+    bus.subscribe("tick", lambda event: fast.append(event.data["n"]))
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for n in range(5):
+        await bus.publish(Event("tick", {"n": n}))
+    assert loop.time() - started < 0.01
+
+    await bus.drain()
+    assert slow == fast == [0, 1, 2, 3, 4]
+    assert bus.stats()["tick"]["delivered"] == 10
+    assert bus.stats()["tick"]["max_seconds"] >= 0.01
+    await bus.close()
+
+
+@pytest.mark.asyncio
+async def test_event_bus_overflow_and_sync_publish():
+    """Test drop policy when full and publish_sync from sync code"""
+    bus = EventBus(queue_size=2, workers=1, overflow="drop_oldest")
+    seen = []
+    bus.subscribe("tick", lambda event: seen.append(event.data["n"]))
+
+    # Queued while no worker has run yet; the oldest are dropped
+    for n in range(4):
+        bus.publish_sync(Event("tick", {"n": n}))
+    await bus.drain()
+
+    assert seen == [2, 3]
+    assert bus.stats()["tick"]["dropped"] == 2
+    await bus.close()
+
+    with pytest.raises(ValueError):
+        EventBus(overflow="ignore")
+
+
+@pytest.mark.asyncio
+async def test_event_bus_overflow_is_per_subscription():
+    """Test a backed-up subscriber only drops its own events"""
+    bus = EventBus(queue_size=2, workers=1, overflow="drop_oldest")
+    first, second = [], []
+    bus.subscribe("tick", lambda event: first.append(event.data["n"]))
+    bus.subscribe("tock", lambda event: second.append(event.data["n"]))
+
+    # Both share the one worker, which hasn't run yet
+    for n in range(3):
+        bus.publish_sync(Event("tick", {"n": n}))
+    bus.publish_sync(Event("tock", {"n": 0}))
+    await bus.drain()
+
+    assert first == [1, 2]
+    assert second == [0]
+    assert bus.stats()["tick"]["dropped"] == 1
+    assert bus.stats()["tock"]["dropped"] == 0
+    await bus.close()
+
+
+def test_event_bus_keeps_events_across_loops():
+    """Test events pending when a loop ends are delivered on the next one"""
+    bus = EventBus(workers=1)
+    seen = []
+
+    async def slow_handler(event):
+        await asyncio.sleep(0.01)
+        seen.append(event.data["n"])
+
+    bus.subscribe_async("tick", slow_handler)
+
+    async def publish_and_leave():
+        for n in range(3):
+            await bus.publish(Event("tick", {"n": n}))
+        await asyncio.sleep(0)
+
+    async def publish_and_drain():
+        await bus.publish(Event("tick", {"n": 3}))
+        await bus.drain()
+        await bus.close()
+
+    # The loop ends mid-delivery of the first event
+    asyncio.run(publish_and_leave())
+    assert seen == []
+    asyncio.run(publish_and_drain())
+    assert seen == [1, 2, 3]
+
+
+def test_cli_parser_commands():
+    """Test subcommands parse, with the chat as the default"""
+    from main import build_parser
+
+    parser = build_parser()
+    assert parser.parse_args([]).command is None
+    args = parser.parse_args(["--config", "my.yaml", "migrate-sessions", "msgpack"])
+    assert (args.command, args.format, args.config) == ("migrate-sessions", "msgpack", "my.yaml")
+    with pytest.raises(SystemExit):
+        parser.parse_args(["migrate-sessions", "yaml"])